@@ -1,5 +1,9 @@
-from core.llm_client import get_llm
+from service.llm_client import invoke_llm, ainvoke_llm, astream_llm
 from langchain.prompts import ChatPromptTemplate
+import logging
+from service.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 # Generates ONE self-contained python script with integrated Gradio UI:
 # - loads dataset (Hugging Face)
@@ -39,14 +43,64 @@ _coder = ChatPromptTemplate.from_messages([
 ])
 
 
-def generate_training_code(plan_json: dict, dataset_json: dict, project_dir: str) -> str:
-    llm = get_llm()
-    response = (_coder | llm).invoke({
+@traced("agent.coder")
+def generate_training_code(plan_json: dict, dataset_json: dict, project_dir: str,
+                           temperature: float = 0.2) -> str:
+    response = invoke_llm(_coder, {
         "plan_json": plan_json, 
         "dataset_json": dataset_json,
         "project_dir": project_dir
-    }).content
-    print(f"Raw coder response starts with: {response[:50]}")
+    }, temperature=temperature)
+    return _clean_code(response)
+
+
+@traced("agent.coder")
+async def agenerate_training_code(plan_json: dict, dataset_json: dict, project_dir: str,
+                                  temperature: float = 0.2) -> str:
+    response = await ainvoke_llm(_coder, {
+        "plan_json": plan_json,
+        "dataset_json": dataset_json,
+        "project_dir": project_dir
+    }, temperature=temperature)
+    return _clean_code(response)
+
+
+def candidate_temperatures(n: int, low: float = 0.2, high: float = 1.0) -> list:
+    """Spread N candidates from the default temperature upwards (distinct values, distinct cache keys)."""
+    if n <= 1:
+        return [low]
+    return [round(low + (high - low) * i / (n - 1), 3) for i in range(n)]
+
+
+def generate_candidate_codes(plan_json: dict, dataset_json: dict, project_dirs: list) -> list:
+    """Generate one script per candidate directory concurrently; returns [(temperature, code)]."""
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    temperatures = candidate_temperatures(len(project_dirs))
+    with ThreadPoolExecutor(max_workers=len(project_dirs)) as pool:
+        # Copy the caller's context per task so the spans nest under the current one
+        futures = [
+            pool.submit(contextvars.copy_context().run, generate_training_code, plan_json, dataset_json, d, t)
+            for d, t in zip(project_dirs, temperatures)
+        ]
+        codes = [f.result() for f in futures]
+    return list(zip(temperatures, codes))
+
+
+async def agenerate_candidate_codes(plan_json: dict, dataset_json: dict, project_dirs: list) -> list:
+    """Async twin of `generate_candidate_codes`."""
+    import asyncio
+
+    temperatures = candidate_temperatures(len(project_dirs))
+    codes = await asyncio.gather(*(
+        agenerate_training_code(plan_json, dataset_json, d, t) for d, t in zip(project_dirs, temperatures)
+    ))
+    return list(zip(temperatures, codes))
+
+
+def _clean_code(response: str) -> str:
+    logger.debug(f"Raw coder response starts with: {response[:50]}")
     
     # Clean up markdown formatting more aggressively
     import re
@@ -56,5 +110,122 @@ def generate_training_code(plan_json: dict, dataset_json: dict, project_dir: str
     code = re.sub(r'```\s*', '', code)
     
     cleaned_code = code.strip()
-    print(f"Cleaned code starts with: {cleaned_code[:50]}")
+    logger.debug(f"Cleaned code starts with: {cleaned_code[:50]}")
     return cleaned_code
+
+
+class FenceStripper:
+    """
+    Incremental equivalent of `_clean_code` for streamed responses.
+
+    Feed raw chunks in any split; lines that open/close a markdown fence (```python, ```)
+    are dropped and leading/trailing whitespace of the whole script is trimmed, while
+    everything else is released as soon as it can no longer be part of a fence.
+    """
+
+    _FENCE = "```"
+
+    def __init__(self):
+        self._state = "line_start"  # line_start | line | fence
+        self._line_buf = ""
+        self._pending_ws = ""
+        self._started = False
+        self._parts = []
+
+    @property
+    def code(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        for ch in chunk:
+            if self._state == "fence":
+                # Drop the rest of a fence line (language tag, trailing spaces)
+                if ch == "\n":
+                    self._state = "line_start"
+                continue
+
+            if self._state == "line":
+                self._emit(ch, out)
+                if ch == "\n":
+                    self._state = "line_start"
+                continue
+
+            # line_start: hold back anything that could still turn into a fence
+            self._line_buf += ch
+            head = self._line_buf.lstrip(" \t")
+            if not head:
+                continue
+            if self._FENCE.startswith(head):
+                if head == self._FENCE:
+                    self._state = "fence"
+                    self._line_buf = ""
+                continue
+            self._emit(self._line_buf, out)
+            self._line_buf = ""
+            self._state = "line_start" if ch == "\n" else "line"
+        return "".join(out)
+
+    def finish(self) -> str:
+        """Flush a held-back partial line; trailing whitespace is discarded."""
+        out = []
+        if self._state == "line_start" and self._line_buf:
+            self._emit(self._line_buf, out)
+        self._line_buf = ""
+        self._pending_ws = ""
+        return "".join(out)
+
+    def _emit(self, text: str, out: list):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        combined = self._pending_ws + text
+        body = combined.rstrip()
+        self._pending_ws = combined[len(body):]
+        if body:
+            out.append(body)
+            self._parts.append(body)
+
+
+class CodeStream:
+    """
+    Streams the coder agent's script as cleaned chunks:
+
+        stream = CodeStream(plan, dataset, project_dir)
+        async for chunk in stream:
+            ...  # forward to the editor
+        code = stream.code  # final cleaned script for the executor
+    """
+
+    def __init__(self, plan_json: dict, dataset_json: dict, project_dir: str):
+        self.inputs = {
+            "plan_json": plan_json,
+            "dataset_json": dataset_json,
+            "project_dir": project_dir
+        }
+        self._stripper = FenceStripper()
+        self.done = False
+
+    @property
+    def code(self) -> str:
+        return self._stripper.code
+
+    async def __aiter__(self):
+        async for token in astream_llm(_coder, self.inputs):
+            cleaned = self._stripper.feed(token)
+            if cleaned:
+                yield cleaned
+        tail = self._stripper.finish()
+        if tail:
+            yield tail
+        self.done = True
+        logger.debug(f"Cleaned code starts with: {self.code[:50]}")
+
+    async def result(self) -> str:
+        """Drain the stream (if nobody is consuming it) and return the cleaned script."""
+        if not self.done:
+            async for _ in self:
+                pass
+        return self.code
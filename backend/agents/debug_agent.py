@@ -1,5 +1,13 @@
-from core.llm_client import get_llm
+from service.llm_client import invoke_llm, ainvoke_llm
+from service.tokens import estimate_tokens, estimate_prompt_tokens
+from service.log_compaction import compact_log
+from core.config import settings
 from langchain.prompts import ChatPromptTemplate
+import ast, re, time
+import logging
+from service.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 _debug = ChatPromptTemplate.from_messages([
     ("system",
@@ -9,15 +17,232 @@ _debug = ChatPromptTemplate.from_messages([
     ("human", "Original code:\n```python\n{code}\n```\n\nError logs:\n```\n{error}\n```")
 ])
 
+# Patch mode: only the failing frames' neighbourhood goes out, only a diff comes back
+_debug_patch = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are the Debug Agent. A generated Python training script (ml_pipeline.py) failed. "
+     "You get the traceback and numbered excerpts of the script around the failing lines. "
+     "Return ONLY a unified diff against ml_pipeline.py that fixes the error: "
+     "`@@ -start,count +start,count @@` hunk headers using the line numbers shown, "
+     "context lines prefixed with a space, removed lines with '-', added lines with '+'. "
+     "Keep the fix minimal and do not rewrite unrelated code. No explanations."),
+    ("human", "Traceback:\n```\n{error}\n```\n\nScript excerpts ({total_lines} lines total):\n```\n{excerpts}\n```")
+])
+
+SCRIPT_NAME = "ml_pipeline.py"
+CONTEXT_LINES = 8
+MAX_TRACEBACK_LINES = 60
+
+_FRAME = re.compile(r'File "([^"]+)", line (\d+)')
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """The model's diff doesn't apply to (or doesn't fix the syntax of) the script."""
+
+
+def _last_traceback(error: str) -> str:
+    idx = error.rfind("Traceback (most recent call last):")
+    block = error[idx:] if idx != -1 else error
+    lines = block.strip().splitlines()
+    if len(lines) > MAX_TRACEBACK_LINES:
+        lines = lines[:10] + ["..."] + lines[-(MAX_TRACEBACK_LINES - 11):]
+    return "\n".join(lines)
+
+
+def extract_error_context(code: str, error: str, context: int = CONTEXT_LINES) -> tuple[str, str] | None:
+    """
+    Return (traceback, numbered excerpts) for the frames of the script in the last
+    traceback, or None when the error doesn't point into the script.
+    """
+    traceback = _last_traceback(error)
+    source = code.splitlines()
+    line_numbers = [
+        int(n) for path, n in _FRAME.findall(traceback)
+        if path.replace("\\", "/").endswith(SCRIPT_NAME) and 0 < int(n) <= len(source)
+    ]
+    if not line_numbers:
+        # SyntaxError reports carry `line N` without a frame
+        m = re.search(r'line (\d+)', traceback) if "SyntaxError" in traceback else None
+        if not m or not (0 < int(m.group(1)) <= len(source)):
+            return None
+        line_numbers = [int(m.group(1))]
+
+    # Merge the windows around each failing line into non-overlapping ranges
+    ranges = []
+    for n in sorted(set(line_numbers)):
+        start, end = max(1, n - context), min(len(source), n + context)
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+
+    # Imports are where most fixes land; always show the top of the file
+    head_end = min(len(source), 15)
+    if ranges[0][0] > head_end + 1:
+        ranges.insert(0, [1, head_end])
+    else:
+        ranges[0][0] = 1
+
+    excerpts = []
+    for start, end in ranges:
+        excerpts.append("\n".join(f"{i:4d}| {source[i - 1]}" for i in range(start, end + 1)))
+    return traceback, "\n...\n".join(excerpts)
+
+
+def _locate(lines: list, old: list, hint: int, start: int) -> int | None:
+    def matches(pos, loose):
+        if pos < start or pos + len(old) > len(lines):
+            return False
+        if loose:
+            return all(lines[pos + i].strip() == old[i].strip() for i in range(len(old)))
+        return lines[pos:pos + len(old)] == old
+
+    for loose in (False, True):
+        for offset in range(0, len(lines) + 1):
+            for pos in (hint - offset, hint + offset):
+                if matches(pos, loose):
+                    return pos
+    return None
+
+
+def apply_unified_diff(code: str, diff: str) -> str:
+    """Apply a (possibly slightly sloppy) LLM-written unified diff to `code`."""
+    hunks = []
+    for raw in diff.splitlines():
+        if raw.startswith("```") or raw.startswith("---") or raw.startswith("+++"):
+            continue
+        m = _HUNK.match(raw)
+        if m:
+            hunks.append((int(m.group(1)), []))
+            continue
+        if not hunks or raw.startswith("\\"):
+            continue  # preamble / "\ No newline at end of file"
+        tag, text = (raw[0], raw[1:]) if raw and raw[0] in " +-" else (" ", raw)
+        hunks[-1][1].append((tag, text))
+    if not hunks:
+        raise PatchError("No hunks in diff")
+
+    lines = code.splitlines()
+    out, cursor = [], 0
+    for old_start, body in hunks:
+        old = [t for tag, t in body if tag in " -"]
+        new = [t for tag, t in body if tag in " +"]
+        if old:
+            pos = _locate(lines, old, max(old_start - 1, cursor), cursor)
+            if pos is None:
+                raise PatchError(f"Hunk at line {old_start} does not match the script")
+        else:
+            pos = max(min(old_start, len(lines)), cursor)  # pure insertion after line old_start
+        out.extend(lines[cursor:pos])
+        out.extend(new)
+        cursor = pos + len(old)
+    out.extend(lines[cursor:])
+    return "\n".join(out) + ("\n" if code.endswith("\n") else "")
+
+
+def _validated(original: str, patched: str) -> str:
+    if patched.strip() == original.strip():
+        raise PatchError("Patch made no changes")
+    try:
+        ast.parse(patched)
+    except SyntaxError as e:
+        raise PatchError(f"Patched script has a syntax error: {e}")
+    return patched
+
+
+def _report(mode: str, started: float, prompt_tokens: int, completion: str, code: str, error: str) -> dict:
+    completion_tokens = estimate_tokens(completion)
+    # What a full rewrite would have cost: whole script + whole logs out, whole script back
+    full_tokens = estimate_prompt_tokens(_debug, {"code": code, "error": error}) + estimate_tokens(code)
+    report = {
+        "mode": mode,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "full_rewrite_tokens": full_tokens,
+        "tokens_saved": full_tokens - prompt_tokens - completion_tokens,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"🩹 Debug {mode}: ~{prompt_tokens}+{completion_tokens} tokens "
+          f"(full rewrite ~{full_tokens}), {report['seconds']}s")
+    return report
+
+
+def _patch_inputs(original_code: str, error: str):
+    if settings.DEBUG_AGENT_MODE != "patch":
+        return None
+    ctx = extract_error_context(original_code, error)
+    if ctx is None:
+        return None
+    traceback, excerpts = ctx
+    return {"error": traceback, "excerpts": excerpts, "total_lines": len(original_code.splitlines())}
+
+
+@traced("agent.debug")
+def fix_code(original_code: str, error: str) -> tuple[str, dict]:
+    """
+    Fix a failing script. Tries a targeted patch first (traceback frames + nearby source
+    out, unified diff back), validated locally; falls back to a full rewrite when the
+    error can't be localised or the patch doesn't apply. Returns (code, report).
+    `error` (execution output) is compacted to LOG_COMPACT_MAX_TOKENS first. Never answered
+    from the LLM cache: a retry on the same (code, error) needs a new fix, not the one that
+    just failed.
+    """
+    started = time.perf_counter()
+    error = compact_log(error)
+    spent = 0
+    inputs = _patch_inputs(original_code, error)
+    if inputs is not None:
+        spent = estimate_prompt_tokens(_debug_patch, inputs)
+        diff = invoke_llm(_debug_patch, inputs, use_cache=False)
+        try:
+            code = _validated(original_code, apply_unified_diff(original_code, diff))
+            return code, _report("patch", started, spent, diff, original_code, error)
+        except PatchError as e:
+            logger.warning(f"⚠️ Patch rejected ({e}); falling back to full rewrite")
+            spent += estimate_tokens(diff)
+
+    rewrite_inputs = {"code": original_code, "error": error}
+    response = invoke_llm(_debug, rewrite_inputs, use_cache=False)
+    mode = "rewrite" if inputs is None else "patch_failed_rewrite"
+    prompt_tokens = spent + estimate_prompt_tokens(_debug, rewrite_inputs)
+    return _clean_code(response), _report(mode, started, prompt_tokens, response, original_code, error)
+
+@traced("agent.debug")
+async def afix_code(original_code: str, error: str) -> tuple[str, dict]:
+    """Async twin of `fix_code`."""
+    started = time.perf_counter()
+    error = compact_log(error)
+    spent = 0
+    inputs = _patch_inputs(original_code, error)
+    if inputs is not None:
+        spent = estimate_prompt_tokens(_debug_patch, inputs)
+        diff = await ainvoke_llm(_debug_patch, inputs, use_cache=False)
+        try:
+            code = _validated(original_code, apply_unified_diff(original_code, diff))
+            return code, _report("patch", started, spent, diff, original_code, error)
+        except PatchError as e:
+            logger.warning(f"⚠️ Patch rejected ({e}); falling back to full rewrite")
+            spent += estimate_tokens(diff)
+
+    rewrite_inputs = {"code": original_code, "error": error}
+    response = await ainvoke_llm(_debug, rewrite_inputs, use_cache=False)
+    mode = "rewrite" if inputs is None else "patch_failed_rewrite"
+    prompt_tokens = spent + estimate_prompt_tokens(_debug, rewrite_inputs)
+    return _clean_code(response), _report(mode, started, prompt_tokens, response, original_code, error)
+
 def rewrite_on_error(original_code: str, error: str) -> str:
-    llm = get_llm()
-    response = (_debug | llm).invoke({"code": original_code, "error": error}).content
-    
+    return fix_code(original_code, error)[0]
+
+async def arewrite_on_error(original_code: str, error: str) -> str:
+    return (await afix_code(original_code, error))[0]
+
+def _clean_code(response: str) -> str:
     # Clean up markdown formatting more aggressively
     import re
-    
+
     # Remove all markdown code blocks
     code = re.sub(r'```python\s*', '', response)
     code = re.sub(r'```\s*', '', code)
-    
+
     return code.strip()
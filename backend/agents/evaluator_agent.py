@@ -1,71 +1,111 @@
-from core.llm_client import get_llm
+from service.structured_output import invoke_structured, ainvoke_structured
+from service.metrics_parser import parse_metrics
+from service.log_compaction import compact_log
+from schema.agent_output import Evaluation
+from core.config import settings
 from langchain.prompts import ChatPromptTemplate
-import json, os, re
+import logging
+from service.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 _evaluator = ChatPromptTemplate.from_messages([
     ("system",
-     "You are the Evaluator Agent. Analyze the execution output from a machine learning pipeline "
-     "and provide a comprehensive summary. Extract performance metrics, highlight key findings, "
-     "and provide insights about the model's performance. Return a JSON with fields: "
+     "You are the Evaluator Agent. You get the metrics already parsed from a machine learning "
+     "pipeline run and the last lines of its output. Write a short narrative: what the numbers "
+     "say about the model, key findings, and concrete recommendations. Return a JSON with fields: "
      "'summary', 'metrics', 'insights', 'recommendations'."),
-    ("human", "Execution output:\n{execution_output}")
+    ("human", "Parsed metrics:\n{metrics_digest}\n\nLast lines of output:\n{log_tail}")
 ])
 
-def summarize_and_prepare_ui(execution_stdout: str):
+@traced("agent.evaluator")
+def summarize_and_prepare_ui(execution_stdout: str, narrative: bool | None = None):
     """
-    Parse metrics from stdout and generate comprehensive evaluation summary.
+    Parse metrics from stdout (no LLM). With `narrative` (default EVALUATOR_NARRATIVE) the
+    LLM also writes summary/insights/recommendations from the metrics digest and log tail.
     """
-    llm = get_llm()
-    
-    # Use LLM to analyze the output
-    try:
-        response = (_evaluator | llm).invoke({"execution_output": execution_stdout}).content
-        
-        # Clean up markdown if present
-        import re
-        analysis = re.sub(r'```json\s*', '', response)
-        analysis = re.sub(r'```\s*', '', analysis)
-        
-        evaluation = json.loads(analysis.strip())
-    except Exception as e:
-        print(f"Evaluator parsing error: {e}")
-        # Fallback to basic parsing
-        evaluation = _basic_metric_parsing(execution_stdout)
-    
-    print("=" * 60)
-    print("📊 EVALUATION SUMMARY")
-    print("=" * 60)
-    print(f"Summary: {evaluation.get('summary', 'No summary available')}")
-    print(f"Metrics: {evaluation.get('metrics', {})}")
-    print(f"Insights: {evaluation.get('insights', 'No insights available')}")
-    print(f"Recommendations: {evaluation.get('recommendations', 'No recommendations available')}")
-    print("=" * 60)
-    
+    record = parse_metrics(execution_stdout, settings.EVALUATOR_TAIL_LINES)
+    evaluation = _metrics_evaluation(record)
+    if settings.EVALUATOR_NARRATIVE if narrative is None else narrative:
+        try:
+            written = invoke_structured(_evaluator, _narrative_inputs(record), Evaluation, "evaluator")
+            evaluation = _merge_narrative(evaluation, written)
+        except Exception as e:
+            logger.warning(f"Evaluator narrative failed, keeping the parsed metrics: {e}")
+
+    _print_evaluation(evaluation)
     return evaluation
 
-def _basic_metric_parsing(execution_stdout: str):
-    """Fallback metric parsing if LLM analysis fails"""
-    metrics = {}
-    
-    # Enhanced metric parsing patterns
-    patterns = {
-        'accuracy': r"accuracy[:=\s]*([0-9.]+)",
-        'f1': r"f1[_\s]*score[:=\s]*([0-9.]+)",
-        'precision': r"precision[:=\s]*([0-9.]+)",
-        'recall': r"recall[:=\s]*([0-9.]+)",
-        'mae': r"mae[:=\s]*([0-9.]+)",
-        'rmse': r"rmse[:=\s]*([0-9.]+)",
-        'r2': r"r2[:=\s]*([0-9.]+)"
-    }
-    
-    for metric_name, pattern in patterns.items():
-        match = re.search(pattern, execution_stdout, re.I)
-        if match:
-            metrics[metric_name] = float(match.group(1))
-    
+@traced("agent.evaluator")
+async def asummarize_and_prepare_ui(execution_stdout: str, narrative: bool | None = None):
+    """Async twin of `summarize_and_prepare_ui`."""
+    record = parse_metrics(execution_stdout, settings.EVALUATOR_TAIL_LINES)
+    evaluation = _metrics_evaluation(record)
+    if settings.EVALUATOR_NARRATIVE if narrative is None else narrative:
+        try:
+            written = await ainvoke_structured(_evaluator, _narrative_inputs(record), Evaluation, "evaluator")
+            evaluation = _merge_narrative(evaluation, written)
+        except Exception as e:
+            logger.warning(f"Evaluator narrative failed, keeping the parsed metrics: {e}")
+
+    _print_evaluation(evaluation)
+    return evaluation
+
+def _narrative_inputs(record) -> dict:
+    return {"metrics_digest": record.digest(), "log_tail": compact_log("\n".join(record.tail))}
+
+def _merge_narrative(evaluation: dict, written: dict) -> dict:
+    # Parsed numbers are authoritative; the LLM only fills metrics when the parser found none
+    merged = {**evaluation, **{k: written[k] for k in ("summary", "insights", "recommendations")}}
+    if not evaluation["metrics"]:
+        merged["metrics"] = written.get("metrics") or {}
+    return merged
+
+def _metrics_evaluation(record) -> dict:
+    """summary/metrics/insights/recommendations built from the parsed record alone."""
+    metrics = record.metrics
+    if metrics:
+        summary = "Model metrics: " + ", ".join(f"{k}={v:.4g}" for k, v in metrics.items())
+    else:
+        summary = "No metrics found in the execution output"
+
+    insights = []
+    classes = {k: v for k, v in record.classification_report.items() if "avg" not in k}
+    if len(classes) > 1:
+        weakest = min(classes, key=lambda k: classes[k]["f1-score"])
+        strongest = max(classes, key=lambda k: classes[k]["f1-score"])
+        insights.append(f"Best class {strongest} (f1 {classes[strongest]['f1-score']:.3g}), "
+                        f"weakest class {weakest} (f1 {classes[weakest]['f1-score']:.3g})")
+        supports = [v["support"] for v in classes.values()]
+        if max(supports) >= 3 * max(min(supports), 1):
+            insights.append(f"Imbalanced classes (support {min(supports)} to {max(supports)})")
+    if record.confusion_matrix:
+        insights.append(f"Confusion matrix: {record.confusion_matrix}")
+
+    recommendations = []
+    if not record.completed:
+        recommendations.append("The script did not print EXECUTION_COMPLETE; check that the run finished")
+    if not metrics:
+        recommendations.append("Print metrics as 'METRIC_NAME: value' lines so they can be tracked")
+    scores = [metrics[k] for k in ("accuracy", "f1") if k in metrics]
+    if scores and min(scores) < 0.7:
+        recommendations.append("Scores are low; try feature engineering or a stronger model family")
+
     return {
-        "summary": "Basic metric extraction completed",
+        "summary": summary,
         "metrics": metrics,
-        "insights": "Model training completed successfully",
-        "recommendations": "Review detailed metrics above"
+        "insights": "; ".join(insights) or "Model training completed",
+        "recommendations": "; ".join(recommendations) or "Review detailed metrics above",
+        "classification_report": record.classification_report,
+        "confusion_matrix": record.confusion_matrix,
+        "completed": record.completed,
     }
+
+def _print_evaluation(evaluation: dict):
+    logger.info(
+        "📊 EVALUATION SUMMARY\n"
+        f"Summary: {evaluation.get('summary', 'No summary available')}\n"
+        f"Metrics: {evaluation.get('metrics', {})}\n"
+        f"Insights: {evaluation.get('insights', 'No insights available')}\n"
+        f"Recommendations: {evaluation.get('recommendations', 'No recommendations available')}"
+    )
@@ -1,15 +1,30 @@
-import os, subprocess, textwrap, uuid, shlex
+import os, subprocess, textwrap, uuid, shlex, threading, collections, signal, time
+import asyncio
+import contextvars
+import logging
+from core.config import settings
+from service.log_stream import open_channel
+from service.worker_pool import get_worker_pool
+from service.blob_store import release_project
+from service.metrics_parser import MetricsParser
+from service.tracing import span, current_span, ProcessSampler
+
+logger = logging.getLogger(__name__)
+# The script's own output; also in logs/execution.log and on the log channel
+output_logger = logging.getLogger(__name__ + ".output")
+
+EXECUTION_TIMEOUT = 1800
+MAX_BUFFERED_LINES = 5000  # per stream; older lines stay in logs/execution.log
+COMPLETION_SENTINEL = "EXECUTION_COMPLETE"
 
 def _write_file(path: str, content: str):
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
         f.write(content)
 
-def execute_generated_code(code: str, project_dir: str):
-    """
-    Saves generated code to project directory, executes in a subprocess,
-    returns success flag, stdout, stderr.
-    """
+def _prepare_code_file(code: str, project_dir: str) -> str:
+    # Files shared through the blob store must not be rewritten in place by this run
+    release_project(project_dir)
     code_dir = os.path.join(project_dir, "code")
     os.makedirs(code_dir, exist_ok=True)
     code_path = os.path.join(code_dir, "ml_pipeline.py")
@@ -17,34 +32,330 @@ def execute_generated_code(code: str, project_dir: str):
 
     # Use absolute path to avoid issues
     abs_code_path = os.path.abspath(code_path)
-    print(f"📁 Project directory: {project_dir}")
-    print(f"▶️ Executing code at: {abs_code_path}")
-    
+    logger.info(f"📁 Project directory: {project_dir}")
+    logger.info(f"▶️ Executing code at: {abs_code_path}")
+    return abs_code_path
+
+def _child_env(extra: dict | None = None) -> dict:
+    # Unbuffered child output so lines arrive as they are printed, not at exit
+    env = dict(os.environ)
+    env.update(extra or {})
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+class ExecutionMonitor:
+    """
+    Consumes the script's output line by line: keeps the last MAX_BUFFERED_LINES per
+    stream, publishes every line to the project's log channel, fires `on_complete` on the
+    EXECUTION_COMPLETE sentinel and feeds stdout to a MetricsParser (service/metrics_parser.py).
+    """
+
+    def __init__(self, project_dir: str, on_complete=None):
+        self.channel = open_channel(project_dir)
+        self.on_complete = on_complete
+        self.completed = False
+        self.parser = MetricsParser()
+        self.dropped = {"stdout": 0, "stderr": 0}
+        self._lines = {
+            "stdout": collections.deque(maxlen=MAX_BUFFERED_LINES),
+            "stderr": collections.deque(maxlen=MAX_BUFFERED_LINES),
+        }
+
+    def on_line(self, stream: str, line: str):
+        buf = self._lines[stream]
+        if len(buf) == buf.maxlen:
+            self.dropped[stream] += 1
+        buf.append(line)
+        self.channel.publish(stream, line)
+        output_logger.debug(line.rstrip("\n"))
+
+        if stream != "stdout":
+            return
+        text = line.strip()
+        if text == COMPLETION_SENTINEL:
+            self.completed = True
+            if self.on_complete is not None:
+                self.on_complete()
+        self.parser.feed_line(line)
+
+    def text(self, stream: str) -> str:
+        return "".join(l if l.endswith("\n") else l + "\n" for l in self._lines[stream])
+
+    def result(self, returncode: int | None, error: str | None = None) -> dict:
+        self.channel.close(returncode)
+        logger.info(f"✅ Process completed with return code: {returncode}")
+        stderr = self.text("stderr")
+        if error:
+            stderr = f"{stderr}{error}"
+        return {
+            "success": returncode == 0 and error is None,
+            "stdout": self.text("stdout"),
+            "stderr": stderr,
+            "completed": self.completed,
+            "metrics": self.parser.result().metrics,
+            "log_path": self.channel.log_path,
+            "truncated_lines": dict(self.dropped),
+        }
+
+
+def _kill(proc: subprocess.Popen):
+    # The script runs under `shell=True`; kill the whole group, not just the shell
+    if os.name == "posix":
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    else:
+        proc.kill()
+
+def _pump(pipe, stream: str, monitor: ExecutionMonitor):
+    for line in iter(pipe.readline, ""):
+        monitor.on_line(stream, line)
+    pipe.close()
+
+def _execute_in_pool(pool, abs_code_path: str, project_dir: str, monitor: ExecutionMonitor,
+                     cancel: threading.Event | None = None, env: dict | None = None) -> dict:
+    """Run the script in a fork of a warm, pre-imported interpreter."""
+    logger.info(f"🔥 Running in warm worker pool: {abs_code_path}")
+    memory_mb = settings.EXECUTOR_MEMORY_LIMIT_MB
+    res = pool.run(
+        abs_code_path, project_dir, monitor.on_line,
+        timeout=EXECUTION_TIMEOUT,
+        env={**(env or {}), "PYTHONUNBUFFERED": "1"},
+        memory_bytes=memory_mb * 1024 * 1024 if memory_mb else None,
+        cancel=cancel,
+    )
+    if res["cancelled"]:
+        logger.info("🛑 Execution cancelled")
+        return monitor.result(res["returncode"], "Execution cancelled")
+    if res["timed_out"]:
+        logger.warning("⏰ Execution timed out")
+        return monitor.result(res["returncode"], "Execution timed out")
+    return monitor.result(res["returncode"])
+
+def _trace_result(s, res: dict, env: dict | None) -> dict:
+    s.set(
+        success=res["success"],
+        completed=res.get("completed", False),
+        stdout_bytes=len(res.get("stdout", "")),
+        stderr_bytes=len(res.get("stderr", "")),
+        metrics=len(res.get("metrics", {})),
+        dataset_cached="HF_DATASETS_OFFLINE" in (env or {}),
+    )
+    return res
+
+def execute_generated_code(code: str, project_dir: str, cancel: threading.Event | None = None,
+                           env: dict | None = None, on_complete=None):
+    """
+    Saves generated code to project directory, executes in a subprocess,
+    returns success flag, stdout, stderr.
+    Setting `cancel` kills the running script; `env` adds environment variables
+    (e.g. the shared dataset cache location); `on_complete()` fires as soon as the
+    script prints EXECUTION_COMPLETE.
+    """
+    with span("executor.run", project_dir=project_dir, code_bytes=len(code)) as s:
+        return _trace_result(s, _execute(code, project_dir, cancel, env, on_complete), env)
+
+def _execute(code: str, project_dir: str, cancel: threading.Event | None, env: dict | None, on_complete):
+    abs_code_path = _prepare_code_file(code, project_dir)
+
     # For Windows, we need to be more careful with paths
     if os.name == 'nt':  # Windows
         cmd = f'python "{abs_code_path}"'
     else:
         cmd = f"python {shlex.quote(abs_code_path)}"
-    
+
+    monitor = ExecutionMonitor(project_dir, on_complete)
+    pool = get_worker_pool()
+    if pool is not None:
+        return _execute_in_pool(pool, abs_code_path, project_dir, monitor, cancel, env)
     try:
         # Set working directory to project directory
-        print(f"🔄 Running command: {cmd}")
-        proc = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=1800, cwd=project_dir)
-        
-        print(f"✅ Process completed with return code: {proc.returncode}")
-        if proc.stdout:
-            print(f"📤 STDOUT:\n{proc.stdout}")
-        if proc.stderr:
-            print(f"❌ STDERR:\n{proc.stderr}")
-            
-        return {
-            "success": proc.returncode == 0,
-            "stdout": proc.stdout,
-            "stderr": proc.stderr
-        }
-    except subprocess.TimeoutExpired:
-        print("⏰ Execution timed out")
-        return {"success": False, "stdout": "", "stderr": "Execution timed out"}
+        logger.info(f"🔄 Running command: {cmd}")
+        proc = subprocess.Popen(
+            cmd, shell=True, cwd=project_dir, env=_child_env(env),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace", bufsize=1,
+            start_new_session=os.name == "posix",
+        )
+        readers = [
+            threading.Thread(target=_pump, args=(proc.stdout, "stdout", monitor), daemon=True),
+            threading.Thread(target=_pump, args=(proc.stderr, "stderr", monitor), daemon=True),
+        ]
+        for t in readers:
+            t.start()
+
+        sampler = ProcessSampler(proc.pid)
+        deadline = time.monotonic() + EXECUTION_TIMEOUT
+        error = None
+        while True:
+            sampler.sample()
+            try:
+                proc.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel is not None and cancel.is_set():
+                    logger.info("🛑 Execution cancelled")
+                    error = "Execution cancelled"
+                elif time.monotonic() > deadline:
+                    logger.warning("⏰ Execution timed out")
+                    error = "Execution timed out"
+                else:
+                    continue
+                _kill(proc)
+                proc.wait()
+                break
+        for t in readers:
+            t.join()
+        current_span().set(**sampler.attributes())
+        return monitor.result(proc.returncode, error)
     except Exception as e:
-        print(f"💥 Exception during execution: {e}")
-        return {"success": False, "stdout": "", "stderr": str(e)}
+        logger.error(f"💥 Exception during execution: {e}")
+        return monitor.result(None, str(e))
+
+async def _apump(reader: asyncio.StreamReader, stream: str, monitor: ExecutionMonitor):
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        monitor.on_line(stream, line.decode("utf-8", errors="replace"))
+
+async def _asample(sampler: ProcessSampler):
+    while True:
+        sampler.sample()
+        await asyncio.sleep(0.5)
+
+async def aexecute_generated_code(code: str, project_dir: str, env: dict | None = None):
+    """
+    Async variant of `execute_generated_code`: the event loop keeps serving other
+    workflows while the training subprocess runs.
+    """
+    with span("executor.run", project_dir=project_dir, code_bytes=len(code)) as s:
+        return _trace_result(s, await _aexecute(code, project_dir, env), env)
+
+async def _aexecute(code: str, project_dir: str, env: dict | None):
+    abs_code_path = _prepare_code_file(code, project_dir)
+    monitor = ExecutionMonitor(project_dir)
+    pool = get_worker_pool()
+    if pool is not None:
+        cancel = threading.Event()
+        try:
+            return await asyncio.to_thread(_execute_in_pool, pool, abs_code_path, project_dir, monitor, cancel, env)
+        except asyncio.CancelledError:
+            # The thread can't be cancelled; it kills the forked script on its next poll
+            cancel.set()
+            raise
+    proc = None
+    try:
+        logger.info(f"🔄 Running command: python {abs_code_path}")
+        proc = await asyncio.create_subprocess_exec(
+            "python", abs_code_path,
+            cwd=project_dir,
+            env=_child_env(env),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=1024 * 1024,
+        )
+        sampler = ProcessSampler(proc.pid)
+        sampling = asyncio.ensure_future(_asample(sampler))
+        pumps = asyncio.gather(
+            _apump(proc.stdout, "stdout", monitor),
+            _apump(proc.stderr, "stderr", monitor),
+            proc.wait(),
+        )
+        try:
+            await asyncio.wait_for(pumps, timeout=EXECUTION_TIMEOUT)
+        finally:
+            sampling.cancel()
+            current_span().set(**sampler.attributes())
+        return monitor.result(proc.returncode)
+    except asyncio.TimeoutError:
+        logger.warning("⏰ Execution timed out")
+        proc.kill()
+        await proc.wait()
+        return monitor.result(proc.returncode, "Execution timed out")
+    except asyncio.CancelledError:
+        # Don't leave an orphaned training process behind a cancelled workflow
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+        monitor.channel.close(None)
+        raise
+    except Exception as e:
+        logger.error(f"💥 Exception during execution: {e}")
+        return monitor.result(None, str(e))
+
+
+def race_budget(candidates: int, max_parallel: int | None = None) -> tuple[int, int]:
+    """(scripts run at once, BLAS/OpenMP threads per script) for a race of `candidates`."""
+    cpus = os.cpu_count() or 1
+    parallel = max_parallel or settings.CANDIDATE_MAX_PARALLEL or max(1, cpus // 2)
+    parallel = max(1, min(parallel, candidates))
+    return parallel, max(1, cpus // parallel)
+
+def race_generated_code(candidates: list, cancel: threading.Event | None = None,
+                        env: dict | None = None, max_parallel: int | None = None) -> dict:
+    """
+    Run candidate scripts [(code, project_dir), ...] in parallel, each in its own
+    directory. The first one to print EXECUTION_COMPLETE wins and the rest are killed
+    (or never started, if they were still waiting for a CPU slot).
+    Returns {"winner": index or None, "results": [result or None], "seconds": float}.
+    """
+    parallel, threads = race_budget(len(candidates), max_parallel)
+    # Split the CPUs between concurrent scripts instead of letting each BLAS grab all of them
+    child_env = {**(env or {}), **{k: str(threads) for k in
+                 ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")}}
+    logger.info(f"🏁 Racing {len(candidates)} candidates, {parallel} at a time ({threads} threads each)")
+
+    started = time.monotonic()
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(parallel)
+    cancels = [threading.Event() for _ in candidates]
+    results = [None] * len(candidates)
+    state = {"winner": None, "seconds": None}
+
+    def finish_first(index: int):
+        with lock:
+            if state["winner"] is not None:
+                return
+            state["winner"] = index
+            state["seconds"] = round(time.monotonic() - started, 3)
+        logger.info(f"🏆 Candidate {index} finished first after {state['seconds']}s")
+        for i, event in enumerate(cancels):
+            if i != index:
+                event.set()
+
+    def run(index: int, code: str, project_dir: str):
+        with slots:
+            if cancels[index].is_set():
+                return
+            results[index] = execute_generated_code(
+                code, project_dir, cancel=cancels[index], env=child_env,
+                on_complete=lambda: finish_first(index),
+            )
+
+    # Each thread runs in a copy of our context so its executor.run span nests under ours
+    workers = [
+        threading.Thread(target=contextvars.copy_context().run, args=(run, i, code, project_dir), daemon=True)
+        for i, (code, project_dir) in enumerate(candidates)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        while t.is_alive():
+            t.join(0.5)
+            if cancel is not None and cancel.is_set():
+                for event in cancels:
+                    event.set()
+    return {"winner": state["winner"], "results": results,
+            "seconds": state["seconds"] or round(time.monotonic() - started, 3)}
+
+async def arace_generated_code(candidates: list, env: dict | None = None,
+                               max_parallel: int | None = None) -> dict:
+    """Async wrapper for `race_generated_code`; cancelling the awaiting task kills every candidate."""
+    cancel = threading.Event()
+    try:
+        return await asyncio.to_thread(race_generated_code, candidates, cancel, env, max_parallel)
+    except asyncio.CancelledError:
+        cancel.set()
+        raise
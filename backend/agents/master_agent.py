@@ -1,5 +1,10 @@
-from core.llm_client import get_llm
+from service.structured_output import invoke_structured, ainvoke_structured
+from schema.agent_output import Plan
 from langchain.prompts import ChatPromptTemplate
+import logging
+from service.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 _prompt = ChatPromptTemplate.from_messages([
     ("system",
@@ -15,34 +20,10 @@ _prompt = ChatPromptTemplate.from_messages([
     ("human", "{user_prompt}")
 ])
 
+@traced("agent.master")
 def master_plan(user_prompt: str) -> dict:
-    llm = get_llm()
-    res = (_prompt | llm).invoke({"user_prompt": user_prompt}).content
-    print(f"Raw LLM response: {res}")  # Debug output
-    
-    # Be tolerant: model may return JSON-like text; try safe eval
-    import json, re
-    try:
-        return json.loads(res)
-    except Exception as e:
-        print(f"JSON parse error: {e}")
-        # Try to extract just the JSON part
-        try:
-            # Look for JSON between curly braces
-            m = re.search(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}", res, re.S)
-            if m:
-                json_str = m.group(0)
-                print(f"Extracted JSON: {json_str}")
-                return json.loads(json_str)
-        except Exception as e2:
-            print(f"Fallback JSON parse error: {e2}")
-        
-        # Final fallback - return a structured response
-        return {
-            "problem": "Binary churn prediction",
-            "dataset_requirements": "Public tabular dataset with churn labels",
-            "model_family": "Classification (Random Forest, Logistic Regression, etc.)",
-            "metrics": ["accuracy", "F1-score"],
-            "notes": "Build interactive UI with Gradio",
-            "raw_plan": res
-        }
+    return invoke_structured(_prompt, {"user_prompt": user_prompt}, Plan, "master")
+
+@traced("agent.master")
+async def amaster_plan(user_prompt: str) -> dict:
+    return await ainvoke_structured(_prompt, {"user_prompt": user_prompt}, Plan, "master")
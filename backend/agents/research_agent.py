@@ -1,5 +1,11 @@
-from core.llm_client import get_llm
+from service.structured_output import invoke_structured, ainvoke_structured
+from schema.agent_output import DatasetResult
+from service.dataset_catalog import lookup_dataset, plan_query, tokenize
 from langchain.prompts import ChatPromptTemplate
+import logging
+from service.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 _research = ChatPromptTemplate.from_messages([
     ("system",
@@ -11,36 +17,56 @@ _research = ChatPromptTemplate.from_messages([
     ("human", "{plan_json}")
 ])
 
+@traced("agent.research")
 def research_dataset(plan_json: dict) -> dict:
-    llm = get_llm()
-    res = (_research | llm).invoke({"plan_json": str(plan_json)}).content
-    print(f"Research agent response: {res}")  # Debug output
-    
-    import json, re
-    try:
-        return json.loads(res)
-    except Exception as e:
-        print(f"Research JSON parse error: {e}")
-        # Try to extract JSON
-        try:
-            m = re.search(r"\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}", res, re.S)
-            if m:
-                json_str = m.group(0)
-                print(f"Extracted research JSON: {json_str}")
-                return json.loads(json_str)
-        except Exception as e2:
-            print(f"Research fallback JSON parse error: {e2}")
-        
-        # Final fallback
-        return {
-            "dataset": {
-                "name": "Telco Customer Churn",
-                "hf_id": "kaggle/telco-customer-churn",
-                "task": "binary_classification",
-                "target": "Churn",
-                "features": ["categorical", "numerical"],
-                "load_snippet": "datasets.load_dataset('kaggle/telco-customer-churn')",
-                "notes": "Public dataset for churn prediction"
-            },
-            "raw_response": res
-        }
+    known = lookup_dataset(plan_json)
+    if known is not None:
+        return known
+    return invoke_structured(_research, {"plan_json": str(plan_json)}, DatasetResult, "research")
+
+@traced("agent.research")
+async def aresearch_dataset(plan_json: dict) -> dict:
+    known = lookup_dataset(plan_json)
+    if known is not None:
+        return known
+    return await ainvoke_structured(_research, {"plan_json": str(plan_json)}, DatasetResult, "research")
+
+_TASK_KINDS = (
+    ("regression", ("regress", "forecast", "price", "continuous")),
+    ("clustering", ("cluster", "segment", "unsupervised")),
+    ("classification", ("classif", "binary", "multiclass", "churn", "detect", "categor")),
+)
+
+def _task_kind(text: str):
+    text = text.lower()
+    for kind, needles in _TASK_KINDS:
+        if any(n in text for n in needles):
+            return kind
+    return None
+
+def dataset_matches_plan(plan: dict, dataset_json: dict) -> dict:
+    """
+    Cheap (no LLM) check that a dataset researched from the raw prompt still fits the
+    master plan: same task kind, and the dataset's name/target/id shows up in the plan.
+    Returns {"consistent": bool, "reason": str}.
+    """
+    if not isinstance(dataset_json, dict) or not dataset_json:
+        return {"consistent": False, "reason": "speculative research returned no dataset"}
+    info = dataset_json.get("dataset", dataset_json)
+    if not info.get("hf_id"):
+        return {"consistent": False, "reason": "no hf_id"}
+
+    plan_text = plan_query(plan)
+    if isinstance(plan, dict):
+        plan_text += f" {plan.get('model_family') or ''}"
+    plan_kind = _task_kind(plan_text)
+    dataset_kind = _task_kind(f"{info.get('task') or ''}")
+    if plan_kind and dataset_kind and plan_kind != dataset_kind:
+        return {"consistent": False, "reason": f"plan wants {plan_kind}, dataset is {dataset_kind}"}
+
+    plan_terms = set(tokenize(plan_text))
+    dataset_terms = set(tokenize(f"{info.get('name') or ''} {info.get('target') or ''} {info['hf_id']}"))
+    shared = plan_terms & dataset_terms
+    if not shared:
+        return {"consistent": False, "reason": "dataset name/target not mentioned by the plan"}
+    return {"consistent": True, "reason": f"shared terms: {', '.join(sorted(shared))}"}
@@ -0,0 +1,82 @@
+import ast, sys
+
+# Static checks run between the coder and the executor. They catch the failures that
+# would otherwise cost an interpreter start-up plus a dataset download to discover.
+
+# Third-party packages the coder prompt allows. `datasets` is how the prompt loads data,
+# joblib ships with sklearn and is the usual way to persist its models.
+ALLOWED_PACKAGES = {"sklearn", "gradio", "pandas", "numpy", "matplotlib", "seaborn", "datasets", "joblib"}
+BANNED_PACKAGES = {"torch", "torchvision", "tensorflow", "keras", "transformers", "jax"}
+STDLIB_MODULES = set(sys.stdlib_module_names)
+SENTINEL = "EXECUTION_COMPLETE"
+SCRIPT_NAME = "ml_pipeline.py"
+
+
+def _imported_packages(tree: ast.AST):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name.split(".")[0], node.lineno
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            yield node.module.split(".")[0], node.lineno
+
+
+def _prints_sentinel(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "print":
+            for arg in ast.walk(node):
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str) and SENTINEL in arg.value:
+                    return True
+    return False
+
+
+def _keyword_is_true(call: ast.Call, name: str) -> bool:
+    for kw in call.keywords:
+        if kw.arg == name:
+            return isinstance(kw.value, ast.Constant) and kw.value.value is True
+    return False
+
+
+def validate_generated_code(code: str) -> dict:
+    """
+    Parse and lint a generated script without running it.
+    Returns {"valid": bool, "errors": [(line, message)], "warnings": [(line, message)]}.
+    """
+    errors, warnings = [], []
+    try:
+        tree = ast.parse(code, filename=SCRIPT_NAME)
+    except SyntaxError as e:
+        return {"valid": False, "errors": [(e.lineno or 0, f"SyntaxError: {e.msg}")], "warnings": []}
+
+    for package, line in _imported_packages(tree):
+        if package in BANNED_PACKAGES:
+            errors.append((line, f"Banned import '{package}': only sklearn-based models are supported"))
+        elif package not in ALLOWED_PACKAGES and package not in STDLIB_MODULES:
+            errors.append((line, f"Disallowed import '{package}': allowed packages are "
+                                 f"{', '.join(sorted(ALLOWED_PACKAGES))} and the standard library"))
+
+    if not _prints_sentinel(tree):
+        errors.append((len(code.splitlines()), f"Script never prints '{SENTINEL}' at the end"))
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr == "launch" and not _keyword_is_true(node, "prevent_thread_lock"):
+            errors.append((node.lineno, "Blocking Gradio launch(): pass prevent_thread_lock=True"))
+        elif isinstance(func, ast.Name) and func.id == "input":
+            errors.append((node.lineno, "input() blocks waiting for stdin in a non-interactive run"))
+        elif isinstance(func, ast.Attribute) and func.attr == "show" and isinstance(func.value, ast.Name) and func.value.id == "plt":
+            warnings.append((node.lineno, "plt.show() is a no-op in headless runs; save figures instead"))
+
+    errors.sort()
+    return {"valid": not errors, "errors": errors, "warnings": warnings}
+
+
+def format_validation_errors(result: dict) -> str:
+    """Render validation errors like a traceback so the debug agent can localise them."""
+    lines = ["Static validation failed (script was not executed):"]
+    for line, message in result["errors"]:
+        lines.append(f'  File "{SCRIPT_NAME}", line {line}')
+        lines.append(f"    {message}")
+    return "\n".join(lines)
@@ -1,36 +1,42 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.session import get_async_db
 from core.security import verify_token
 from crud import crud_user
+from service.auth_cache import UserSnapshot, get_auth_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> UserSnapshot:
+    """
+    The authenticated user as a read-only snapshot. Repeat requests with the same token are
+    served from the auth cache without decoding the JWT or touching the database; routes
+    that modify the user load the row themselves (see api/routes/user.py).
+    """
+    cache = get_auth_cache()
+    if cache is not None:
+        cached = cache.get(token)
+        if cached is not None:
+            return cached
+
     try:
         payload = verify_token(token)
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-            )
+        user_id = int(payload.get("sub"))
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
 
-    # ✅ This converts the generator into an actual Session object
-    if isinstance(db, type(get_db())):
-        db = next(db)
-
-    user = crud_user.get_user(db, user_id=user_id)
+    user = await crud_user.get_user(db, user_id=user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    return user
\ No newline at end of file
+    snapshot = UserSnapshot.from_user(user)
+    if cache is not None:
+        cache.put(token, snapshot, payload.get("exp"))
+    return snapshot
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-from db.session import get_db
+from db.session import get_async_db
 from db.models import User
-from core.security import verify_password, create_access_token, create_refresh_token
+from crud import crud_user
+from core.security import create_access_token, create_refresh_token
+from service.password_hasher import averify_password
 from schema.token import Token,RefreshTokenRequest
 from api.deps import get_current_user
 from datetime import datetime
@@ -18,12 +20,13 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 90
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):  
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    user = await crud_user.get_user_by_email(db, form_data.username)
+    # bcrypt takes ~100s of ms of CPU; the process pool keeps it off the event loop
+    if not user or not await averify_password(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -39,17 +42,17 @@ def login(
     }
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(
+async def refresh_token(
     token_data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     
     payload = decode_token(token_data.refresh_token)
     user_id: str = payload.get("sub")
-    if not user_id:
+    if not user_id or not str(user_id).isdigit():
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await crud_user.get_user(db, int(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -63,7 +66,7 @@ def refresh_token(
     }
 
 @router.get("/me")
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return {
         "id": current_user.id,
         "name": current_user.name,
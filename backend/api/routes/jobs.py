@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from db.models import Job, User
+from db.session import get_db
+from api.deps import get_current_user
+from schema.job import JobCreate, JobResponse, JobDetailResponse
+from service.job_scheduler import get_scheduler, TERMINAL_STATES
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _get_own_job(db: Session, job_id: int, user: User) -> Job:
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
+def submit_job(
+    job_in: JobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = Job(
+        user_id=current_user.id,
+        prompt=job_in.prompt,
+        priority=job_in.priority,
+        max_retries=job_in.max_retries,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    get_scheduler().wake()
+    return job
+
+
+@router.get("", response_model=list[JobResponse])
+def list_jobs(
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return (
+        db.query(Job)
+        .filter(Job.user_id == current_user.id)
+        .order_by(Job.created_at.desc())
+        .limit(min(limit, 200))
+        .all()
+    )
+
+
+@router.get("/{job_id}", response_model=JobDetailResponse)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return _get_own_job(db, job_id, current_user)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = _get_own_job(db, job_id, current_user)
+    if job.status in TERMINAL_STATES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return get_scheduler().cancel(db, job)
@@ -1,10 +1,14 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import User
-from db.session import get_db
-from core.security import get_password_hash, verify_password
+from db.session import get_async_db
+from crud import crud_user
+from service.password_hasher import ahash_password, averify_password
+from service.email_queue import get_email_queue
+from service.otp_store import StoreFull, get_otp_store
 from api.deps import get_current_user
+from service.auth_cache import UserSnapshot
 from schema.user import (
     UserCreate, UserResponse,
     UserUpdate, PasswordChangeRequest,UsernameAvailability, EmailVerificationRequest,EmailSchema
@@ -13,22 +17,22 @@ import uuid
 import os
 from datetime import datetime, timedelta
 import random, string
+import hmac
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-import smtplib
 from core.config import settings
 
-router = APIRouter(prefix="/users", tags=["Users"])
+logger = logging.getLogger(__name__)
 
-otp_store={}
+router = APIRouter(prefix="/users", tags=["Users"])
 
 def generate_otp(length: int = 6) -> str:
     """Generates a random OTP."""
     return "".join(random.choices(string.digits, k=length))
 
 def verify_email(email: str, otp: str) -> bool:
-    """Send OTP via email with QuickPrep logo"""
+    """Queue the OTP email (with QuickPrep logo); returns False if it could not be queued."""
     try:
         # Create the email message container
         msg = MIMEMultipart()
@@ -48,7 +52,7 @@ def verify_email(email: str, otp: str) -> bool:
             <h2 style="color: #007bff; text-align: center;">Welcome to QuickPrep!</h2>
             <p style="text-align: center;">Use the OTP below to securely log in to your account:</p>
             <h1 style="font-size: 28px; text-align: center; color: #333;">{otp}</h1>
-            <p style="text-align: center;">This OTP is valid for <strong>5 minutes</strong>.</p>
+            <p style="text-align: center;">This OTP is valid for <strong>{int(settings.OTP_TTL_SECONDS // 60)} minutes</strong>.</p>
             <p style="text-align: center; color: #888;">If you didn’t request this OTP, you can safely ignore this email.</p>
             <br>
             <p style="text-align: center;">Thanks,<br><strong>The QuickPrep Team</strong></p>
@@ -59,52 +63,52 @@ def verify_email(email: str, otp: str) -> bool:
 
         
 
-        # Send email using SMTP
-        server = smtplib.SMTP(settings.EMAIL_SERVER, settings.EMAIL_PORT)
-        server.starttls()
-        server.login(settings.EMAIL_ADDRESS, settings.EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-
-        return True
+        # Hand off to the outbound queue; the SMTP round-trips happen on its sender threads
+        return get_email_queue().send(msg)
     except Exception as e:
-        print(f"Error sending QuickPrep OTP email: {e}")
+        logger.error(f"Error queueing QuickPrep OTP email: {e}")
         return False
 
 @router.post("/send-otp")
-async def send_verification_email(payload: EmailSchema,db: Session = Depends(get_db)):
+async def send_verification_email(payload: EmailSchema, db: AsyncSession = Depends(get_async_db)):
     email = payload.email
     
 
-    if db.query(User).filter(User.email == email).first():
+    if await crud_user.get_user_by_email(db, email):
         raise HTTPException(status_code=409, detail="Email already registered")
+    store = get_otp_store()
     otp = generate_otp()
+    try:
+        # Bounds both the store and SMTP usage per address, whatever the client does
+        if not await store.allow(f"otp_rate:{email}", settings.OTP_RATE_LIMIT, settings.OTP_RATE_WINDOW_SECONDS):
+            raise HTTPException(status_code=429, detail="Too many OTP requests, try again later")
+        # Stored first: the queued email can arrive before this handler would otherwise get to it
+        await store.put(f"otp:{email}", otp, settings.OTP_TTL_SECONDS)
+    except StoreFull:
+        raise HTTPException(status_code=503, detail="Failed to send OTP, try again later")
+    await store.delete(f"otp_attempts:{email}")
     if not verify_email(email, otp):
-        raise HTTPException(status_code=500, detail="Failed to send OTP")
-    otp_store[email] = {
-        'otp': otp,
-        'expires_at': datetime.utcnow() + timedelta(minutes=5)  # OTP valid for 5 minutes
-    }
+        await store.delete(f"otp:{email}")
+        raise HTTPException(status_code=503, detail="Failed to send OTP, try again later")
 
     return {"message": "OTP sent successfully"}
 
 @router.post("/verify-otp")
-async def verify_email_otp(
-    payload: EmailVerificationRequest,
-    db: Session = Depends(get_db)
-):
+async def verify_email_otp(payload: EmailVerificationRequest):
     email = payload.email
     otp = payload.otp
 
-    if email not in otp_store:
-        raise HTTPException(status_code=400, detail="Email not found or OTP expired")
-
-    stored_otp = otp_store[email]
-    if datetime.utcnow() > stored_otp['expires_at']:
-        del otp_store[email]
-        raise HTTPException(status_code=400, detail="OTP expired")
+    store = get_otp_store()
+    # Counted before the comparison, so a burst of parallel guesses can't all be checked
+    # before one of them burns the OTP; past OTP_MAX_ATTEMPTS the OTP is gone
+    if not await store.allow(f"otp_attempts:{email}", settings.OTP_MAX_ATTEMPTS, settings.OTP_TTL_SECONDS):
+        await store.delete(f"otp:{email}")
+        raise HTTPException(status_code=429, detail="Too many attempts, request a new OTP")
 
-    if stored_otp['otp'] != otp:
+    stored_otp = await store.get(f"otp:{email}")
+    if stored_otp is None:
+        raise HTTPException(status_code=400, detail="Email not found or OTP expired")
+    if not hmac.compare_digest(stored_otp.encode(), otp.encode()):
         raise HTTPException(status_code=400, detail="Invalid OTP")
 
     
@@ -115,16 +119,19 @@ async def verify_email_otp(
     # user.is_verified = True
     # db.commit()
 
-    
-    # del otp_store[email]
+    # Single use: of concurrent correct submissions only the one that consumes the code wins
+    consumed = await store.pop(f"otp:{email}")
+    if consumed is None or not hmac.compare_digest(consumed.encode(), otp.encode()):
+        raise HTTPException(status_code=400, detail="Email not found or OTP expired")
+    await store.delete(f"otp_attempts:{email}")
 
     return {"message": "Email verified and user updated successfully"}
   
 
 @router.get("/check-username", response_model=UsernameAvailability)
-def check_username(username: str, db: Session = Depends(get_db)):
-    exists = db.query(User).filter(func.lower(User.name) == username.lower().strip()).first()
-    print("Checked:", username, "Found:", exists)
+async def check_username(username: str, db: AsyncSession = Depends(get_async_db)):
+    exists = await crud_user.get_user_by_name(db, username, case_insensitive=True)
+    logger.debug(f"Checked: {username} Found: {exists}")
     if exists is None:
         return {"available": True}
     else:   
@@ -133,76 +140,75 @@ def check_username(username: str, db: Session = Depends(get_db)):
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user_in.email).first():
+async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await crud_user.get_user_by_email(db, user_in.email):
         raise HTTPException(status_code=400, detail="Email already registered")
-    if db.query(User).filter(User.name == user_in.name).first():
+    if await crud_user.get_user_by_name(db, user_in.name):
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    new_user = User(
-        name=user_in.name,
-        email=user_in.email,
-        password=get_password_hash(user_in.password),
-        api_key=user_in.api_key,
-        is_verified=True
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    password_hash = await ahash_password(user_in.password)
+    return await crud_user.create_user(db, user_in, password_hash)
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(current_user: UserSnapshot = Depends(get_current_user)):
     return current_user
 
 
+async def _load_user(db: AsyncSession, current_user: UserSnapshot) -> User:
+    # The dependency hands out a cached snapshot; writes need the live row
+    user = await crud_user.get_user(db, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
 @router.patch("/update", response_model=UserResponse)
-def update_profile(update: UserUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def update_profile(update: UserUpdate, db: AsyncSession = Depends(get_async_db),
+                         current_user: UserSnapshot = Depends(get_current_user)):
     if update.email and update.email != current_user.email:
-        if db.query(User).filter(User.email == update.email).first():
+        if await crud_user.get_user_by_email(db, update.email):
             raise HTTPException(status_code=400, detail="Email already in use")
 
+    values = {}
     if update.name:
-        current_user.name = update.name
+        values["name"] = update.name
     if update.email:
-        current_user.email = update.email
+        values["email"] = update.email
 
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    return await crud_user.update_user(db, await _load_user(db, current_user), **values)
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     request: PasswordChangeRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    if not verify_password(request.old_password, current_user.password):
+    user = await _load_user(db, current_user)
+    if not await averify_password(request.old_password, user.password):
         raise HTTPException(status_code=401, detail="Old password is incorrect")
 
-    current_user.password = get_password_hash(request.new_password)
-    db.commit()
+    password_hash = await ahash_password(request.new_password)
+    await crud_user.update_user(db, user, password=password_hash)
     return {"message": "Password updated successfully"}
 
 
 @router.patch("/update-api-key")
-def update_api_key(
+async def update_api_key(
     api_key: dict,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
-    current_user.api_key = api_key.get("api_key")
-    db.commit()
+    await crud_user.update_user(db, await _load_user(db, current_user), api_key=api_key.get("api_key"))
     return {"message": "API key updated successfully"}
 
 
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user_by_id(user_id: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user_by_id(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await crud_user.get_user(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
\ No newline at end of file
@@ -0,0 +1,211 @@
+import logging
+import json
+import os
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from db.models import Job, Project, User
+from db.session import get_db, get_async_db
+from api.deps import get_current_user
+from crud import crud_project
+from schema.projects import (
+    CodeStreamRequest, WorkflowRunCreate, WorkflowRunResponse, WorkflowReplayRequest, CheckpointResponse,
+    ProjectFileResponse,
+)
+from agents.coder_agent import CodeStream
+from workflow.pipeline import create_project_structure
+from core.security import verify_token
+from service.log_stream import get_channel
+from service.job_scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/workflow", tags=["Workflow"])
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/code/stream")
+async def stream_training_code(
+    payload: CodeStreamRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Server-sent events: `chunk` events with cleaned code as it is generated, then `done` with the full script."""
+    project_dir = create_project_structure(payload.project_name)
+    stream = CodeStream(payload.plan, payload.dataset, project_dir)
+
+    async def events():
+        try:
+            async for chunk in stream:
+                yield _sse("chunk", {"text": chunk})
+            yield _sse("done", {"code": stream.code})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _owns_project_folder(db: AsyncSession, user_id: int, project_name: str) -> bool:
+    folders = await db.scalars(
+        select(Project.folder_path)
+        .where(Project.user_id == user_id, Project.folder_path.endswith(project_name, autoescape=True))
+    )
+    return any(os.path.basename(os.path.normpath(folder)) == project_name for folder in folders)
+
+
+@router.websocket("/logs/{project_name}")
+async def tail_execution_logs(
+    websocket: WebSocket,
+    project_name: str,
+    token: str = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Tail a running (or just finished) execution: replays the buffered lines, then pushes
+    `{"type": "line", "stream", "line", "seq"}` messages live and a final `{"type": "end"}`.
+    Browsers can't set headers on WebSockets, so the access token comes as a query param.
+    `project_name` is the project's folder name and must belong to the token's user.
+    """
+    try:
+        user_id = int(verify_token(token).get("sub"))
+    except (HTTPException, TypeError, ValueError):
+        await websocket.close(code=1008)
+        return
+    if not await _owns_project_folder(db, user_id, project_name):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    channel = get_channel(project_name)
+    if channel is None:
+        await websocket.send_json({"type": "end", "returncode": None, "detail": "No execution found"})
+        await websocket.close()
+        return
+
+    queue = channel.subscribe()
+    try:
+        last_seq = 0
+        for item in channel.backlog():
+            last_seq = item["seq"]
+            await websocket.send_json({"type": "line", **item})
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            if item["seq"] <= last_seq:
+                continue  # already sent as part of the backlog
+            await websocket.send_json({"type": "line", **item})
+        await websocket.send_json({"type": "end", "returncode": channel.returncode})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.unsubscribe(queue)
+
+
+# -----------------
+# Checkpointed LangGraph runs (workflow/runs.py). The workflow modules pull in LangChain,
+# so they are imported on first use rather than at API start-up.
+# -----------------
+def _get_own_project(db: Session, project_id: int, user: User) -> Project:
+    project = db.query(Project).filter(Project.id == project_id, Project.user_id == user.id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+@router.get("/projects/{project_id}/files", response_model=list[ProjectFileResponse])
+def list_project_files(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """The project's files as indexed after its last execution (no filesystem scan)."""
+    _get_own_project(db, project_id, current_user)
+    return crud_project.list_project_files(db, project_id)
+
+
+def _submit_run(db: Session, project: Project, user: User, kind: str, **options) -> dict:
+    """Queue a graph run as a Job, so it shares the scheduler's global and per-account slots."""
+    from workflow import runs
+
+    busy = (
+        db.query(Job.id)
+        .filter(Job.project_id == project.id, Job.status.in_(("queued", "running")))
+        .first()
+    )
+    if busy is not None:
+        raise HTTPException(status_code=409, detail="Workflow is already running")
+    job = Job(user_id=user.id, project_id=project.id, prompt=project.description or "",
+              kind=kind, options=options)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    get_scheduler().wake()
+    return {"project_id": project.id, "job_id": job.id,
+            "thread_id": runs.thread_id(project.id, options.get("speculative", False)), "status": job.status}
+
+
+@router.post("/runs", response_model=WorkflowRunResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_workflow_run(
+    payload: WorkflowRunCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    project = crud_project.create_project(db, current_user.id, "workflow_run", description=payload.prompt)
+    return _submit_run(db, project, current_user, "graph_start", speculative=payload.speculative)
+
+
+@router.get("/runs/{project_id}/checkpoints", response_model=list[CheckpointResponse])
+def list_workflow_checkpoints(
+    project_id: int,
+    speculative: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    from workflow import runs
+
+    _get_own_project(db, project_id, current_user)
+    return runs.run_history(project_id, speculative)
+
+
+@router.post("/runs/{project_id}/resume", response_model=WorkflowRunResponse, status_code=status.HTTP_202_ACCEPTED)
+def resume_workflow_run(
+    project_id: int,
+    speculative: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Continue from the last completed node (master/research/coder results are reused)."""
+    from workflow import runs
+
+    project = _get_own_project(db, project_id, current_user)
+    if not runs.run_history(project_id, speculative):
+        raise HTTPException(status_code=404, detail="No checkpoints for this project")
+    return _submit_run(db, project, current_user, "graph_resume", speculative=speculative)
+
+
+@router.post("/runs/{project_id}/replay", response_model=WorkflowRunResponse, status_code=status.HTTP_202_ACCEPTED)
+def replay_workflow_run(
+    project_id: int,
+    payload: WorkflowReplayRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Re-run from the checkpoint taken just before `node` (e.g. "executor")."""
+    from workflow import runs
+
+    project = _get_own_project(db, project_id, current_user)
+    history = runs.run_history(project_id, payload.speculative)
+    if not any(payload.node in checkpoint["next"] for checkpoint in history):
+        raise HTTPException(status_code=404, detail=f"No checkpoint before node '{payload.node}'")
+    return _submit_run(db, project, current_user, "graph_replay",
+                       speculative=payload.speculative, node=payload.node)
@@ -0,0 +1,187 @@
+"""
+Load test of the auth hot paths: POST /auth/login and GET /users/me.
+
+    cd backend && python -m benchmarks.bench_auth_api --concurrency 32 --output after.json
+    cd backend && python -m benchmarks.bench_auth_api --database-url postgresql://... --baseline before.json
+
+Serves main.app with uvicorn in-process (a throwaway SQLite database by default, or
+--database-url) and drives it with an httpx.AsyncClient. Reports requests/sec and
+latency for:
+  login  concurrent logins (bcrypt-bound)
+  me     concurrent /users/me (token check + user lookup)
+  mixed  /users/me while logins run, which shows whether slow requests stall fast ones
+
+For before/after numbers, run it on the revision before a change with --output, then on
+the new one with --baseline pointing at that file.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PASSWORD = "bench-password"
+
+
+def _summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000, 3),
+    }
+
+
+def _serve(port: int):
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _load(send, total: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await send()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    return {"requests": total, "errors": errors, "wall_seconds": round(wall, 3),
+            "requests_per_second": round(total / wall, 2), **_summary(latencies)}
+
+
+async def _bench(base_url: str, args) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+        response = await client.post("/users/register", json={"email": email, "name": email, "password": PASSWORD})
+        response.raise_for_status()
+        credentials = {"username": email, "password": PASSWORD}
+        response = await client.post("/auth/login", data=credentials)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        def login():
+            return client.post("/auth/login", data=credentials)
+
+        def me():
+            return client.get("/users/me", headers=headers)
+
+        await _load(me, min(args.me_requests, 50), args.concurrency)  # warm the pools
+        results = {
+            "login": await _load(login, args.login_requests, args.concurrency),
+            "me": await _load(me, args.me_requests, args.concurrency),
+        }
+        login_load, me_load = await asyncio.gather(
+            _load(login, args.login_requests, max(args.concurrency // 2, 1)),
+            _load(me, args.me_requests, max(args.concurrency // 2, 1)),
+        )
+        results["mixed"] = {"login": login_load, "me": me_load}
+    return results
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _rows(results: dict):
+    for name, value in results.items():
+        if "requests_per_second" in value:
+            yield name, value
+        else:
+            for sub, nested in value.items():
+                yield f"{name}/{sub}", nested
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="default: a temporary SQLite file")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--login-requests", type=int, default=200)
+    parser.add_argument("--me-requests", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="JSON report path")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="autodev-auth-bench-")
+    # Read at import time by db/session.py and core/config.py
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("JOB_POLL_INTERVAL", "60")
+
+    server, thread = _serve(args.port)
+    try:
+        results = asyncio.run(_bench(f"http://127.0.0.1:{args.port}", args))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    print(f"{'scenario':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for name, row in _rows(results):
+        print(f"{name:<14}{row['requests_per_second']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['errors']:>8}")
+
+    report = {
+        "meta": {
+            "benchmark": "auth_api",
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        BACKEND_DIR, ".cache", "benchmarks", f"auth_api-{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        before = dict(_rows(baseline["results"]))
+        print(f"\nvs baseline {args.baseline} ({baseline['meta'].get('git_revision')}):")
+        for name, row in _rows(results):
+            if name in before and before[name]["requests_per_second"]:
+                change = (row["requests_per_second"] / before[name]["requests_per_second"] - 1) * 100
+                print(f"{name:<14}{before[name]['requests_per_second']:>10.1f} -> {row['requests_per_second']:.1f} req/s "
+                      f"({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
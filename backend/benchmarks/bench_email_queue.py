@@ -0,0 +1,132 @@
+"""
+OTP email sending: one SMTP connection per email on the request path vs. the pooled queue.
+
+    pip install aiosmtpd
+    cd backend && python -m benchmarks.bench_email_queue --emails 200 --handshake-latency 0.05
+
+Runs against a local aiosmtpd server. --handshake-latency delays the EHLO reply to stand
+in for the TCP + STARTTLS + AUTH cost of a real provider, --data-latency delays each DATA.
+"inline" is what send-otp used to do (connect, send, quit, inside the request);
+"queue" is service/email_queue.py, where the request only pays for enqueueing.
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import statistics
+import sys
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.email_queue import EmailQueue
+
+
+class _Handler:
+    def __init__(self, handshake_latency: float, data_latency: float):
+        self.handshake_latency = handshake_latency
+        self.data_latency = data_latency
+        self.messages = 0
+        self.sessions = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        if self.handshake_latency:
+            await asyncio.sleep(self.handshake_latency)
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.data_latency:
+            await asyncio.sleep(self.data_latency)
+        self.messages += 1
+        self.sessions.add(id(session))
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _message(i: int) -> MIMEText:
+    msg = MIMEText(f"<h1>{i:06d}</h1>", "html")
+    msg["From"] = "bench@example.com"
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = "Your OTP"
+    return msg
+
+
+def _summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    return (f"mean {statistics.mean(ordered) * 1000:8.2f}ms  p50 {ordered[len(ordered) // 2] * 1000:8.2f}ms  "
+            f"p95 {ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000:8.2f}ms")
+
+
+def _inline(port: int, emails: int) -> tuple[list[float], float]:
+    per_call = []
+    started = time.perf_counter()
+    for i in range(emails):
+        t0 = time.perf_counter()
+        server = smtplib.SMTP("127.0.0.1", port)
+        server.send_message(_message(i))
+        server.quit()
+        per_call.append(time.perf_counter() - t0)
+    return per_call, time.perf_counter() - started
+
+
+def _queued(port: int, emails: int, workers: int) -> tuple[list[float], float, dict]:
+    email_queue = EmailQueue("127.0.0.1", port, use_tls=False, workers=workers, max_queued=emails + 1).start()
+    per_call = []
+    started = time.perf_counter()
+    for i in range(emails):
+        t0 = time.perf_counter()
+        email_queue.send(_message(i))
+        per_call.append(time.perf_counter() - t0)
+    email_queue.join()
+    drained = time.perf_counter() - started
+    stats = email_queue.stats()
+    email_queue.stop()
+    return per_call, drained, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2, help="queue sender threads")
+    parser.add_argument("--handshake-latency", type=float, default=0.05, help="EHLO delay per connection (s)")
+    parser.add_argument("--data-latency", type=float, default=0.0, help="DATA delay per message (s)")
+    args = parser.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is required for this benchmark: pip install aiosmtpd")
+
+    handler = _Handler(args.handshake_latency, args.data_latency)
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        inline_calls, inline_total = _inline(port, args.emails)
+        inline_sessions = len(handler.sessions)
+        handler.sessions.clear()
+        queued_calls, queued_total, stats = _queued(port, args.emails, args.workers)
+        queued_sessions = len(handler.sessions)
+    finally:
+        controller.stop()
+
+    print(f"{args.emails} emails, handshake {args.handshake_latency * 1000:.0f}ms, "
+          f"data {args.data_latency * 1000:.0f}ms, {args.workers} queue workers\n")
+    print(f"inline  request path: {_summary(inline_calls)}")
+    print(f"        total {inline_total:.2f}s ({args.emails / inline_total:.1f} emails/s), "
+          f"{inline_sessions} SMTP connections")
+    print(f"queue   request path: {_summary(queued_calls)}")
+    print(f"        drained in {queued_total:.2f}s ({args.emails / queued_total:.1f} emails/s), "
+          f"{queued_sessions} SMTP connections, stats {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-call overhead of building a fresh ChatOpenAI per agent call vs. the pooled registry.
+
+    cd backend && python -m benchmarks.bench_llm_client --calls 200
+
+Runs fully offline against benchmarks/stub_llm_server.py.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+
+def _summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": statistics.mean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[int(len(ordered) * 0.95) - 1] * 1000,
+    }
+
+
+def _run(calls: int, make_llm) -> list[float]:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        make_llm().invoke("ping")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="stub server delay per request (s)")
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency) as stub:
+        os.environ["LLM_BASE_URL"] = stub.base_url
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+
+        from langchain_openai import ChatOpenAI
+        from service import llm_client
+
+        def fresh_client():
+            # What get_llm() used to do on every call
+            return ChatOpenAI(model=llm_client.DEFAULT_MODEL, temperature=0.2,
+                              api_key="stub", base_url=stub.base_url)
+
+        before_conns = stub.connections
+        before = _run(args.calls, fresh_client)
+        fresh_conns = stub.connections - before_conns
+
+        before_conns = stub.connections
+        after = _run(args.calls, lambda: llm_client.get_llm())
+        pooled_conns = stub.connections - before_conns
+        llm_client.close_llm_clients()
+
+    print(f"{'mode':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'conns':>8}")
+    for name, samples, conns in (("per-call", before, fresh_conns), ("pooled", after, pooled_conns)):
+        s = _summary(samples)
+        print(f"{name:<10}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{conns:>8}")
+
+
+if __name__ == "__main__":
+    main()
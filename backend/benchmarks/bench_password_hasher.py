@@ -0,0 +1,67 @@
+"""
+bcrypt on the event loop vs. the default threadpool vs. the hashing process pool.
+
+    cd backend && python -m benchmarks.bench_password_hasher --hashes 64
+
+For each strategy, hashes N passwords concurrently from one event loop and reports the
+throughput plus the worst event-loop stall seen by a 10 ms ticker (a stall is how long
+every other request on the worker would have waited).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def _ticker(stop: asyncio.Event, stalls: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - t0 - 0.01)
+
+
+async def _measure(hash_one, hashes: int) -> tuple[float, float]:
+    stop, stalls = asyncio.Event(), []
+    ticker = asyncio.create_task(_ticker(stop, stalls))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    await asyncio.gather(*(hash_one(f"password-{i}") for i in range(hashes)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return elapsed, max(stalls or [0.0])
+
+
+async def _run(hashes: int):
+    from core.security import get_password_hash
+    from service import password_hasher
+
+    async def inline(password):
+        return get_password_hash(password)
+
+    async def threadpool(password):
+        return await asyncio.to_thread(get_password_hash, password)
+
+    password_hasher.start_password_hasher()
+    await password_hasher.ahash_password("warm-up")
+
+    print(f"{'strategy':<12}{'hashes/s':>10}{'total s':>10}{'max loop stall ms':>20}")
+    for name, fn in (("inline", inline), ("threadpool", threadpool), ("processes", password_hasher.ahash_password)):
+        elapsed, stall = await _measure(fn, hashes)
+        print(f"{name:<12}{hashes / elapsed:>10.1f}{elapsed:>10.2f}{stall * 1000:>20.1f}")
+    password_hasher.shutdown_password_hasher()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hashes", type=int, default=64)
+    args = parser.parse_args()
+    os.environ.setdefault("PASSWORD_HASH_POOL", "true")
+    asyncio.run(_run(args.hashes))
+
+
+if __name__ == "__main__":
+    main()
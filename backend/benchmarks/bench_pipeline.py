@@ -0,0 +1,359 @@
+"""
+End-to-end workflow benchmark against a stub LLM with recorded responses.
+
+    cd backend && python -m benchmarks.bench_pipeline --concurrency 1,4 --latency 0.2
+    cd backend && python -m benchmarks.bench_pipeline --modes graph --baseline old.json
+
+Drives `run_autodev_once` ("pipeline"), the LangGraph `app.invoke` ("graph") and
+optionally `speculative_app.invoke` ("speculative") over the prompt corpus in
+benchmarks/pipeline_corpus.py (Iris, Titanic, churn, regression). For each mode and
+concurrency level it reports throughput, workflow and per-stage latency (from the
+node.* / agent.* / llm.invoke / executor.run trace spans), peak RSS, script executions
+and the peak number of live subprocesses, and writes everything as JSON for trend
+comparison (default .cache/benchmarks/pipeline-<timestamp>.json).
+
+Runs fully offline: the stub server answers every LLM call and the recorded scripts use
+only the standard library. Project directories, traces and checkpoints go to a temporary
+directory that is removed afterwards (--keep to inspect it).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.pipeline_corpus import SCENARIOS, respond
+from benchmarks.stub_llm_server import StubLLMServer
+
+MODES = ("pipeline", "graph", "speculative")
+STAGE_PREFIXES = ("node.", "agent.", "llm.", "executor.", "workflow.")
+
+
+def _summary(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+# -----------------
+# Process tree sampling (/proc; Linux only)
+# -----------------
+def _children_by_parent() -> dict:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm may contain spaces/parentheses; ppid is the 2nd field after the last ")"
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class TreeSampler:
+    """Peak number of live descendant processes and peak RSS of the whole process tree."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.available = os.path.isdir("/proc")
+        self.peak_subprocesses = 0
+        self.peak_tree_rss_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        me = os.getpid()
+        children = _children_by_parent()
+        descendants, stack = [], [me]
+        while stack:
+            for child in children.get(stack.pop(), []):
+                descendants.append(child)
+                stack.append(child)
+        self.peak_subprocesses = max(self.peak_subprocesses, len(descendants))
+        rss = _rss_bytes(me) + sum(_rss_bytes(pid) for pid in descendants)
+        self.peak_tree_rss_bytes = max(self.peak_tree_rss_bytes, rss)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        if self.available:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def result(self) -> dict:
+        if not self.available:
+            return {}
+        return {"peak_subprocesses": self.peak_subprocesses, "peak_tree_rss_bytes": self.peak_tree_rss_bytes}
+
+
+def _max_rss() -> dict:
+    if resource is None:
+        return {}
+    # ru_maxrss is in KiB on Linux; RUSAGE_CHILDREN is the largest single (reaped) child
+    return {
+        "self_max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "children_max_rss_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+    }
+
+
+# -----------------
+# Workflow drivers
+# -----------------
+def _drive_pipeline(prompt: str, max_retries: int) -> bool:
+    from workflow.pipeline import run_autodev_once
+
+    result = run_autodev_once(prompt, max_retries=max_retries, launch_ui=False)
+    return result.get("status") == "completed"
+
+
+def _drive_graph(prompt: str, thread_id: str, speculative: bool) -> bool:
+    from core.config import settings
+    from workflow.lang_graph_pipeline import app, speculative_app, get_checkpointed_app
+
+    if settings.WORKFLOW_CHECKPOINTS_ENABLED:
+        graph = get_checkpointed_app(speculative)
+    else:
+        graph = speculative_app if speculative else app
+    config = {"configurable": {"thread_id": thread_id}, "recursion_limit": 50}
+    final = graph.invoke({"user_prompt": prompt, "debug_reports": []}, config)
+    return bool((final.get("results") or {}).get("success")) and "summary" in final
+
+
+def _stage_latency(trace_path: str) -> dict:
+    durations = {}
+    if not os.path.exists(trace_path):
+        return {}
+    with open(trace_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["name"].startswith(STAGE_PREFIXES):
+                durations.setdefault(record["name"], []).append(record["duration_ms"] / 1000)
+    return {name: _summary(samples) for name, samples in sorted(durations.items())}
+
+
+def run_level(mode: str, concurrency: int, workflows: int, scenarios: list, stub: StubLLMServer,
+              work_dir: str, max_retries: int) -> dict:
+    from core.config import settings
+
+    trace_path = os.path.join(work_dir, f"traces-{mode}-c{concurrency}.jsonl")
+    settings.TRACE_PATH = trace_path
+    prompts = [SCENARIOS[scenarios[i % len(scenarios)]]["prompt"] for i in range(workflows)]
+    latencies, outcomes = [], []
+    lock = threading.Lock()
+
+    def one(i: int):
+        started = time.perf_counter()
+        try:
+            if mode == "pipeline":
+                ok = _drive_pipeline(prompts[i], max_retries)
+            else:
+                ok = _drive_graph(prompts[i], f"bench-{mode}-c{concurrency}-{i}", speculative=mode == "speculative")
+        except Exception as e:
+            print(f"  workflow {i} ({mode}) raised {type(e).__name__}: {e}", file=sys.stderr)
+            ok = False
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            outcomes.append(ok)
+
+    requests_before = stub.requests
+    with TreeSampler() as sampler, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        list(pool.map(one, range(workflows)))
+        wall = time.perf_counter() - started
+    stages = _stage_latency(trace_path)
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "workflows": workflows,
+        "completed": sum(outcomes),
+        "failed": workflows - sum(outcomes),
+        "wall_seconds": round(wall, 3),
+        "throughput_per_min": round(workflows / wall * 60, 3),
+        "workflow_latency": _summary(latencies),
+        "stages": stages,
+        "llm_requests": stub.requests - requests_before,
+        "executions": stages.get("executor.run", {}).get("count", 0),
+        **sampler.result(),
+        **_max_rss(),
+    }
+
+
+# -----------------
+# Output
+# -----------------
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _print_level(level: dict):
+    print(f"{level['mode']:>11} c={level['concurrency']:<3} {level['completed']}/{level['workflows']} ok  "
+          f"{level['throughput_per_min']:.1f} wf/min  p50 {level['workflow_latency'].get('p50_ms', 0):.0f}ms  "
+          f"llm {level['llm_requests']}  exec {level['executions']}  "
+          f"peak subprocs {level.get('peak_subprocesses', '?')}  "
+          f"peak tree RSS {level.get('peak_tree_rss_bytes', 0) / 2 ** 20:.0f}MiB")
+    for name, stats in level["stages"].items():
+        if name.startswith(("node.", "executor.", "llm.")):
+            print(f"{'':16}{name:<28} n={stats['count']:<4} p50 {stats['p50_ms']:>9.1f}ms  p95 {stats['p95_ms']:>9.1f}ms")
+
+
+def _compare(report: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(level["mode"], level["concurrency"]): level for level in baseline.get("results", [])}
+    print(f"\nvs baseline {baseline_path} ({baseline.get('meta', {}).get('git_revision')}):")
+    for level in report["results"]:
+        before = old.get((level["mode"], level["concurrency"]))
+        if before is None:
+            continue
+        change = (level["throughput_per_min"] / before["throughput_per_min"] - 1) * 100 \
+            if before["throughput_per_min"] else 0.0
+        print(f"{level['mode']:>11} c={level['concurrency']:<3} throughput {change:+.1f}%")
+        for name, stats in level["stages"].items():
+            prev = before["stages"].get(name)
+            if prev and prev.get("p50_ms") and name.startswith(("node.", "executor.")):
+                print(f"{'':16}{name:<28} p50 {(stats['p50_ms'] / prev['p50_ms'] - 1) * 100:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="pipeline,graph", help=f"comma-separated subset of {','.join(MODES)}")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated concurrent workflow counts")
+    parser.add_argument("--workflows", type=int, default=0,
+                        help="workflows per level (default: max(concurrency, number of scenarios))")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server delay per request (s)")
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--checkpoints", action="store_true", help="compile the graphs with a SQLite checkpointer")
+    parser.add_argument("--output", help="JSON report path")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary work directory")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    for name in modes:
+        if name not in MODES:
+            parser.error(f"unknown mode {name!r}")
+    for name in scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}")
+
+    work_dir = tempfile.mkdtemp(prefix="autodev-bench-")
+    with StubLLMServer(latency=args.latency, responder=respond) as stub:
+        # Settings are read at import time: configure before importing anything from the app
+        os.environ.update({
+            "LLM_BASE_URL": stub.base_url,
+            "NVIDIA_API_KEY": "stub",
+            "LLM_CACHE_ENABLED": "false",
+            "DATASET_CACHE_ENABLED": "false",
+            "DATASET_CATALOG_ENABLED": "false",
+            "CODER_CANDIDATES": os.environ.get("CODER_CANDIDATES", "1"),
+            "WORKFLOW_CHECKPOINTS_ENABLED": "true" if args.checkpoints else "false",
+            "WORKFLOW_CHECKPOINT_URL": os.path.join(work_dir, "checkpoints.sqlite3"),
+            "PROJECTS_DIR": os.path.join(work_dir, "projects"),
+            "TRACE_ENABLED": "true",
+            "TRACE_PATH": os.path.join(work_dir, "traces.jsonl"),
+            "TRACE_MAX_BYTES": "0",
+        })
+        from core.logging_config import configure_logging
+
+        configure_logging(args.log_level)
+        # Import cost (LangChain, LangGraph, graph compilation) is kept out of the first level
+        import workflow.pipeline  # noqa: F401
+        import workflow.lang_graph_pipeline  # noqa: F401
+
+        results = []
+        try:
+            for mode in modes:
+                for concurrency in levels:
+                    workflows = args.workflows or max(concurrency, len(scenarios))
+                    level = run_level(mode, concurrency, workflows, scenarios, stub, work_dir, args.max_retries)
+                    _print_level(level)
+                    results.append(level)
+        finally:
+            if args.keep:
+                print(f"Work directory kept at {work_dir}")
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    from service.structured_output import structured_output_stats
+
+    report = {
+        "meta": {
+            "benchmark": "pipeline",
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stub_latency_seconds": args.latency,
+            "scenarios": scenarios,
+            "checkpoints": args.checkpoints,
+            "max_retries": args.max_retries,
+        },
+        "results": results,
+        "structured_output": structured_output_stats(),
+    }
+    output = args.output or os.path.join(
+        BACKEND_DIR, ".cache", "benchmarks", f"pipeline-{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {output}")
+
+    if args.baseline:
+        _compare(report, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
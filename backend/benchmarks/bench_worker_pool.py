@@ -0,0 +1,78 @@
+"""
+Start latency of a cold `python script.py` vs. a fork of a warm, pre-imported zygote.
+
+    cd backend && python -m benchmarks.bench_worker_pool --attempts 3
+
+The probe script imports the same stack a generated ml_pipeline.py does, so the numbers
+reflect what each debug-loop retry pays before any training starts. `--attempts`
+defaults to the typical retry count of run_autodev_once.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service.worker_pool import DEFAULT_PRELOAD, WarmWorkerPool, is_supported
+
+PROBE = """
+import importlib
+for name in {modules!r}:
+    try:
+        importlib.import_module(name)
+    except Exception:
+        pass
+print("EXECUTION_COMPLETE")
+"""
+
+
+def _cold(path: str, cwd: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, path], cwd=cwd, capture_output=True, check=False)
+    return time.perf_counter() - start
+
+
+def _warm(pool: WarmWorkerPool, path: str, cwd: str) -> float:
+    start = time.perf_counter()
+    pool.run(path, cwd, lambda stream, line: None, timeout=600)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=3, help="executions per mode (debug retries)")
+    parser.add_argument("--modules", default=",".join(DEFAULT_PRELOAD))
+    args = parser.parse_args()
+
+    if not is_supported():
+        sys.exit("Warm worker pool is not supported on this platform")
+
+    modules = [m for m in args.modules.split(",") if m]
+    with tempfile.TemporaryDirectory() as cwd:
+        path = os.path.join(cwd, "probe.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(PROBE.format(modules=modules))
+
+        cold = [_cold(path, cwd) for _ in range(args.attempts)]
+
+        boot_start = time.perf_counter()
+        pool = WarmWorkerPool(size=1, preload=modules).start()
+        boot = time.perf_counter() - boot_start
+        try:
+            warm = [_warm(pool, path, cwd) for _ in range(args.attempts)]
+        finally:
+            pool.shutdown()
+
+    print(f"zygote boot (one-off): {boot * 1000:.1f} ms")
+    print(f"{'mode':<8}{'mean ms':>10}{'max ms':>10}{'total ms':>10}")
+    for name, samples in (("cold", cold), ("warm", warm)):
+        print(f"{name:<8}{statistics.mean(samples) * 1000:>10.1f}"
+              f"{max(samples) * 1000:>10.1f}{sum(samples) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
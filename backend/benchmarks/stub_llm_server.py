@@ -0,0 +1,89 @@
+# Minimal OpenAI-compatible chat completions server for offline benchmarks.
+# Speaks HTTP/1.1 keep-alive so connection reuse by the client is observable.
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        server: "StubLLMServer" = self.server.stub
+        server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        content = server.responder(body)
+        payload = json.dumps(_completion(body.get("model", "stub"), content)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def process_request(self, request, client_address):
+        self.stub.connections += 1
+        super().process_request(request, client_address)
+
+
+class StubLLMServer:
+    """
+    Threaded stub of `POST /v1/chat/completions`. `responder(body) -> str` decides the
+    assistant message; `latency` adds a fixed server-side delay per request.
+    """
+
+    def __init__(self, latency: float = 0.0, responder=None, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.responder = responder or (lambda body: "ok")
+        self.requests = 0
+        self.connections = 0
+        self._httpd = _CountingServer((host, port), _Handler)
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -27,6 +27,121 @@ class Settings:
     EMAIL_PORT: int = int(os.getenv("EMAIL_PORT", "587"))
     EMAIL_ADDRESS: str = os.getenv("EMAIL_ADDRESS")
     EMAIL_PASSWORD: str = os.getenv("EMAIL_PASSWORD")
+    # Outbound email queue (see service/email_queue.py)
+    EMAIL_USE_TLS: bool = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
+    EMAIL_QUEUE_WORKERS: int = int(os.getenv("EMAIL_QUEUE_WORKERS", "2"))
+    EMAIL_QUEUE_MAX: int = int(os.getenv("EMAIL_QUEUE_MAX", "1000"))
+    EMAIL_MAX_RETRIES: int = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+    EMAIL_RETRY_BACKOFF: float = float(os.getenv("EMAIL_RETRY_BACKOFF", "1"))
+    EMAIL_IDLE_TIMEOUT: float = float(os.getenv("EMAIL_IDLE_TIMEOUT", "60"))
+    # OTPs and per-email rate limits (see service/otp_store.py): memory, sql or redis
+    OTP_STORE_BACKEND: str = os.getenv("OTP_STORE_BACKEND", "sql")
+    OTP_TTL_SECONDS: float = float(os.getenv("OTP_TTL_SECONDS", "300"))
+    OTP_RATE_LIMIT: int = int(os.getenv("OTP_RATE_LIMIT", "3"))
+    OTP_RATE_WINDOW_SECONDS: float = float(os.getenv("OTP_RATE_WINDOW_SECONDS", "900"))
+    OTP_MAX_ATTEMPTS: int = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+    OTP_MEMORY_MAX_ENTRIES: int = int(os.getenv("OTP_MEMORY_MAX_ENTRIES", "100000"))
+    OTP_SWEEP_INTERVAL: float = float(os.getenv("OTP_SWEEP_INTERVAL", "60"))
+    OTP_REDIS_URL: str = os.getenv("OTP_REDIS_URL", "redis://localhost:6379/0")
+    # bcrypt in a process pool (see service/password_hasher.py); 0 processes = one per CPU
+    PASSWORD_HASH_POOL: bool = os.getenv("PASSWORD_HASH_POOL", "true").lower() == "true"
+    PASSWORD_HASH_PROCESSES: int = int(os.getenv("PASSWORD_HASH_PROCESSES", "0"))
+    # Database connection pools (see db/session.py); the sync and async engines each get one
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Access-token -> user snapshot cache (see service/auth_cache.py); the shared path is optional
+    AUTH_CACHE_ENABLED: bool = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_CACHE_SHARED_PATH: str = os.getenv("AUTH_CACHE_SHARED_PATH", "")
+    AUTH_CACHE_SYNC_INTERVAL: float = float(os.getenv("AUTH_CACHE_SYNC_INTERVAL", "1"))
+    # LLM client pool (see service/llm_client.py)
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "https://integrate.api.nvidia.com/v1")
+    LLM_POOL_MAX_CONNECTIONS: int = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+    LLM_POOL_MAX_KEEPALIVE: int = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+    LLM_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+    LLM_REQUEST_TIMEOUT: float = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+    LLM_CONNECT_TIMEOUT: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    # Warm worker pool for generated scripts (see service/worker_pool.py)
+    EXECUTOR_WARM_POOL: bool = os.getenv("EXECUTOR_WARM_POOL", "false").lower() == "true"
+    EXECUTOR_POOL_SIZE: int = int(os.getenv("EXECUTOR_POOL_SIZE", "2"))
+    EXECUTOR_PRELOAD: str = os.getenv(
+        "EXECUTOR_PRELOAD",
+        "numpy,pandas,sklearn.model_selection,sklearn.preprocessing,sklearn.ensemble,"
+        "sklearn.linear_model,sklearn.metrics,matplotlib.pyplot,seaborn,gradio",
+    )
+    EXECUTOR_MEMORY_LIMIT_MB: int = int(os.getenv("EXECUTOR_MEMORY_LIMIT_MB", "0"))
+    # Job scheduler (see service/job_scheduler.py); 0 = one slot per CPU
+    JOB_MAX_CONCURRENCY: int = int(os.getenv("JOB_MAX_CONCURRENCY", "0"))
+    JOB_SLOTS_PER_ACCOUNT: str = os.getenv("JOB_SLOTS_PER_ACCOUNT", "free:1,premium:2,enterprise:4")
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+    # Running jobs whose worker hasn't renewed the lease for this long are requeued
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    # Multi-candidate coder: >1 generates that many scripts and races them (0 = cpu_count // 2 at once)
+    CODER_CANDIDATES: int = int(os.getenv("CODER_CANDIDATES", "1"))
+    CANDIDATE_MAX_PARALLEL: int = int(os.getenv("CANDIDATE_MAX_PARALLEL", "0"))
+    # Debug loop: "patch" asks for a unified diff first, "rewrite" always regenerates the script
+    DEBUG_AGENT_MODE: str = os.getenv("DEBUG_AGENT_MODE", "patch")
+    # Evaluator: metrics are parsed from stdout; the LLM narrative is opt-in (see agents/evaluator_agent.py)
+    EVALUATOR_NARRATIVE: bool = os.getenv("EVALUATOR_NARRATIVE", "false").lower() == "true"
+    EVALUATOR_TAIL_LINES: int = int(os.getenv("EVALUATOR_TAIL_LINES", "40"))
+    # Execution output sent to an agent is compacted to this budget (see service/log_compaction.py)
+    LOG_COMPACT_MAX_TOKENS: int = int(os.getenv("LOG_COMPACT_MAX_TOKENS", "3000"))
+    LOG_COMPACT_HEAD_LINES: int = int(os.getenv("LOG_COMPACT_HEAD_LINES", "40"))
+    LOG_COMPACT_TAIL_LINES: int = int(os.getenv("LOG_COMPACT_TAIL_LINES", "80"))
+    LOG_COMPACT_MAX_LINE_CHARS: int = int(os.getenv("LOG_COMPACT_MAX_LINE_CHARS", "400"))
+    # Shared dataset store (see service/dataset_cache.py)
+    DATASET_CACHE_ENABLED: bool = os.getenv("DATASET_CACHE_ENABLED", "true").lower() == "true"
+    DATASET_CACHE_DIR: str = os.getenv(
+        "DATASET_CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "datasets"),
+    )
+    DATASET_CACHE_MAX_BYTES: int = int(os.getenv("DATASET_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+    # A run's hold on a store entry; leases older than this (the run died) stop blocking eviction
+    DATASET_CACHE_LEASE_SECONDS: float = float(os.getenv("DATASET_CACHE_LEASE_SECONDS", str(6 * 3600)))
+    # Dataset catalog (see service/dataset_catalog.py): matches at/above the score skip the research LLM
+    DATASET_CATALOG_ENABLED: bool = os.getenv("DATASET_CATALOG_ENABLED", "true").lower() == "true"
+    DATASET_CATALOG_MIN_SCORE: float = float(os.getenv("DATASET_CATALOG_MIN_SCORE", "0.55"))
+    # LangGraph checkpoints (see service/checkpoint_store.py): a SQLite path or a postgresql:// URL
+    WORKFLOW_CHECKPOINTS_ENABLED: bool = os.getenv("WORKFLOW_CHECKPOINTS_ENABLED", "true").lower() == "true"
+    WORKFLOW_CHECKPOINT_URL: str = os.getenv(
+        "WORKFLOW_CHECKPOINT_URL",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "checkpoints.sqlite3"),
+    )
+    # Where each run's project directory (dataset/, models/, artifacts/, code/) is created
+    PROJECTS_DIR: str = os.getenv(
+        "PROJECTS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "projects")
+    )
+    # Content-addressed store under PROJECTS_DIR/.blobs shared by all projects (see service/blob_store.py)
+    BLOB_STORE_ENABLED: bool = os.getenv("BLOB_STORE_ENABLED", "true").lower() == "true"
+    BLOB_STORE_MIN_BYTES: int = int(os.getenv("BLOB_STORE_MIN_BYTES", "4096"))
+    BLOB_GC_INTERVAL: float = float(os.getenv("BLOB_GC_INTERVAL", "3600"))
+    BLOB_GC_GRACE_SECONDS: float = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+    # Logging / tracing (see core/logging_config.py, service/tracing.py)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    TRACE_ENABLED: bool = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+    TRACE_PATH: str = os.getenv(
+        "TRACE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "traces.jsonl"),
+    )
+    TRACE_MAX_BYTES: int = int(os.getenv("TRACE_MAX_BYTES", str(100 * 1024 * 1024)))
+    # USD per 1K tokens, for the cost estimate on LLM spans (0 = don't estimate)
+    LLM_COST_PER_1K_PROMPT_TOKENS: float = float(os.getenv("LLM_COST_PER_1K_PROMPT_TOKENS", "0"))
+    LLM_COST_PER_1K_COMPLETION_TOKENS: float = float(os.getenv("LLM_COST_PER_1K_COMPLETION_TOKENS", "0"))
+    # LLM response cache (see service/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv(
+        "LLM_CACHE_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), ".cache", "llm_cache.sqlite3"),
+    )
+    LLM_CACHE_POLICIES: str = os.getenv("LLM_CACHE_POLICIES", "lru,ttl,size")
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
 
 settings = Settings()
 
@@ -0,0 +1,15 @@
+import logging
+
+from core.config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+def configure_logging(level: str | None = None):
+    """Leveled logging for the API and the workflow (LOG_LEVEL, default INFO)."""
+    level = (level or settings.LOG_LEVEL).upper()
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    logging.getLogger().setLevel(level)
+    # Per-request noise from the HTTP stack
+    for name in ("httpx", "httpcore", "openai"):
+        logging.getLogger(name).setLevel(max(logging.WARNING, logging.getLogger().level))
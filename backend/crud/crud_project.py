@@ -0,0 +1,81 @@
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+from db.models import Project, Dataset, Code, Model, Artifact
+
+
+def create_project(db: Session, user_id: int, project_name: str, description: str | None = None):
+    project = Project(
+        user_id=user_id,
+        project_name=project_name,
+        description=description,
+        status="running",
+    )
+    db.add(project)
+    db.commit()
+    db.refresh(project)
+    return project
+
+
+def update_project(db: Session, project_id: int, **values):
+    project = db.get(Project, project_id)
+    if project is None:
+        return None
+    for key, value in values.items():
+        setattr(project, key, value)
+    db.commit()
+    return project
+
+
+def upsert_dataset(db: Session, project_id: int, hf_id: str, **values):
+    """Create or update the project's row for `hf_id`."""
+    dataset = (
+        db.query(Dataset)
+        .filter(Dataset.project_id == project_id, Dataset.hf_id == hf_id)
+        .first()
+    )
+    if dataset is None:
+        dataset = Dataset(project_id=project_id, hf_id=hf_id, filename=hf_id, file_path=f"hf://{hf_id}")
+        db.add(dataset)
+    for key, value in values.items():
+        setattr(dataset, key, value)
+    db.commit()
+    return dataset
+
+
+def record_dataset(db: Session, project_id: int, spec: dict, cache_entry: dict, size_bytes: int | None = None):
+    """Upsert the project's link to a shared dataset store entry."""
+    return upsert_dataset(
+        db, project_id, spec["hf_id"],
+        file_path=cache_entry["link_path"],
+        revision=spec["revision"],
+        split=spec["split"],
+        cache_key=cache_entry["key"],
+        cache_path=cache_entry["cache_path"],
+        size_bytes=size_bytes,
+    )
+
+
+def list_catalog_datasets(db: Session, limit: int = 5000):
+    """Datasets that a successful run loaded, newest first (the dataset catalog's source)."""
+    return (
+        db.query(Dataset)
+        .filter(Dataset.hf_id.isnot(None), Dataset.plan_summary.isnot(None))
+        .order_by(Dataset.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def list_project_files(db: Session, project_id: int):
+    """Every indexed file of the project (service/artifact_index.py) in one UNION ALL query."""
+    selects = []
+    for kind, table in (("code", Code), ("model", Model), ("dataset", Dataset), ("artifact", Artifact)):
+        query = select(
+            literal(kind).label("kind"), table.filename, table.file_path,
+            table.size_bytes, table.mtime, table.sha256,
+        ).where(table.project_id == project_id)
+        if table is Dataset:
+            query = query.where(Dataset.sha256.isnot(None))  # files, not dataset store links
+        selects.append(query)
+    files = union_all(*selects).subquery()
+    return db.execute(select(files).order_by(files.c.filename)).mappings().all()
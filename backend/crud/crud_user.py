@@ -1,32 +1,47 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.future import select
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.models import User
 from schema.user import UserCreate
-import uuid
+from service.auth_cache import invalidate_user
 
 
-def get_user_by_email(db: Session, email: str):
-    result = db.execute(select(User).where(User.email == email))
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
     return result.scalar_one_or_none()
 
 
-def get_user(db: Session, user_id: str):
-    result = db.execute(select(User).where(User.id == user_id))
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(User, user_id)
+
+
+async def get_user_by_name(db: AsyncSession, name: str, case_insensitive: bool = False):
+    if case_insensitive:
+        condition = func.lower(User.name) == name.lower().strip()
+    else:
+        condition = User.name == name
+    result = await db.execute(select(User).where(condition).limit(1))
     return result.scalar_one_or_none()
 
 
-def create_user(db: Session, user: UserCreate):
+async def create_user(db: AsyncSession, user: UserCreate, password_hash: str):
     db_user = User(
-        id=uuid.uuid4(),
         name=user.name,
         email=user.email,
-        password_hash=user.password,
+        password=password_hash,
         is_verified=True,
         api_key=user.api_key,
-        account_type=user.account_type
-
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+
+async def update_user(db: AsyncSession, user: User, **values):
+    for key, value in values.items():
+        setattr(user, key, value)
+    await db.commit()
+    await db.refresh(user)
+    # Cached snapshots of this user (any token) are stale now
+    invalidate_user(user.id)
+    return user
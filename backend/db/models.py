@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, EmailStr, Field
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, JSON
+from sqlalchemy import Column, BigInteger, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -23,6 +23,7 @@ class User(Base):
     
     # Relationships
     projects = relationship("Project", back_populates="user")
+    jobs = relationship("Job", back_populates="user")
 
 class Project(Base):
     __tablename__ = "projects"
@@ -46,44 +47,128 @@ class Project(Base):
 
 class Dataset(Base):
     __tablename__ = "datasets"
+    __table_args__ = (
+        Index("ix_datasets_project_filename", "project_id", "filename"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
+    # Shared dataset store entry (service/dataset_cache.py) this project reads from
+    hf_id = Column(String, nullable=True, index=True)
+    revision = Column(String, nullable=True)
+    split = Column(String, nullable=True)
+    cache_key = Column(String, nullable=True, index=True)
+    cache_path = Column(String, nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    # Files under the project's dataset/ folder (service/artifact_index.py); null for store links
+    mtime = Column(Float, nullable=True)
+    sha256 = Column(String(64), nullable=True)
+    # Research output + the plan it answered; feeds the dataset catalog (service/dataset_catalog.py)
+    task = Column(String, nullable=True)
+    target = Column(String, nullable=True)
+    features = Column(JSON, nullable=True)
+    load_snippet = Column(Text, nullable=True)
+    notes = Column(Text, nullable=True)
+    plan_summary = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     project = relationship("Project", back_populates="datasets")
 
 class Code(Base):
     __tablename__ = "codes"
+    __table_args__ = (
+        Index("ix_codes_project_filename", "project_id", "filename"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    filename = Column(String, nullable=False)
+    filename = Column(String, nullable=False)  # path relative to the project folder
     file_path = Column(String, nullable=False)
+    # Recorded by service/artifact_index.py after execution
+    size_bytes = Column(BigInteger, nullable=True)
+    mtime = Column(Float, nullable=True)
+    sha256 = Column(String(64), nullable=True)
     
     # Relationships
     project = relationship("Project", back_populates="codes")
 
 class Model(Base):
     __tablename__ = "models"
+    __table_args__ = (
+        Index("ix_models_project_filename", "project_id", "filename"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    filename = Column(String, nullable=False)
+    filename = Column(String, nullable=False)  # path relative to the project folder
     file_path = Column(String, nullable=False)
+    # Recorded by service/artifact_index.py after execution
+    size_bytes = Column(BigInteger, nullable=True)
+    mtime = Column(Float, nullable=True)
+    sha256 = Column(String(64), nullable=True)
     
     # Relationships
     project = relationship("Project", back_populates="models")
 
 class Artifact(Base):
     __tablename__ = "artifacts"
+    __table_args__ = (
+        Index("ix_artifacts_project_filename", "project_id", "filename"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    filename = Column(String, nullable=False)
+    filename = Column(String, nullable=False)  # path relative to the project folder
     file_path = Column(String, nullable=False)
+    # Recorded by service/artifact_index.py after execution
+    size_bytes = Column(BigInteger, nullable=True)
+    mtime = Column(Float, nullable=True)
+    sha256 = Column(String(64), nullable=True)
     
     # Relationships
-    project = relationship("Project", back_populates="artifacts")
\ No newline at end of file
+    project = relationship("Project", back_populates="artifacts")
+
+class Job(Base):
+    """A queued AutoDev workflow run; picked up by service/job_scheduler.py."""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_priority_created", "status", "priority", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    prompt = Column(Text, nullable=False)
+    # "pipeline" runs workflow/pipeline.py; "graph_start" / "graph_resume" / "graph_replay"
+    # run the checkpointed graph through workflow/runs.py with `options`
+    kind = Column(String, default="pipeline", nullable=False)
+    options = Column(JSON, nullable=True)  # {"speculative": bool, "node": str}
+    status = Column(String, default="queued", nullable=False)  # queued, running, completed, failed, cancelled
+    priority = Column(Integer, default=0, nullable=False)
+    max_retries = Column(Integer, default=2, nullable=False)
+    stage = Column(String, nullable=True)
+    progress = Column(Float, default=0.0)
+    cancel_requested = Column(Boolean, default=False)
+    lease_owner = Column(String, nullable=True)  # worker running the job (service/job_scheduler.py)
+    lease_expires_at = Column(DateTime, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Relationships
+    user = relationship("User", back_populates="jobs")
+
+class EphemeralKey(Base):
+    """Short-lived key/value rows (OTPs, rate-limit counters); see service/otp_store.py."""
+    __tablename__ = "ephemeral_keys"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=True)
+    counter = Column(Integer, default=0, nullable=False)
+    # Indexed: reads filter on it and the sweeper deletes by range
+    expires_at = Column(Float, nullable=False, index=True)
@@ -1,19 +1,51 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from core.logging_config import configure_logging
 
 from db.session import get_db
 from db.models import Base
-from db.session import engine
+from db.session import engine, async_engine
 
-from api.routes import auth, user
+from api.routes import auth, user, workflow, jobs
+from service.llm_client import aclose_llm_clients, llm_cache_stats
+from service.tracing import metrics, render_metrics
+from service.auth_cache import auth_cache_stats
+from service.structured_output import structured_output_stats
+from service.worker_pool import shutdown_worker_pool
+from service.job_scheduler import start_scheduler, stop_scheduler
+from service.password_hasher import start_password_hasher, shutdown_password_hasher
+from service.email_queue import stop_email_queue
+from service.otp_store import close_otp_store
 
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# Create the DB tables (if not using Alembic yet)
+configure_logging()
+
+# Create missing DB tables; columns added to existing tables come from `alembic upgrade head`
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Quiz Platform", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_scheduler()
+    start_password_hasher()
+    yield
+    stop_scheduler()
+    # Flush queued OTP emails before the process goes away
+    stop_email_queue()
+    await close_otp_store()
+    shutdown_password_hasher()
+    # Release pooled keep-alive connections to the LLM gateway
+    await aclose_llm_clients()
+    shutdown_worker_pool()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Quiz Platform", version="1.0.0", lifespan=lifespan)
 
 
 
@@ -28,6 +60,27 @@ app.add_middleware(
 
 app.include_router(auth.router)
 app.include_router(user.router)
+app.include_router(workflow.router)
+app.include_router(jobs.router)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint: span timings, LLM tokens/cost/retries, executor CPU/RSS, auth cache, agent JSON parse rates."""
+    stats = llm_cache_stats()
+    if stats.get("enabled", True):
+        for key in ("entries", "bytes", "hit_rate"):
+            if key in stats:
+                metrics.set(f"autodev_llm_cache_{key}", stats[key], "LLM response cache state")
+    auth = auth_cache_stats()
+    if auth.get("enabled", True):
+        for key in ("entries", "hit_rate"):
+            metrics.set(f"autodev_auth_cache_{key}", auth[key], "Access-token cache state")
+    for agent, parsed in structured_output_stats().items():
+        for key in ("parse_rate", "success_rate"):
+            metrics.set(f"autodev_structured_output_{key}", parsed[key], "Agent JSON replies usable (first try / after repair)",
+                        agent=agent)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 
 @app.get("/")
 def root():
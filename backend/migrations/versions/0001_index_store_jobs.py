@@ -0,0 +1,152 @@
+"""File index, dataset store/catalog columns, job queue and ephemeral keys
+
+Brings a database created from the original models up to db/models.py. Databases that
+main.py's create_all already touched may have some of this (new tables, never new
+columns), so every step only adds what is missing.
+
+Revision ID: 0001_index_store_jobs
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_index_store_jobs"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+FILE_TABLES = ("codes", "models", "artifacts", "datasets")
+
+
+def _file_columns():
+    # service/artifact_index.py
+    return [
+        sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("mtime", sa.Float(), nullable=True),
+        sa.Column("sha256", sa.String(length=64), nullable=True),
+    ]
+
+
+def _dataset_columns():
+    return [
+        # service/dataset_cache.py
+        sa.Column("hf_id", sa.String(), nullable=True),
+        sa.Column("revision", sa.String(), nullable=True),
+        sa.Column("split", sa.String(), nullable=True),
+        sa.Column("cache_key", sa.String(), nullable=True),
+        sa.Column("cache_path", sa.String(), nullable=True),
+        # service/dataset_catalog.py
+        sa.Column("task", sa.String(), nullable=True),
+        sa.Column("target", sa.String(), nullable=True),
+        sa.Column("features", sa.JSON(), nullable=True),
+        sa.Column("load_snippet", sa.Text(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("plan_summary", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    ]
+
+
+def _job_columns():
+    # service/job_scheduler.py: graph runs and worker leases
+    return [
+        sa.Column("kind", sa.String(), nullable=False, server_default="pipeline"),
+        sa.Column("options", sa.JSON(), nullable=True),
+        sa.Column("lease_owner", sa.String(), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+    ]
+
+
+def _add_missing_columns(inspector, table: str, columns: list):
+    existing = {c["name"] for c in inspector.get_columns(table)}
+    missing = [c for c in columns if c.name not in existing]
+    if missing:
+        with op.batch_alter_table(table) as batch:
+            for column in missing:
+                batch.add_column(column)
+
+
+def _create_missing_index(inspector, table: str, name: str, columns: list):
+    if name not in {i["name"] for i in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table in FILE_TABLES:
+        _add_missing_columns(inspector, table, _file_columns())
+    _add_missing_columns(inspector, "datasets", _dataset_columns())
+
+    inspector = sa.inspect(bind)  # refresh after the ALTERs
+    size = next(c for c in inspector.get_columns("datasets") if c["name"] == "size_bytes")
+    if not isinstance(size["type"], sa.BigInteger):
+        # First shipped as Integer; dataset store entries pass 2 GiB
+        with op.batch_alter_table("datasets") as batch:
+            batch.alter_column("size_bytes", existing_type=size["type"], type_=sa.BigInteger(),
+                               existing_nullable=True)
+
+    for table in FILE_TABLES:
+        _create_missing_index(inspector, table, f"ix_{table}_project_filename", ["project_id", "filename"])
+    _create_missing_index(inspector, "datasets", "ix_datasets_hf_id", ["hf_id"])
+    _create_missing_index(inspector, "datasets", "ix_datasets_cache_key", ["cache_key"])
+
+    if "jobs" in tables:
+        _add_missing_columns(inspector, "jobs", _job_columns())
+    else:
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=True),
+            sa.Column("prompt", sa.Text(), nullable=False),
+            *_job_columns(),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("priority", sa.Integer(), nullable=False),
+            sa.Column("max_retries", sa.Integer(), nullable=False),
+            sa.Column("stage", sa.String(), nullable=True),
+            sa.Column("progress", sa.Float(), nullable=True),
+            sa.Column("cancel_requested", sa.Boolean(), nullable=True),
+            sa.Column("result", sa.JSON(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_jobs_id", "jobs", ["id"])
+        op.create_index("ix_jobs_user_id", "jobs", ["user_id"])
+        op.create_index("ix_jobs_status_priority_created", "jobs", ["status", "priority", "created_at"])
+
+    if "ephemeral_keys" not in tables:
+        op.create_table(
+            "ephemeral_keys",
+            sa.Column("key", sa.String(), primary_key=True),
+            sa.Column("value", sa.String(), nullable=True),
+            sa.Column("counter", sa.Integer(), nullable=False),
+            sa.Column("expires_at", sa.Float(), nullable=False),
+        )
+        op.create_index("ix_ephemeral_keys_expires_at", "ephemeral_keys", ["expires_at"])
+
+
+def downgrade():
+    op.drop_index("ix_ephemeral_keys_expires_at", table_name="ephemeral_keys")
+    op.drop_table("ephemeral_keys")
+    op.drop_index("ix_jobs_status_priority_created", table_name="jobs")
+    op.drop_index("ix_jobs_user_id", table_name="jobs")
+    op.drop_index("ix_jobs_id", table_name="jobs")
+    op.drop_table("jobs")
+
+    op.drop_index("ix_datasets_cache_key", table_name="datasets")
+    op.drop_index("ix_datasets_hf_id", table_name="datasets")
+    for table in FILE_TABLES:
+        op.drop_index(f"ix_{table}_project_filename", table_name=table)
+    with op.batch_alter_table("datasets") as batch:
+        for column in _dataset_columns():
+            batch.drop_column(column.name)
+    for table in FILE_TABLES:
+        with op.batch_alter_table(table) as batch:
+            for column in _file_columns():
+                batch.drop_column(column.name)
@@ -0,0 +1,58 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+
+def _as_list(value):
+    """LLMs often answer a list field with one comma-separated string."""
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return value
+
+
+class Plan(BaseModel):
+    """Master agent output."""
+    model_config = ConfigDict(extra="allow")
+
+    problem: str = Field(..., min_length=1)
+    dataset_requirements: str | list | dict
+    model_family: str | list
+    metrics: list[str] = Field(..., min_length=1)
+    notes: str | list | dict = ""
+
+    @field_validator("metrics", mode="before")
+    @classmethod
+    def split_metrics(cls, value):
+        return _as_list(value)
+
+
+class DatasetInfo(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    name: str = Field(..., min_length=1)
+    hf_id: str = Field(..., min_length=1)
+    task: str = ""
+    target: str | list | None = None
+    features: list = []
+    load_snippet: str = ""
+    notes: str = ""
+
+    @field_validator("features", mode="before")
+    @classmethod
+    def split_features(cls, value):
+        return _as_list(value)
+
+
+class DatasetResult(BaseModel):
+    """Research agent output."""
+    model_config = ConfigDict(extra="allow")
+
+    dataset: DatasetInfo
+
+
+class Evaluation(BaseModel):
+    """Evaluator agent output."""
+    model_config = ConfigDict(extra="allow")
+
+    summary: str
+    metrics: dict = {}
+    insights: str | list = ""
+    recommendations: str | list = ""
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class JobCreate(BaseModel):
+    prompt: str = Field(..., min_length=1)
+    priority: int = Field(0, ge=0, le=10)
+    max_retries: int = Field(2, ge=0, le=10)
+
+
+class JobResponse(BaseModel):
+    id: int
+    prompt: str
+    status: str
+    priority: int
+    stage: str | None = None
+    progress: float = 0.0
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobDetailResponse(JobResponse):
+    result: dict | None = None
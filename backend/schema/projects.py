@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+
+
+class CodeStreamRequest(BaseModel):
+    plan: dict
+    dataset: dict
+    project_name: str = Field(..., pattern=r"^[A-Za-z0-9_\-]+$")
+
+
+class WorkflowRunCreate(BaseModel):
+    prompt: str = Field(..., min_length=1)
+    speculative: bool = False
+
+
+class WorkflowRunResponse(BaseModel):
+    project_id: int
+    job_id: int | None = None  # poll /jobs/{job_id}; the run waits for a scheduler slot
+    thread_id: str
+    status: str
+
+
+class WorkflowReplayRequest(BaseModel):
+    node: str = Field(..., pattern=r"^[a-z_]+$")
+    speculative: bool = False
+
+
+class CheckpointResponse(BaseModel):
+    checkpoint_id: str | None = None
+    step: int | None = None
+    next: list[str] = []
+    created_at: str | None = None
+
+
+class ProjectFileResponse(BaseModel):
+    kind: str  # code, model, dataset or artifact
+    filename: str  # relative to the project folder
+    file_path: str
+    size_bytes: int | None = None
+    mtime: float | None = None
+    sha256: str | None = None
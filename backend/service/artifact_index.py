@@ -0,0 +1,147 @@
+# Index a project's files into the Code / Model / Dataset / Artifact tables.
+#
+# After execution `index_project` walks the project folder and records every regular file
+# with its size, mtime and SHA-256: code/ -> codes, models/ -> models, dataset/ -> datasets,
+# everything else (artifacts/, ui_spec.json, model_entry.py, ...) -> artifacts. The whole
+# listing is replaced in one transaction with one bulk INSERT per table, so re-indexing
+# after a debug retry is idempotent. Files whose size and mtime match the previous index
+# keep their hash instead of being read again. Skipped: racing candidates (only the
+# promoted winner counts), __pycache__, and symlinks (dataset store links, recorded by
+# service/dataset_cache.py). With `dedupe=True` the files are then moved into the shared
+# blob store and hardlinked back (service/blob_store.py).
+import hashlib
+import logging
+import os
+
+from sqlalchemy import delete, insert, select
+
+from db.models import Artifact, Code, Dataset, Model
+from service.blob_store import get_blob_store
+from service.tracing import span
+
+logger = logging.getLogger(__name__)
+
+TABLES = {"code": Code, "models": Model, "dataset": Dataset}
+SKIP_DIRS = {"candidates", "__pycache__", ".git"}
+HASH_CHUNK = 1024 * 1024
+
+
+def _table_for(relative_path: str):
+    top = relative_path.split("/", 1)[0] if "/" in relative_path else ""
+    return TABLES.get(top, Artifact)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_project(project_dir: str, known: dict | None = None) -> list[dict]:
+    """
+    Every regular file under `project_dir` as {table, filename, file_path, size_bytes,
+    mtime, sha256}. `known` maps filename -> (size, mtime, sha256) from a previous index.
+    """
+    known = known or {}
+    entries = []
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not os.path.islink(os.path.join(root, d)))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed while walking
+            relative = os.path.relpath(path, project_dir).replace(os.sep, "/")
+            previous = known.get(relative)
+            if previous and previous[0] == st.st_size and previous[1] == st.st_mtime:
+                sha = previous[2]
+            else:
+                try:
+                    sha = file_sha256(path)
+                except OSError:
+                    continue
+            entries.append({
+                "table": _table_for(relative),
+                "filename": relative,
+                "file_path": os.path.abspath(path),
+                "size_bytes": st.st_size,
+                "mtime": st.st_mtime,
+                "sha256": sha,
+            })
+    return entries
+
+
+def _owned(table, project_id: int):
+    clause = table.project_id == project_id
+    if table is Dataset:
+        clause = clause & Dataset.hf_id.is_(None)  # leave the dataset store links alone
+    return clause
+
+
+def _dedupe(project_dir: str, entries: list) -> dict | None:
+    store = get_blob_store()
+    if store is None:
+        return None
+    stats = store.ingest_project(project_dir, entries)
+    for entry in entries:
+        try:
+            entry["mtime"] = os.stat(entry["file_path"]).st_mtime  # a shared blob keeps its first mtime
+        except OSError:
+            pass
+    return stats
+
+
+def index_project(project_id: int | None, project_dir: str, dedupe: bool = False) -> int:
+    """
+    Replace the project's file rows with the current contents of `project_dir`; returns the
+    file count. `dedupe` (final results only: nothing may run in the folder afterwards
+    without `release_project`) also links the files into the blob store. Never raises: the
+    run already produced its files, a failed index (DB down, schema not migrated) only
+    leaves the listing stale and is logged.
+    """
+    try:
+        return _index_project(project_id, project_dir, dedupe)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not index files of project {project_id} ({project_dir}): {e}")
+        return 0
+
+
+def _index_project(project_id: int | None, project_dir: str, dedupe: bool) -> int:
+    if not os.path.isdir(project_dir):
+        return 0
+    if project_id is None:  # nothing to record, but the files can still be shared
+        if dedupe:
+            _dedupe(project_dir, scan_project(project_dir))
+        return 0
+    from db.session import SessionLocal
+
+    with span("artifacts.index", project_id=project_id) as s, SessionLocal() as db:
+        known = {}
+        for table in (Code, Model, Dataset, Artifact):
+            rows = db.execute(
+                select(table.filename, table.size_bytes, table.mtime, table.sha256).where(_owned(table, project_id))
+            )
+            known.update({r.filename: (r.size_bytes, r.mtime, r.sha256) for r in rows if r.sha256})
+
+        entries = scan_project(project_dir, known)
+        if dedupe:
+            s.set(blobs=_dedupe(project_dir, entries))
+        by_table = {}
+        for entry in entries:
+            table = entry.pop("table")
+            by_table.setdefault(table, []).append({**entry, "project_id": project_id})
+
+        for table in (Code, Model, Dataset, Artifact):
+            db.execute(delete(table).where(_owned(table, project_id)))
+            if by_table.get(table):
+                db.execute(insert(table), by_table[table])  # executemany: one round trip per table
+        db.commit()
+        s.set(files=len(entries), bytes=sum(e["size_bytes"] for e in entries))
+
+    logger.info(f"🗂️ Indexed {len(entries)} files for project {project_id}")
+    return len(entries)
@@ -0,0 +1,218 @@
+# In-process cache of verified access tokens -> user snapshots.
+#
+# `get_current_user` (api/deps.py) looks the bearer token up here first. A hit costs a dict
+# lookup: no JWT decode, no database round-trip. A miss decodes the token, loads the user
+# and caches an immutable snapshot until the token's `exp` or AUTH_CACHE_TTL_SECONDS,
+# whichever comes first. The cache is an LRU bounded by AUTH_CACHE_MAX_ENTRIES.
+#
+# crud_user.update_user calls `invalidate_user` after every profile, password or API-key
+# change. With several uvicorn workers on one box, set AUTH_CACHE_SHARED_PATH: the
+# invalidations are then also appended to a shared SQLite file, which every worker polls at
+# most once per AUTH_CACHE_SYNC_INTERVAL, so a stale snapshot survives at most that long in
+# the other workers.
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from service.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The user fields authenticated routes read; never the password hash."""
+    id: int
+    email: str
+    name: str | None
+    api_key: str | None
+    is_verified: bool
+    account_type: str | None
+    created_at: datetime | None
+    updated_at: datetime | None
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id, email=user.email, name=user.name, api_key=user.api_key,
+            is_verified=user.is_verified, account_type=user.account_type,
+            created_at=user.created_at, updated_at=user.updated_at,
+        )
+
+
+class _SharedInvalidations:
+    """Append-only log of invalidated user ids in a SQLite file shared by local workers."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS auth_invalidations ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_auth_invalidations_created_at "
+                           "ON auth_invalidations (created_at)")
+        self._conn.commit()
+
+    def latest(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM auth_invalidations").fetchone()[0]
+
+    def publish(self, user_id: int, now: float, keep_seconds: float):
+        self._conn.execute("INSERT INTO auth_invalidations (user_id, created_at) VALUES (?, ?)", (user_id, now))
+        # Nobody needs rows older than the longest a snapshot can live
+        self._conn.execute("DELETE FROM auth_invalidations WHERE created_at < ?", (now - keep_seconds,))
+        self._conn.commit()
+
+    def since(self, seq: int) -> list:
+        return self._conn.execute(
+            "SELECT seq, user_id FROM auth_invalidations WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+
+
+class AuthCache:
+    def __init__(self, ttl_seconds: float, max_entries: int, shared_path: str | None = None,
+                 sync_interval: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # token -> (expires_at, UserSnapshot), LRU order
+        self._by_user = {}             # user id -> {tokens}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._shared = _SharedInvalidations(shared_path) if shared_path else None
+        self._seen = self._shared.latest() if self._shared else 0
+        self._next_sync = 0.0
+
+    def _drop(self, token: str):
+        expires_at, snapshot = self._entries.pop(token)
+        tokens = self._by_user.get(snapshot.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[snapshot.id]
+
+    def _drop_user(self, user_id: int) -> int:
+        tokens = self._by_user.pop(user_id, set())
+        for token in tokens:
+            self._entries.pop(token, None)
+        return len(tokens)
+
+    def _sync(self, now: float):
+        if self._shared is None or now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval
+        try:
+            rows = self._shared.since(self._seen)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Could not read shared auth invalidations: {e}")
+            return
+        for seq, user_id in rows:
+            self._drop_user(user_id)
+            self._seen = seq
+
+    def get(self, token: str) -> UserSnapshot | None:
+        now = time.time()
+        with self._lock:
+            self._sync(now)
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] <= now:
+                self._drop(token)
+                self._evictions += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(token)
+                self._hits += 1
+        metrics.inc("autodev_auth_cache_lookups_total", 1, "Access-token cache lookups by outcome",
+                    result="miss" if entry is None else "hit")
+        return None if entry is None else entry[1]
+
+    def put(self, token: str, snapshot: UserSnapshot, token_expires_at: float | None = None):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        if token_expires_at:
+            expires_at = min(expires_at, float(token_expires_at))
+        if expires_at <= now:
+            return
+        with self._lock:
+            if token in self._entries:
+                self._drop(token)
+            self._entries[token] = (expires_at, snapshot)
+            self._by_user.setdefault(snapshot.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        now = time.time()
+        with self._lock:
+            dropped = self._drop_user(user_id)
+            self._invalidations += 1
+            if self._shared is not None:
+                try:
+                    self._shared.publish(user_id, now, self.ttl_seconds + self.sync_interval)
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Could not publish auth invalidation for user {user_id}: {e}")
+        metrics.inc("autodev_auth_cache_invalidations_total", 1, "Users whose cached tokens were dropped")
+        logger.debug(f"Auth cache: dropped {dropped} token(s) of user {user_id}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "entries": len(self._entries),
+                "users": len(self._by_user),
+            }
+
+
+_cache: AuthCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_auth_cache() -> AuthCache | None:
+    """The process-wide cache, or None when AUTH_CACHE_ENABLED is off."""
+    global _cache
+    from core.config import settings
+
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AuthCache(
+                ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+                max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+                shared_path=settings.AUTH_CACHE_SHARED_PATH or None,
+                sync_interval=settings.AUTH_CACHE_SYNC_INTERVAL,
+            )
+        return _cache
+
+
+def invalidate_user(user_id: int):
+    cache = get_auth_cache()
+    if cache is not None:
+        cache.invalidate_user(user_id)
+
+
+def auth_cache_stats() -> dict:
+    cache = get_auth_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,178 @@
+# Content-addressed store for project files, shared across projects.
+#
+# Every run gets its own projects/project_<timestamp>/ folder, so iterating on the same task
+# leaves N copies of the same script, dataset dump, plots and pickled model. After a run is
+# indexed (service/artifact_index.py), each file is moved into PROJECTS_DIR/.blobs/<sha[:2]>/<sha>
+# and the project path becomes a hardlink to that blob: identical files across projects
+# share one inode, while every project folder still looks complete on disk. The index rows
+# (codes/models/artifacts/datasets.sha256) name the blob.
+#
+# The reference count is the blob's hardlink count: st_nlink - 1 project folders link it.
+# Deleting a project folder drops its links; `collect_garbage` removes blobs no project
+# links any more (after a grace period), run at most every BLOB_GC_INTERVAL seconds.
+#
+# Scripts write their outputs in place (open(..., "w") truncates the inode), which would
+# rewrite every project sharing a blob. `release_project` turns a folder's shared links
+# back into private copies before anything executes in it again (executor_agent).
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = ".blobs"
+SKIP_PREFIXES = ("logs/",)  # appended to by the log channel; unique per run anyway
+
+
+class BlobStore:
+    def __init__(self, root: str, min_bytes: int = 0, gc_interval: float = 3600.0, gc_grace: float = 3600.0):
+        self.root = root
+        self.min_bytes = min_bytes
+        self.gc_interval = gc_interval
+        self.gc_grace = gc_grace
+        self._lock = threading.Lock()
+        self._next_gc = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    @staticmethod
+    def _replace_with_link(source: str, target: str):
+        """Atomically make `target` a hardlink to `source`."""
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        os.link(source, tmp)
+        try:
+            os.replace(tmp, target)
+        except OSError:
+            os.unlink(tmp)
+            raise
+
+    def ingest(self, path: str, sha256: str) -> bool:
+        """
+        Deduplicate `path` (whose content hashes to `sha256`) into the store. Returns True
+        when the file is now a link to a blob. Filesystems without hardlinks are left alone.
+        """
+        blob = self.blob_path(sha256)
+        try:
+            st = os.stat(path)
+            if st.st_size < self.min_bytes:
+                return False
+            if os.path.exists(blob):
+                if os.path.samefile(blob, path):
+                    return True
+                self._replace_with_link(blob, path)
+                return True
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)  # first copy: the project file itself becomes the blob
+            except FileExistsError:
+                self._replace_with_link(blob, path)  # another run stored it meanwhile
+            return True
+        except OSError as e:
+            # Cross-device, no hardlink support, or the blob was collected mid-way: keep the file as is
+            logger.debug(f"Blob store skipped {path}: {e}")
+            return False
+
+    def ingest_project(self, project_dir: str, entries: list) -> dict:
+        """Ingest index entries ({filename, file_path, sha256}); returns counts."""
+        linked = skipped = 0
+        for entry in entries:
+            if entry["filename"].startswith(SKIP_PREFIXES) or not self.ingest(entry["file_path"], entry["sha256"]):
+                skipped += 1
+            else:
+                linked += 1
+        self.maybe_collect_garbage()
+        return {"linked": linked, "skipped": skipped}
+
+    def collect_garbage(self) -> dict:
+        """Remove blobs no project links any more; returns {removed, freed_bytes, kept}."""
+        removed = freed = kept = 0
+        cutoff = time.time() - self.gc_grace
+        with self._lock:
+            for shard in os.listdir(self.root):
+                shard_dir = os.path.join(self.root, shard)
+                if not os.path.isdir(shard_dir):
+                    continue
+                for name in os.listdir(shard_dir):
+                    blob = os.path.join(shard_dir, name)
+                    try:
+                        st = os.stat(blob)
+                        # st_ctime moves whenever a link is added or removed
+                        if st.st_nlink > 1 or st.st_ctime > cutoff:
+                            kept += 1
+                            continue
+                        os.unlink(blob)
+                    except OSError:
+                        continue
+                    removed += 1
+                    freed += st.st_size
+        if removed:
+            logger.info(f"🧹 Removed {removed} unreferenced blobs ({freed / 2 ** 20:.1f} MiB)")
+        return {"removed": removed, "freed_bytes": freed, "kept": kept}
+
+    def maybe_collect_garbage(self):
+        now = time.time()
+        if now < self._next_gc:
+            return
+        self._next_gc = now + self.gc_interval
+        self.collect_garbage()
+
+    def usage(self) -> dict:
+        """Bytes stored once in the store vs. bytes the project folders would hold without sharing."""
+        stored = logical = blobs = 0
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                blobs += 1
+                stored += st.st_size
+                logical += st.st_size * max(st.st_nlink - 1, 0)
+        return {"blobs": blobs, "stored_bytes": stored, "logical_bytes": logical}
+
+
+def release_project(project_dir: str) -> int:
+    """Replace hardlinks shared with other projects by private copies; returns how many."""
+    released = 0
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = [d for d in dirs if not os.path.islink(os.path.join(root, d))]
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.islink(path) or os.stat(path).st_nlink < 2:
+                    continue
+                tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+                shutil.copy2(path, tmp)
+                os.replace(tmp, path)
+                released += 1
+            except OSError as e:
+                logger.warning(f"⚠️ Could not detach {path} from the blob store: {e}")
+    if released:
+        logger.info(f"📎 Detached {released} shared files in {project_dir} before execution")
+    return released
+
+
+_store: BlobStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore | None:
+    global _store
+    from core.config import settings
+
+    if not settings.BLOB_STORE_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = BlobStore(
+                os.path.join(settings.PROJECTS_DIR, BLOB_DIR),
+                min_bytes=settings.BLOB_STORE_MIN_BYTES,
+                gc_interval=settings.BLOB_GC_INTERVAL,
+                gc_grace=settings.BLOB_GC_GRACE_SECONDS,
+            )
+        return _store
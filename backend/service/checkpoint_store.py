@@ -0,0 +1,65 @@
+# Durable LangGraph checkpointer for the workflow graphs.
+#
+# Graphs compiled with this saver write the whole WorkflowState after every node, keyed by
+# the run's thread id (one per Project, see workflow/runs.py). A restarted worker can then
+# resume a run from its last completed node, or replay it from any earlier node, without
+# paying for the master/research/coder LLM calls again.
+#
+# WORKFLOW_CHECKPOINT_URL is either a SQLite file path (default, needs
+# langgraph-checkpoint-sqlite) or a postgresql:// URL (needs langgraph-checkpoint-postgres).
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+_saver = None
+_lock = threading.Lock()
+
+
+def _sqlite_saver(path: str):
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # One connection shared by every graph run in the process; SqliteSaver serialises access
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = SqliteSaver(conn)
+    saver.setup()
+    return saver
+
+
+def _postgres_saver(url: str):
+    from psycopg import Connection
+    from psycopg.rows import dict_row
+    from langgraph.checkpoint.postgres import PostgresSaver
+
+    conn = Connection.connect(url, autocommit=True, prepare_threshold=0, row_factory=dict_row)
+    saver = PostgresSaver(conn)
+    saver.setup()
+    return saver
+
+
+def get_checkpointer():
+    """The process-wide checkpointer, or None when checkpointing is disabled."""
+    global _saver
+    from core.config import settings
+
+    if not settings.WORKFLOW_CHECKPOINTS_ENABLED:
+        return None
+    with _lock:
+        if _saver is None:
+            url = settings.WORKFLOW_CHECKPOINT_URL
+            try:
+                if url.startswith(("postgres://", "postgresql://")):
+                    _saver = _postgres_saver(url)
+                else:
+                    _saver = _sqlite_saver(url)
+            except ImportError as e:
+                # Keep resume/replay working for the lifetime of the process at least
+                from langgraph.checkpoint.memory import MemorySaver
+
+                logger.warning(f"⚠️ Durable checkpoints unavailable ({e}); falling back to in-memory checkpoints")
+                _saver = MemorySaver()
+        return _saver
@@ -0,0 +1,288 @@
+# Shared, content-addressed dataset store.
+#
+# Every (hf_id, revision, split) gets one entry directory under DATASET_CACHE_DIR, keyed
+# by a hash of those three values. The generated script is pointed at the entry through
+# HF_DATASETS_CACHE / HF_HUB_CACHE, so the first run downloads into the shared store and
+# every later run (other projects, debug retries) reads it back offline. Project
+# `dataset/` folders get a symlink to the entry for reference. Entries are evicted
+# least-recently-used once the store grows past DATASET_CACHE_MAX_BYTES.
+#
+# An entry is only marked complete (and served offline) once it verifiably holds the
+# requested dataset: downloaded files for that hf_id, at the requested revision when the
+# hub cache records one. Every run using an entry holds a lease file in its uses/ folder
+# (dropped on commit/release, or ignored after DATASET_CACHE_LEASE_SECONDS if the run
+# died); eviction never removes an entry with a live lease.
+import logging
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+USES = "uses"
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            fp = os.path.join(root, name)
+            if not os.path.islink(fp):
+                total += os.path.getsize(fp)
+    return total
+
+
+def _downloaded_dirs(entry: str, hf_id: str) -> list:
+    """Where `datasets` / `huggingface_hub` put files for `hf_id` inside an entry."""
+    wanted = {
+        "datasets": hf_id.replace("/", "___").lower(),
+        "hub": f"datasets--{hf_id.replace('/', '--')}".lower(),
+    }
+    found = []
+    for sub, name in wanted.items():
+        base = os.path.join(entry, sub)
+        if os.path.isdir(base):
+            found += [os.path.join(base, d) for d in os.listdir(base) if d.lower() == name]
+    return found
+
+
+def _has_revision(hub_dir: str, revision: str) -> bool:
+    """The hub cache pins refs/<branch> to a commit and keeps snapshots/<commit>."""
+    if os.path.isfile(os.path.join(hub_dir, "refs", revision)):
+        return True
+    return os.path.isdir(os.path.join(hub_dir, "snapshots", revision))
+
+
+def dataset_spec(dataset_json: dict) -> dict | None:
+    """Pull (hf_id, revision, split) out of the research agent's output."""
+    info = (dataset_json or {}).get("dataset", dataset_json or {})
+    hf_id = info.get("hf_id")
+    if not hf_id:
+        return None
+    return {
+        "hf_id": hf_id,
+        "revision": info.get("revision") or "main",
+        "split": info.get("split") or "all",
+    }
+
+
+class DatasetCache:
+    def __init__(self, root: str, max_bytes: int, lease_seconds: float = 6 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(hf_id: str, revision: str = "main", split: str = "all") -> str:
+        payload = json.dumps([hf_id, revision, split])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _read_manifest(self, key: str) -> dict | None:
+        try:
+            with open(os.path.join(self.entry_dir(key), MANIFEST), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, key: str, manifest: dict):
+        path = os.path.join(self.entry_dir(key), MANIFEST)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+
+    # ---- leases ----
+    def _acquire(self, key: str) -> str:
+        lease = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        with open(os.path.join(self.entry_dir(key), USES, lease), "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+        return lease
+
+    def release(self, key: str, lease: str | None):
+        if lease:
+            try:
+                os.remove(os.path.join(self.entry_dir(key), USES, lease))
+            except OSError:
+                pass
+
+    def in_use(self, key: str) -> bool:
+        """True while some run holds an unexpired lease on the entry."""
+        uses = os.path.join(self.entry_dir(key), USES)
+        cutoff = time.time() - self.lease_seconds
+        try:
+            names = os.listdir(uses)
+        except OSError:
+            return False
+        for name in names:
+            try:
+                if os.path.getmtime(os.path.join(uses, name)) > cutoff:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def prepare(self, spec: dict, project_dir: str) -> dict:
+        """
+        Create/refresh the entry for `spec`, take a lease on it, link it into the project's
+        dataset/ folder and return {"key", "spec", "cache_path", "link_path", "cached",
+        "lease", "env"}; `env` is meant for the generated script's process.
+        """
+        key = self.key(spec["hf_id"], spec["revision"], spec["split"])
+        entry = self.entry_dir(key)
+        with self._lock:
+            os.makedirs(os.path.join(entry, "datasets"), exist_ok=True)
+            os.makedirs(os.path.join(entry, "hub"), exist_ok=True)
+            os.makedirs(os.path.join(entry, USES), exist_ok=True)
+            manifest = self._read_manifest(key) or {**spec, "created_at": time.time(), "complete": False}
+            manifest["last_used"] = time.time()
+            self._write_manifest(key, manifest)
+            lease = self._acquire(key)
+
+        link = os.path.join(project_dir, "dataset", "hf_cache")
+        os.makedirs(os.path.dirname(link), exist_ok=True)
+        if not os.path.lexists(link):
+            try:
+                os.symlink(entry, link, target_is_directory=True)
+            except OSError:
+                pass  # e.g. Windows without symlink rights; the env vars still apply
+
+        env = {
+            "HF_DATASETS_CACHE": os.path.join(entry, "datasets"),
+            "HF_HUB_CACHE": os.path.join(entry, "hub"),
+            "AUTODEV_DATASET_CACHE": entry,
+        }
+        if manifest.get("complete"):
+            # Already downloaded once: never touch the network again
+            env.update({"HF_DATASETS_OFFLINE": "1", "HF_HUB_OFFLINE": "1"})
+        return {
+            "key": key,
+            "spec": spec,
+            "cache_path": entry,
+            "link_path": link,
+            "cached": bool(manifest.get("complete")),
+            "lease": lease,
+            "env": env,
+        }
+
+    def verify(self, key: str, spec: dict, manifest: dict) -> str | None:
+        """Why the entry doesn't hold the dataset `spec` asks for, or None if it does."""
+        for field in ("hf_id", "revision", "split"):
+            if manifest.get(field) != spec[field]:
+                return f"entry is for {field}={manifest.get(field)!r}, not {spec[field]!r}"
+        dirs = _downloaded_dirs(self.entry_dir(key), spec["hf_id"])
+        if not dirs or sum(_dir_size(d) for d in dirs) == 0:
+            return f"no files downloaded for {spec['hf_id']}"
+        hub_dirs = [d for d in dirs if os.path.basename(os.path.dirname(d)) == "hub"]
+        if hub_dirs and not any(_has_revision(d, spec["revision"]) for d in hub_dirs):
+            return f"revision {spec['revision']!r} of {spec['hf_id']} is not in the entry"
+        return None
+
+    def mark_complete(self, key: str, spec: dict) -> dict | None:
+        """
+        Record that a run loaded the dataset successfully, if the entry really holds it,
+        then enforce the size bound. Returns the manifest, or None when not verified.
+        """
+        with self._lock:
+            manifest = self._read_manifest(key)
+            if manifest is None:
+                return None
+            problem = self.verify(key, spec, manifest)
+            if problem:
+                logger.warning(f"⚠️ Not caching dataset {spec['hf_id']} ({key}): {problem}")
+                return None
+            manifest["complete"] = True
+            manifest["size_bytes"] = _dir_size(self.entry_dir(key))
+            manifest["last_used"] = time.time()
+            self._write_manifest(key, manifest)
+        self.evict(keep={key})
+        return manifest
+
+    def entries(self) -> list:
+        out = []
+        for key in os.listdir(self.root):
+            manifest = self._read_manifest(key)
+            if manifest is not None:
+                out.append({"key": key, **manifest})
+        return out
+
+    def evict(self, keep: set | None = None) -> list:
+        """Drop least-recently-used entries no run is using until the store fits in `max_bytes`."""
+        keep = keep or set()
+        removed = []
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda e: e.get("last_used", 0))
+            total = sum(e.get("size_bytes", 0) for e in entries)
+            for e in entries:
+                if total <= self.max_bytes:
+                    break
+                if e["key"] in keep or self.in_use(e["key"]):
+                    continue
+                shutil.rmtree(self.entry_dir(e["key"]), ignore_errors=True)
+                total -= e.get("size_bytes", 0)
+                removed.append(e["key"])
+        for key in removed:
+            logger.info(f"🧹 Evicted cached dataset {key}")
+        return removed
+
+
+_cache: DatasetCache | None = None
+
+
+def get_dataset_cache() -> DatasetCache | None:
+    global _cache
+    from core.config import settings
+
+    if not settings.DATASET_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = DatasetCache(settings.DATASET_CACHE_DIR, settings.DATASET_CACHE_MAX_BYTES,
+                              settings.DATASET_CACHE_LEASE_SECONDS)
+    return _cache
+
+
+def prepare_dataset_cache(dataset_json: dict, project_dir: str) -> dict | None:
+    """Point a project at the shared store entry for the researched dataset (None if not applicable)."""
+    cache = get_dataset_cache()
+    spec = dataset_spec(dataset_json)
+    if cache is None or spec is None:
+        return None
+    entry = cache.prepare(spec, project_dir)
+    state = "hit (offline)" if entry["cached"] else "miss (will download)"
+    logger.info(f"📦 Dataset cache {state}: {spec['hf_id']} → {entry['cache_path']}")
+    return entry
+
+
+def release_dataset_cache(entry: dict | None):
+    """Drop the run's lease on its entry (failed runs; `commit_dataset_cache` does it too)."""
+    cache = get_dataset_cache()
+    if entry is None or cache is None:
+        return
+    cache.release(entry["key"], entry.get("lease"))
+
+
+def commit_dataset_cache(entry: dict | None, project_id: int | None = None):
+    """After a successful run: mark the entry complete and record it on the project."""
+    cache = get_dataset_cache()
+    if entry is None or cache is None:
+        return
+    try:
+        manifest = cache.mark_complete(entry["key"], entry["spec"])
+    finally:
+        cache.release(entry["key"], entry.get("lease"))
+    if project_id is None or manifest is None:
+        return
+    from db.session import SessionLocal
+    from crud import crud_project
+
+    with SessionLocal() as db:
+        crud_project.record_dataset(db, project_id, entry["spec"], entry, manifest.get("size_bytes"))
@@ -0,0 +1,194 @@
+# Local catalog of datasets that past runs loaded successfully.
+#
+# Every successful run records the research agent's pick (hf_id, task, target, features,
+# load snippet) on the project's Dataset row together with the plan it answered. The
+# catalog indexes those rows with TF-IDF over the plan text, and `research_dataset`
+# looks the new plan's `problem` + `dataset_requirements` up before calling the LLM:
+# a match scoring at least DATASET_CATALOG_MIN_SCORE (cosine similarity) is reused as-is.
+import logging
+import math
+import re
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "data", "dataset", "datasets", "for", "from",
+    "in", "into", "is", "it", "of", "on", "or", "public", "that", "the", "this", "to", "use",
+    "using", "with",
+}
+
+
+def _stem(token: str) -> str:
+    # Plural folding only ("labels" ~ "label", "prices" ~ "price"); enough for short plan text
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    return [_stem(t) for t in _TOKEN.findall((text or "").lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def plan_query(plan: dict) -> str:
+    """The part of a master plan that describes which data is needed."""
+    if not isinstance(plan, dict):
+        return str(plan or "")
+    return " ".join(str(plan.get(k) or "") for k in ("problem", "dataset_requirements"))
+
+
+def _dataset_info(dataset_json: dict) -> dict:
+    return (dataset_json or {}).get("dataset", dataset_json or {})
+
+
+def _is_fallback(dataset_json: dict) -> bool:
+    """A canned answer put in place of an unparseable research reply, not a real match."""
+    dataset_json = dataset_json or {}
+    info = _dataset_info(dataset_json)
+    return any(marker in d for d in (dataset_json, info) for marker in ("raw_response", "fallback"))
+
+
+class DatasetCatalog:
+    """In-memory TF-IDF index; one document per hf_id (all plans it has answered)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}     # hf_id -> Counter of plan terms
+        self._entries = {}  # hf_id -> research-agent style dataset dict (latest run wins)
+        self._df = Counter()
+        self._vectors = None  # hf_id -> (weights, norm), rebuilt lazily after changes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, plan_text: str, dataset: dict):
+        hf_id = dataset.get("hf_id")
+        terms = tokenize(f"{plan_text} {dataset.get('name', '')} {dataset.get('task', '')} {dataset.get('target', '')}")
+        if not hf_id or not terms:
+            return
+        with self._lock:
+            old = self._docs.get(hf_id, Counter())
+            self._df.subtract(set(old))
+            merged = old + Counter(terms)
+            self._df.update(set(merged))
+            self._docs[hf_id] = merged
+            self._entries[hf_id] = dataset
+            self._vectors = None
+
+    def _idf(self, term: str, n: int) -> float:
+        # Smoothed so a single-document catalog still produces usable weights
+        return math.log((1 + n) / (1 + self._df.get(term, 0))) + 1.0
+
+    def _build_vectors(self):
+        n = len(self._docs)
+        vectors = {}
+        for hf_id, counts in self._docs.items():
+            weights = {t: (1 + math.log(c)) * self._idf(t, n) for t, c in counts.items()}
+            vectors[hf_id] = (weights, math.sqrt(sum(w * w for w in weights.values())))
+        return vectors
+
+    def search(self, text: str, limit: int = 3) -> list:
+        """[(score, dataset dict)] best first; score is cosine similarity in [0, 1]."""
+        query = Counter(tokenize(text))
+        with self._lock:
+            if not query or not self._docs:
+                return []
+            if self._vectors is None:
+                self._vectors = self._build_vectors()
+            n = len(self._docs)
+            q = {t: (1 + math.log(c)) * self._idf(t, n) for t, c in query.items()}
+            q_norm = math.sqrt(sum(w * w for w in q.values()))
+            scored = []
+            for hf_id, (weights, norm) in self._vectors.items():
+                dot = sum(w * weights.get(t, 0.0) for t, w in q.items())
+                if dot:
+                    scored.append((dot / (q_norm * norm), self._entries[hf_id]))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+
+_catalog: DatasetCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def _row_entry(row) -> dict:
+    return {
+        "name": row.filename or row.hf_id,
+        "hf_id": row.hf_id,
+        "task": row.task,
+        "target": row.target,
+        "features": row.features or [],
+        "load_snippet": row.load_snippet,
+        "notes": row.notes,
+    }
+
+
+def get_dataset_catalog() -> DatasetCatalog:
+    """The process-wide catalog, loaded from the Dataset table on first use."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            catalog = DatasetCatalog()
+            try:
+                from db.session import SessionLocal
+                from crud import crud_project
+
+                with SessionLocal() as db:
+                    # Oldest first so the newest run's metadata is kept per hf_id
+                    for row in reversed(crud_project.list_catalog_datasets(db)):
+                        catalog.add(row.plan_summary, _row_entry(row))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load dataset catalog: {e}")
+            logger.info(f"📚 Dataset catalog loaded: {len(catalog)} datasets")
+            _catalog = catalog
+        return _catalog
+
+
+def lookup_dataset(plan: dict) -> dict | None:
+    """Return a research-agent style result for a high-confidence catalog match, else None."""
+    from core.config import settings
+
+    if not settings.DATASET_CATALOG_ENABLED:
+        return None
+    matches = get_dataset_catalog().search(plan_query(plan), limit=1)
+    if not matches:
+        return None
+    score, dataset = matches[0]
+    if score < settings.DATASET_CATALOG_MIN_SCORE:
+        logger.info(f"📚 Best catalog match {dataset['hf_id']} scored {score:.2f}; asking the research agent")
+        return None
+    logger.info(f"📚 Catalog hit {dataset['hf_id']} (score {score:.2f}); skipping the research agent")
+    return {"dataset": dict(dataset), "source": "catalog"}
+
+
+def record_catalog_dataset(plan: dict, dataset_json: dict, project_id: int | None = None):
+    """After a successful run: add the dataset to the catalog (and the project's Dataset row)."""
+    from core.config import settings
+
+    info = _dataset_info(dataset_json)
+    if not info.get("hf_id"):
+        return
+    if _is_fallback(dataset_json):
+        logger.info(f"📚 Not cataloguing {info['hf_id']}: research fell back to a default dataset")
+        return
+    entry = {k: info.get(k) for k in ("name", "hf_id", "task", "target", "features", "load_snippet", "notes")}
+    plan_text = plan_query(plan)
+    if settings.DATASET_CATALOG_ENABLED:
+        get_dataset_catalog().add(plan_text, entry)
+    if project_id is None:
+        return
+    from db.session import SessionLocal
+    from crud import crud_project
+
+    with SessionLocal() as db:
+        crud_project.upsert_dataset(
+            db, project_id, entry["hf_id"],
+            task=entry["task"],
+            target=entry["target"],
+            features=entry["features"],
+            load_snippet=entry["load_snippet"],
+            notes=entry["notes"],
+            plan_summary=plan_text,
+        )
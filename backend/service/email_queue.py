@@ -0,0 +1,201 @@
+# Outbound email queue with pooled SMTP connections.
+#
+# Request handlers call `send(message)`, which only enqueues and returns at once. A few
+# sender threads (EMAIL_QUEUE_WORKERS) drain the queue, each keeping its own SMTP
+# connection open between messages, so the TCP + STARTTLS + AUTH handshake is paid once
+# per connection instead of once per email. Idle connections are closed after
+# EMAIL_IDLE_TIMEOUT. Transient failures (dropped connection, 4xx replies, timeouts) are
+# retried with exponential backoff up to EMAIL_MAX_RETRIES; permanent 5xx rejections are not.
+# `stop` never blocks past its timeout, even on a full queue: senders drain until the queue
+# is empty or the deadline passes, then quit after the message in hand.
+import logging
+import queue
+import smtplib
+import threading
+import time
+
+from service.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_STOP_POLL = 0.5  # how often idle senders look at the stop flags while stopping
+
+
+def _is_permanent(error: Exception) -> bool:
+    code = getattr(error, "smtp_code", None)
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(c >= 500 for c, _ in error.recipients.values())
+    return isinstance(code, int) and code >= 500
+
+
+class EmailQueue:
+    def __init__(self, host: str, port: int, username: str | None = None, password: str | None = None,
+                 use_tls: bool = True, workers: int = 2, max_retries: int = 3, retry_backoff: float = 1.0,
+                 idle_timeout: float = 60.0, max_queued: int = 1000, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._threads = []
+        self._stopping = threading.Event()  # exit once the queue is empty
+        self._abort = threading.Event()     # deadline passed: exit after the current message
+        self._lock = threading.Lock()
+        self._stats = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "connections": 0, "rejected": 0}
+
+    # ---- lifecycle ----
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"email-sender-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float = 10.0):
+        """Send what is already queued (up to `timeout`), then close the connections."""
+        deadline = time.monotonic() + timeout
+        self._stopping.set()
+        for _ in self._threads:
+            try:
+                self._queue.put(_STOP, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                break  # senders also exit on an empty queue now that _stopping is set
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        if any(thread.is_alive() for thread in self._threads):
+            self._abort.set()
+            logger.warning(f"📧 Email queue stopped with {self._queue.qsize()} messages unsent")
+        self._threads = []
+
+    # ---- producer side ----
+    def send(self, message) -> bool:
+        """Queue an email.message.Message; False if the queue is full."""
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._count("rejected")
+            logger.error(f"📧 Email queue full; dropping message to {message['To']}")
+            return False
+        self._count("queued")
+        return True
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def join(self):
+        """Block until every queued message was sent or given up on (benchmarks, tests)."""
+        self._queue.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "pending": self._queue.qsize()}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+        metrics.inc("autodev_email_events_total", amount, "Outbound email queue events", event=key)
+
+    # ---- sender threads ----
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            conn.starttls()
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+        self._count("connections")
+        return conn
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP | None):
+        if conn is None:
+            return
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+    def _deliver(self, conn: smtplib.SMTP | None, message) -> smtplib.SMTP | None:
+        """Send one message with retries; returns the connection to keep using (or None)."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                if conn is None:
+                    conn = self._connect()
+                conn.send_message(message)
+                self._count("sent")
+                return conn
+            except (smtplib.SMTPException, OSError) as e:
+                # The connection state is unknown after an error; start the next try on a fresh one
+                self._close(conn)
+                conn = None
+                if _is_permanent(e) or attempt == self.max_retries:
+                    self._count("failed")
+                    logger.error(f"📧 Giving up on email to {message['To']} after {attempt + 1} attempt(s): {e}")
+                    return None
+                self._count("retries")
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"📧 Email to {message['To']} failed ({e}); retrying in {delay:.1f}s")
+                if self._abort.wait(delay):
+                    self._count("failed")
+                    return None
+        return conn
+
+    def _worker(self):
+        conn = None
+        while not self._abort.is_set():
+            timeout = self.idle_timeout if conn is not None else None
+            if self._stopping.is_set():
+                timeout = _STOP_POLL
+            try:
+                message = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break  # drained
+                self._close(conn)  # idle: servers drop quiet connections anyway
+                conn = None
+                continue
+            try:
+                if message is _STOP:
+                    break
+                conn = self._deliver(conn, message)
+            finally:
+                self._queue.task_done()
+        self._close(conn)
+
+
+_email_queue: EmailQueue | None = None
+_email_lock = threading.Lock()
+
+
+def get_email_queue() -> EmailQueue:
+    """The process-wide queue, started on first use."""
+    global _email_queue
+    from core.config import settings
+
+    with _email_lock:
+        if _email_queue is None:
+            _email_queue = EmailQueue(
+                settings.EMAIL_SERVER, settings.EMAIL_PORT,
+                username=settings.EMAIL_ADDRESS, password=settings.EMAIL_PASSWORD,
+                use_tls=settings.EMAIL_USE_TLS,
+                workers=settings.EMAIL_QUEUE_WORKERS,
+                max_retries=settings.EMAIL_MAX_RETRIES,
+                retry_backoff=settings.EMAIL_RETRY_BACKOFF,
+                idle_timeout=settings.EMAIL_IDLE_TIMEOUT,
+                max_queued=settings.EMAIL_QUEUE_MAX,
+            ).start()
+        return _email_queue
+
+
+def stop_email_queue():
+    global _email_queue
+    with _email_lock:
+        if _email_queue is not None:
+            _email_queue.stop()
+            _email_queue = None
@@ -0,0 +1,308 @@
+# Persistent job queue + scheduler for AutoDev workflows.
+#
+# Jobs live in the `jobs` table (db/models.py), so the queue survives restarts and is
+# shared by every API worker using the same database. A dispatcher thread claims queued
+# jobs by priority, bounded by a box-wide slot count (one per CPU by default) and a
+# per-user cap that depends on the user's account_type. Claims are a conditional
+# UPDATE, so two workers never run the same job.
+#
+# A claim is a lease: the worker stamps `lease_owner` and renews `lease_expires_at` on
+# every poll while the job runs. Only jobs whose lease has expired (their worker died or
+# was restarted) go back to the queue, so any number of workers can run a scheduler.
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+
+from core.config import settings
+from crud import crud_project
+from db.models import Job, User
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("completed", "failed", "cancelled")
+
+
+def parse_account_slots(spec: str) -> dict:
+    """"free:1,premium:2" -> {"free": 1, "premium": 2}"""
+    slots = {}
+    for part in spec.split(","):
+        if ":" in part:
+            name, count = part.split(":", 1)
+            slots[name.strip()] = int(count)
+    return slots
+
+
+class JobScheduler:
+    def __init__(self, session_factory=SessionLocal, max_concurrency: int | None = None,
+                 account_slots: dict | None = None, poll_interval: float | None = None):
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency or settings.JOB_MAX_CONCURRENCY or os.cpu_count() or 1
+        self.account_slots = account_slots or parse_account_slots(settings.JOB_SLOTS_PER_ACCOUNT)
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.lease = timedelta(seconds=max(settings.JOB_LEASE_SECONDS, self.poll_interval * 3))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="autodev-job")
+        self._running = {}  # job id -> cancel Event (jobs running in this process)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- lifecycle ----
+    def start(self):
+        self._requeue_expired()
+        self._thread = threading.Thread(target=self._loop, name="autodev-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = False):
+        # Running jobs are interrupted, not cancelled: `_run` puts them back in the queue
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            for cancel in self._running.values():
+                cancel.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def wake(self):
+        """Dispatch immediately instead of waiting for the next poll (e.g. after a submit)."""
+        self._wake.set()
+
+    def _requeue_expired(self):
+        # Jobs whose worker stopped renewing the lease (crash, restart) go back to the queue
+        with self.session_factory() as db:
+            requeued = db.execute(
+                update(Job)
+                .where(Job.status == "running",
+                       (Job.lease_expires_at < datetime.utcnow()) | Job.lease_expires_at.is_(None))
+                .values(status="queued", stage=None, progress=0.0, started_at=None,
+                        lease_owner=None, lease_expires_at=None)
+            ).rowcount
+            db.commit()
+        if requeued:
+            logger.warning(f"♻️ Requeued {requeued} jobs with an expired lease")
+
+    def _renew_leases(self):
+        with self._lock:
+            running = list(self._running)
+        if not running:
+            return
+        with self.session_factory() as db:
+            db.execute(
+                update(Job).where(Job.id.in_(running), Job.lease_owner == self.worker_id)
+                .values(lease_expires_at=datetime.utcnow() + self.lease)
+            )
+            db.commit()
+
+    # ---- dispatch ----
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self._renew_leases()
+                self._requeue_expired()
+                self._sync_cancellations()
+                self._dispatch()
+            except Exception as e:
+                logger.error(f"💥 Job scheduler error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _sync_cancellations(self):
+        with self._lock:
+            running = list(self._running.items())
+        if not running:
+            return
+        with self.session_factory() as db:
+            cancelled = {
+                row[0] for row in db.query(Job.id)
+                .filter(Job.id.in_([job_id for job_id, _ in running]), Job.cancel_requested.is_(True))
+            }
+        for job_id, cancel in running:
+            if job_id in cancelled:
+                cancel.set()
+
+    def _dispatch(self):
+        with self.session_factory() as db:
+            running_by_user = dict(
+                db.query(Job.user_id, func.count(Job.id))
+                .filter(Job.status == "running").group_by(Job.user_id).all()
+            )
+            free = self.max_concurrency - sum(running_by_user.values())
+            if free <= 0:
+                return
+
+            candidates = (
+                db.query(Job.id, Job.user_id, User.account_type)
+                .join(User, User.id == Job.user_id)
+                .filter(Job.status == "queued")
+                .order_by(Job.priority.desc(), Job.created_at.asc())
+                .limit(self.max_concurrency * 10)
+                .all()
+            )
+            for job_id, user_id, account_type in candidates:
+                if free <= 0:
+                    break
+                user_cap = self.account_slots.get(account_type or "free", self.account_slots.get("free", 1))
+                if running_by_user.get(user_id, 0) >= user_cap:
+                    continue
+                claimed = db.execute(
+                    update(Job).where(Job.id == job_id, Job.status == "queued")
+                    .values(status="running", started_at=datetime.utcnow(), stage="queued", progress=0.0,
+                            lease_owner=self.worker_id, lease_expires_at=datetime.utcnow() + self.lease)
+                ).rowcount
+                db.commit()
+                if not claimed:
+                    continue  # another worker got it first
+                running_by_user[user_id] = running_by_user.get(user_id, 0) + 1
+                free -= 1
+                cancel = threading.Event()
+                with self._lock:
+                    self._running[job_id] = cancel
+                self._executor.submit(self._run, job_id, cancel)
+
+    # ---- execution ----
+    def _set(self, job_id: int, **values):
+        # A job whose lease was lost (and maybe re-claimed elsewhere) is no longer ours to update
+        if "finished_at" in values:
+            values.update(lease_owner=None, lease_expires_at=None)
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == job_id, Job.lease_owner == self.worker_id).values(**values))
+            db.commit()
+
+    def _cancel_requested(self, job_id: int) -> bool:
+        with self.session_factory() as db:
+            return bool(db.query(Job.cancel_requested).filter(Job.id == job_id).scalar())
+
+    def _run(self, job_id: int, cancel: threading.Event):
+        # Imported lazily: the agents pull in LangChain, which the API process only
+        # needs once a job actually runs
+        from workflow.pipeline import WorkflowCancelled
+
+        try:
+            with self.session_factory() as db:
+                job = db.get(Job, job_id)
+                prompt, max_retries = job.prompt, job.max_retries
+                kind, options = job.kind or "pipeline", job.options or {}
+                if job.project_id is None:
+                    project = crud_project.create_project(db, job.user_id, f"job_{job.id}", description=prompt)
+                    job.project_id = project.id
+                    db.commit()
+                project_id = job.project_id
+
+            if kind == "pipeline":
+                result = self._run_pipeline(job_id, prompt, max_retries, cancel, project_id)
+            else:
+                result = self._run_graph(job_id, kind, options, prompt, cancel, project_id)
+            self._set(
+                job_id,
+                status="completed" if result.get("status") == "completed" else "failed",
+                stage="done", progress=1.0, result=result,
+                error=result.get("last_error"), finished_at=datetime.utcnow(),
+            )
+        except WorkflowCancelled as e:
+            if self._stop.is_set() and not self._cancel_requested(job_id):
+                # Shutdown, not the user: hand the job to the next worker
+                logger.info(f"⏸️ Job {job_id} interrupted by shutdown at {e}; requeued")
+                self._set(job_id, status="queued", stage=None, progress=0.0, started_at=None,
+                          lease_owner=None, lease_expires_at=None)
+            else:
+                self._set(job_id, status="cancelled", stage=str(e), finished_at=datetime.utcnow())
+        except Exception as e:
+            logger.error(f"💥 Job {job_id} failed: {e}")
+            self._set(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            self.wake()
+
+    def _run_pipeline(self, job_id: int, prompt: str, max_retries: int, cancel: threading.Event,
+                      project_id: int) -> dict:
+        from workflow.pipeline import run_autodev_once
+
+        def progress(stage: str, fraction: float):
+            self._set(job_id, stage=stage, progress=round(fraction, 3))
+
+        return run_autodev_once(prompt, max_retries=max_retries, progress=progress, cancel=cancel,
+                                project_id=project_id)
+
+    def _run_graph(self, job_id: int, kind: str, options: dict, prompt: str, cancel: threading.Event,
+                   project_id: int) -> dict:
+        from workflow import runs
+
+        speculative = bool(options.get("speculative"))
+        # A job requeued after its worker died continues from the checkpoints it left
+        # instead of starting (or forking) over: a start with checkpoints on its thread,
+        # or a replay that had already begun
+        if kind == "graph_start" and runs.has_checkpoints(project_id, speculative):
+            kind = "graph_resume"
+        elif kind == "graph_replay" and options.get("started"):
+            kind = "graph_resume"
+        elif kind == "graph_replay":
+            self._set(job_id, options={**options, "started": True})
+        self._set(job_id, stage=kind)
+        if kind == "graph_start":
+            final = runs.start_run(project_id, prompt, speculative, cancel)
+        elif kind == "graph_resume":
+            final = runs.resume_run(project_id, speculative, cancel)
+        elif kind == "graph_replay":
+            final = runs.replay_run(project_id, options["node"], speculative, cancel)
+        else:
+            raise ValueError(f"Unknown job kind: {kind}")
+        # The graph state holds whole scripts and logs; the job keeps the outcome
+        succeeded = bool((final.get("results") or {}).get("success")) and "summary" in final
+        summary = final.get("summary") or {}
+        return {
+            "status": "completed" if succeeded else "failed",
+            "project_dir": final.get("project_dir"),
+            "thread_id": runs.thread_id(project_id, speculative),
+            "metrics": summary.get("metrics", {}),
+            "summary": summary.get("summary", ""),
+            "last_error": None if succeeded else final.get("error"),
+        }
+
+    # ---- API helpers ----
+    def cancel(self, db, job: Job) -> Job:
+        """Cancel a queued job right away; ask a running one to stop."""
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = datetime.utcnow()
+        elif job.status == "running":
+            job.cancel_requested = True
+            with self._lock:
+                cancel = self._running.get(job.id)
+            if cancel is not None:
+                cancel.set()
+        db.commit()
+        db.refresh(job)
+        return job
+
+
+_scheduler: JobScheduler | None = None
+
+
+def get_scheduler() -> JobScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler()
+    return _scheduler
+
+
+def start_scheduler():
+    scheduler = get_scheduler()
+    if scheduler._thread is None:
+        scheduler.start()
+    return scheduler
+
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
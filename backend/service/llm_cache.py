@@ -0,0 +1,178 @@
+# Content-addressed on-disk cache for LLM responses.
+# Keys are a SHA-256 over (model, temperature, rendered prompt messages), values are the
+# raw response text. Storage is a single SQLite file so it survives worker restarts and
+# can be shared by several uvicorn workers on the same box.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class LRUEviction:
+    """Keep at most `max_entries` rows, dropping the least recently used first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+
+    def is_fresh(self, created_at: float, now: float) -> bool:
+        return True
+
+    def evict(self, conn: sqlite3.Connection, now: float) -> int:
+        cur = conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        return cur.rowcount
+
+
+class TTLEviction:
+    """Expire rows older than `ttl_seconds` regardless of how often they are read."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+
+    def is_fresh(self, created_at: float, now: float) -> bool:
+        return now - created_at <= self.ttl_seconds
+
+    def evict(self, conn: sqlite3.Connection, now: float) -> int:
+        cur = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        return cur.rowcount
+
+
+class SizeEviction:
+    """Bound the total stored payload to `max_bytes`, dropping least recently used rows."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+
+    def is_fresh(self, created_at: float, now: float) -> bool:
+        return True
+
+    def evict(self, conn: sqlite3.Connection, now: float) -> int:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        to_drop = []
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            to_drop.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", to_drop)
+        return len(to_drop)
+
+
+_POLICIES = {
+    "lru": lambda cfg: LRUEviction(cfg["max_entries"]),
+    "ttl": lambda cfg: TTLEviction(cfg["ttl_seconds"]),
+    "size": lambda cfg: SizeEviction(cfg["max_bytes"]),
+}
+
+
+def build_policies(names: str, max_entries: int, ttl_seconds: float, max_bytes: int) -> list:
+    """Build eviction policies from a comma separated list such as "lru,ttl,size"."""
+    cfg = {"max_entries": max_entries, "ttl_seconds": ttl_seconds, "max_bytes": max_bytes}
+    policies = []
+    for name in (n.strip().lower() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in _POLICIES:
+            raise ValueError(f"Unknown LLM cache eviction policy: {name}")
+        policies.append(_POLICIES[name](cfg))
+    return policies
+
+
+class LLMCache:
+    def __init__(self, path: str, policies: list | None = None):
+        self.path = path
+        self.policies = policies or []
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, temperature: float, messages) -> str:
+        """Hash model, temperature and the rendered chat messages into a cache key."""
+        rendered = [(getattr(m, "type", "unknown"), getattr(m, "content", str(m))) for m in messages]
+        payload = json.dumps(
+            {"model": model, "temperature": round(float(temperature), 4), "messages": rendered},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or not all(p.is_fresh(row[1], now) for p in self.policies):
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._evictions += 1
+                self._misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self._hits += 1
+            return row[0]
+
+    def set(self, key: str, model: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, value, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, model, value, len(value.encode("utf-8")), now, now),
+            )
+            for policy in self.policies:
+                self._evictions += policy.evict(self._conn, now)
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+                "entries": entries,
+                "bytes": total,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,18 +1,273 @@
 # Production-safe LLM client wrapper (LangChain)
 # Uses OpenAI-compatible endpoint (works with NVIDIA NIM gateways that expose OpenAI API format)
+import asyncio
+import logging
 import os
+import threading
+import httpx
 from langchain_openai import ChatOpenAI
+from core.config import settings
+from service.llm_cache import LLMCache, build_policies
+from service.tokens import estimate_tokens
+from service.tracing import span, start_span, add_to_current
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "moonshotai/kimi-k2-instruct"  # Use a valid NVIDIA model
+
+_cache: LLMCache | None = None
+
+# Process-wide client registry: one ChatOpenAI per (model, temperature, base_url), all
+# sharing the same keep-alive connection pools so TLS handshakes are paid once per worker.
+_clients: dict[tuple, ChatOpenAI] = {}
+_http_client: httpx.Client | None = None
+_http_async_client: httpx.AsyncClient | None = None
+_registry_lock = threading.Lock()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _request_timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+
+
+# Every HTTP attempt (including the client's own retries) is counted on the current span
+def _count_request(request: httpx.Request):
+    add_to_current("http_requests")
+
+
+async def _acount_request(request: httpx.Request):
+    add_to_current("http_requests")
+
+
+def _shared_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    global _http_client, _http_async_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.Client(limits=_pool_limits(), timeout=_request_timeout(),
+                                    event_hooks={"request": [_count_request]})
+    if _http_async_client is None or _http_async_client.is_closed:
+        _http_async_client = httpx.AsyncClient(limits=_pool_limits(), timeout=_request_timeout(),
+                                               event_hooks={"request": [_acount_request]})
+    return _http_client, _http_async_client
+
 
 def get_llm(model: str | None = None, temperature: float = 0.2):
-    api_key = "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"
-    base_url = "https://integrate.api.nvidia.com/v1"  # set this to your NIM gateway if needed
-    model = model or "moonshotai/kimi-k2-instruct"  # Use a valid NVIDIA model
+    api_key = os.getenv("LLM_API_KEY") or "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"
+    base_url = settings.LLM_BASE_URL  # set this to your NIM gateway if needed
+    model = model or DEFAULT_MODEL
     if not api_key:
         raise RuntimeError("Missing NIM_API_KEY/OPENAI_API_KEY")
 
-    return ChatOpenAI(
-        model=model,
-        temperature=temperature,
-        api_key=api_key,
-        base_url=base_url  # if using NIM with OpenAI-compatible API
+    key = (model, float(temperature), base_url)
+    with _registry_lock:
+        llm = _clients.get(key)
+        if llm is None:
+            http_client, http_async_client = _shared_http_clients()
+            llm = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                api_key=api_key,
+                base_url=base_url,  # if using NIM with OpenAI-compatible API
+                timeout=settings.LLM_REQUEST_TIMEOUT,
+                max_retries=settings.LLM_MAX_RETRIES,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            _clients[key] = llm
+        return llm
+
+
+def _reset_registry() -> tuple[httpx.Client | None, httpx.AsyncClient | None]:
+    global _http_client, _http_async_client, _cache
+    with _registry_lock:
+        clients = (_http_client, _http_async_client)
+        _clients.clear()
+        _http_client = None
+        _http_async_client = None
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+    return clients
+
+
+def close_llm_clients():
+    """Close pooled connections (sync callers, e.g. scripts and benchmarks)."""
+    http_client, http_async_client = _reset_registry()
+    if http_client is not None:
+        http_client.close()
+    if http_async_client is not None:
+        asyncio.run(http_async_client.aclose())
+
+
+async def aclose_llm_clients():
+    """Close pooled connections; wired into the FastAPI lifespan shutdown."""
+    http_client, http_async_client = _reset_registry()
+    if http_client is not None:
+        http_client.close()
+    if http_async_client is not None:
+        await http_async_client.aclose()
+
+
+def get_llm_cache() -> LLMCache | None:
+    """Return the process-wide response cache, or None when caching is disabled."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    # Same lock as `_reset_registry`, which closes the cache; concurrent candidate threads
+    # must not open two SQLite connections
+    with _registry_lock:
+        if _cache is None:
+            _cache = LLMCache(
+                settings.LLM_CACHE_PATH,
+                build_policies(
+                    settings.LLM_CACHE_POLICIES,
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                    max_bytes=settings.LLM_CACHE_MAX_BYTES,
+                ),
+            )
+        return _cache
+
+
+def _record_usage(s, messages, content: str, response=None, cache_hit: bool = False):
+    """Token counts (API usage when reported, else estimated), retries, cost and sizes on an llm span."""
+    usage = {}
+    if response is not None:
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    prompt_tokens = usage.get("prompt_tokens") or sum(estimate_tokens(str(m.content)) for m in messages)
+    completion_tokens = usage.get("completion_tokens") or estimate_tokens(content)
+    s.set(
+        cache_hit=cache_hit,
+        prompt_tokens=0 if cache_hit else prompt_tokens,
+        completion_tokens=0 if cache_hit else completion_tokens,
+        tokens_estimated=not usage,
+        output_chars=len(content),
     )
+    if cache_hit:
+        s.set(tokens_saved=prompt_tokens + completion_tokens)
+        return
+    requests = s.attributes.get("http_requests", 0)
+    if requests > 1:
+        s.set(retries=requests - 1)
+    cost = (prompt_tokens * settings.LLM_COST_PER_1K_PROMPT_TOKENS
+            + completion_tokens * settings.LLM_COST_PER_1K_COMPLETION_TOKENS) / 1000
+    if cost:
+        s.set(cost_usd=round(cost, 6))
+
+
+def invoke_llm(prompt, inputs: dict, model: str | None = None, temperature: float = 0.2,
+               use_cache: bool = True, validate=None) -> str:
+    """
+    Render `prompt` with `inputs`, answer from the response cache when possible and
+    otherwise call the LLM. Returns the response text. With `validate`, only replies for
+    which `validate(text)` is true are cached; a cached reply that fails it is dropped.
+    """
+    model = model or DEFAULT_MODEL
+    messages = prompt.format_messages(**inputs)
+    cache = get_llm_cache() if use_cache else None
+
+    with span("llm.invoke", model=model, temperature=temperature) as s:
+        key = None
+        if cache is not None:
+            key = cache.make_key(model, temperature, messages)
+            cached = cache.get(key)
+            if cached is not None and validate is not None and not validate(cached):
+                cache.delete(key)  # written before validation existed, or by another caller
+                cached = None
+            if cached is not None:
+                logger.info(f"♻️ LLM cache hit ({model}, key={key[:12]})")
+                _record_usage(s, messages, cached, cache_hit=True)
+                return cached
+
+        response = get_llm(model, temperature).invoke(messages)
+        content = response.content
+        _record_usage(s, messages, content, response)
+
+    if cache is not None and (validate is None or validate(content)):
+        cache.set(key, model, content)
+    return content
+
+
+async def ainvoke_llm(prompt, inputs: dict, model: str | None = None, temperature: float = 0.2,
+                      use_cache: bool = True, validate=None) -> str:
+    """Async twin of `invoke_llm` using the pooled async HTTP client."""
+    model = model or DEFAULT_MODEL
+    messages = prompt.format_messages(**inputs)
+    cache = get_llm_cache() if use_cache else None
+
+    with span("llm.invoke", model=model, temperature=temperature) as s:
+        key = None
+        if cache is not None:
+            key = cache.make_key(model, temperature, messages)
+            cached = cache.get(key)
+            if cached is not None and validate is not None and not validate(cached):
+                cache.delete(key)  # written before validation existed, or by another caller
+                cached = None
+            if cached is not None:
+                logger.info(f"♻️ LLM cache hit ({model}, key={key[:12]})")
+                _record_usage(s, messages, cached, cache_hit=True)
+                return cached
+
+        response = await get_llm(model, temperature).ainvoke(messages)
+        content = response.content
+        _record_usage(s, messages, content, response)
+
+    if cache is not None and (validate is None or validate(content)):
+        cache.set(key, model, content)
+    return content
+
+
+async def astream_llm(prompt, inputs: dict, model: str | None = None, temperature: float = 0.2,
+                      use_cache: bool = True):
+    """
+    Yield response text chunks as the model produces them. A cache hit is yielded as a
+    single chunk; a completed stream is written back to the cache.
+    """
+    model = model or DEFAULT_MODEL
+    messages = prompt.format_messages(**inputs)
+    cache = get_llm_cache() if use_cache else None
+
+    # Not made current: the generator is resumed from whatever context consumes it
+    s = start_span("llm.invoke", model=model, temperature=temperature, streaming=True)
+    key = None
+    if cache is not None:
+        key = cache.make_key(model, temperature, messages)
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"♻️ LLM cache hit ({model}, key={key[:12]})")
+            _record_usage(s, messages, cached, cache_hit=True)
+            s.end()
+            yield cached
+            return
+
+    parts = []
+    try:
+        async for chunk in get_llm(model, temperature).astream(messages):
+            if chunk.content:
+                if not parts:
+                    s.set(first_chunk_ms=round(s.elapsed() * 1000, 1))
+                parts.append(chunk.content)
+                yield chunk.content
+    except GeneratorExit:
+        s.set(aborted=True)  # consumer stopped reading
+        s.end()
+        raise
+    except BaseException as e:
+        s.end(e)
+        raise
+    _record_usage(s, messages, "".join(parts))
+    s.end()
+
+    if cache is not None:
+        cache.set(key, model, "".join(parts))
+
+
+def llm_cache_stats() -> dict:
+    cache = get_llm_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,121 @@
+# Token-budgeted compaction of execution logs before they go into a prompt.
+#
+# Training scripts can print megabytes: a ConvergenceWarning per fold, per-epoch progress
+# lines, a whole DataFrame. `compact_log` keeps what an agent needs to reason about the
+# run within LOG_COMPACT_MAX_TOKENS (estimated locally, see service/tokens.py):
+#   1. the final traceback is split off and kept whole (it is what the debug agent fixes);
+#   2. over-long lines are clipped;
+#   3. repeated lines anywhere in the log are kept once with a `[repeated Nx]` count
+#      (a warning and its `warnings.warn(` line collapse together);
+#   4. runs of consecutive lines that differ only in numbers (epochs, progress) keep the
+#      first and last line plus a count;
+#   5. if it still doesn't fit, only head/tail windows of the rest are kept, shrinking
+#      until the budget is met.
+# Logs already within budget are returned unchanged.
+import logging
+import re
+
+from service.tokens import estimate_tokens, CHARS_PER_TOKEN
+from service.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+_TRACEBACK = "Traceback (most recent call last):"
+_NUMBERS = re.compile(r"[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_TRACEBACK_HEAD = 3  # "Traceback ..." + the outermost frame, when even the traceback must shrink
+
+
+def _settings():
+    from core.config import settings
+    return settings
+
+
+def _clip(line: str, max_chars: int) -> str:
+    if len(line) <= max_chars:
+        return line
+    return f"{line[:max_chars]}... [+{len(line) - max_chars} chars]"
+
+
+def _split_final_traceback(lines: list) -> tuple[list, list]:
+    for i in range(len(lines) - 1, -1, -1):
+        if lines[i].lstrip().startswith(_TRACEBACK):
+            return lines[:i], lines[i:]
+    return lines, []
+
+
+def _dedupe(lines: list) -> list:
+    counts = {}
+    for line in lines:
+        if line.strip():
+            counts[line] = counts.get(line, 0) + 1
+    kept, emitted = [], set()
+    for line in lines:
+        if not line.strip():
+            if kept and kept[-1].strip():
+                kept.append(line)
+            continue
+        if line in emitted:
+            continue
+        emitted.add(line)
+        n = counts[line]
+        kept.append(f"{line}  [repeated {n}x]" if n > 1 else line)
+    return kept
+
+
+def _collapse_runs(lines: list) -> list:
+    out, i = [], 0
+    while i < len(lines):
+        key = _NUMBERS.sub("#", lines[i])
+        j = i + 1
+        if key != lines[i]:  # only lines that contain numbers form runs
+            while j < len(lines) and _NUMBERS.sub("#", lines[j]) == key:
+                j += 1
+        if j - i > 2:
+            out += [lines[i], f"... [{j - i - 2} similar lines] ...", lines[j - 1]]
+        else:
+            out += lines[i:j]
+        i = j
+    return out
+
+
+def _window(lines: list, head: int, tail: int) -> list:
+    if len(lines) <= head + tail:
+        return lines
+    omitted = f"... [{len(lines) - head - tail} lines omitted] ..."
+    return lines[:head] + [omitted] + (lines[-tail:] if tail else [])
+
+
+def compact_log(text: str, max_tokens: int | None = None) -> str:
+    """`text` reduced to about `max_tokens` (default LOG_COMPACT_MAX_TOKENS) tokens."""
+    settings = _settings()
+    budget = max_tokens or settings.LOG_COMPACT_MAX_TOKENS
+    # Every token covers at least one character, so short logs skip the tokenizer entirely;
+    # logs far over budget skip it too (tokenizing megabytes is slow)
+    if not text or len(text) <= budget:
+        return text
+    if len(text) <= budget * CHARS_PER_TOKEN * 2 and estimate_tokens(text) <= budget:
+        return text
+
+    lines = [_clip(l, settings.LOG_COMPACT_MAX_LINE_CHARS) for l in text.splitlines()]
+    body, traceback = _split_final_traceback(lines)
+    body = _collapse_runs(_dedupe(body))
+
+    head, tail = settings.LOG_COMPACT_HEAD_LINES, settings.LOG_COMPACT_TAIL_LINES
+    tb_tail = len(traceback)
+    while True:
+        tb = _window(traceback, _TRACEBACK_HEAD, tb_tail) if traceback else []
+        compacted = "\n".join(_window(body, head, tail) + tb)
+        if estimate_tokens(compacted) <= budget:
+            break
+        if head or tail:
+            head, tail = head // 2, tail // 2
+        elif tb_tail > 1:
+            tb_tail //= 2
+        else:
+            # One enormous line left over; keep its end, where errors are
+            compacted = "... [truncated] ...\n" + compacted[-budget * CHARS_PER_TOKEN:]
+            break
+
+    metrics.inc("autodev_log_compactions_total", 1, "Execution logs compacted to fit a prompt budget")
+    logger.debug(f"🗜️ Compacted log from {len(text)} to {len(compacted)} chars")
+    return compacted
@@ -0,0 +1,104 @@
+# Live log fan-out for executions: a bounded ring buffer of recent lines, an on-disk
+# log file, and asyncio subscribers (e.g. a WebSocket tailing the TerminalPanel).
+# Lines are published from executor reader threads, so everything here is thread-safe.
+import asyncio
+import collections
+import os
+import threading
+import time
+
+MAX_CHANNELS = 100
+
+
+class LogChannel:
+    def __init__(self, name: str, log_path: str, max_lines: int = 5000):
+        self.name = name
+        self.log_path = log_path
+        self.closed = False
+        self.returncode = None
+        self._seq = 0
+        self._buffer = collections.deque(maxlen=max_lines)
+        self._subscribers = []  # (loop, queue)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        self._log = open(log_path, "a", encoding="utf-8")
+        self._log.write(f"=== execution started {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+        self._log.flush()
+
+    def publish(self, stream: str, line: str):
+        with self._lock:
+            if self.closed:
+                return
+            self._seq += 1
+            item = {"seq": self._seq, "stream": stream, "line": line.rstrip("\n")}
+            self._buffer.append(item)
+            self._log.write(line if line.endswith("\n") else line + "\n")
+            self._log.flush()
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, item)
+
+    def backlog(self) -> list:
+        with self._lock:
+            return list(self._buffer)
+
+    def subscribe(self, max_queue: int = 1000) -> asyncio.Queue:
+        """Register a queue on the running loop; it receives line dicts and finally None."""
+        queue = asyncio.Queue(maxsize=max_queue)
+        with self._lock:
+            if self.closed:
+                queue.put_nowait(None)
+            else:
+                self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = [(l, q) for l, q in self._subscribers if q is not queue]
+
+    def close(self, returncode: int | None = None):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.returncode = returncode
+            self._log.write(f"=== execution finished (returncode={returncode}) ===\n")
+            self._log.close()
+            subscribers, self._subscribers = self._subscribers, []
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, None)
+
+
+def _offer(queue: asyncio.Queue, item):
+    # Slow subscribers lose their oldest lines rather than blocking the executor
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(item)
+
+
+_channels: "collections.OrderedDict[str, LogChannel]" = collections.OrderedDict()
+_channels_lock = threading.Lock()
+
+
+def open_channel(project_dir: str, max_lines: int = 5000) -> LogChannel:
+    """Start a fresh channel for an execution in `project_dir` (keyed by project name)."""
+    name = os.path.basename(os.path.normpath(project_dir))
+    channel = LogChannel(name, os.path.join(project_dir, "logs", "execution.log"), max_lines)
+    with _channels_lock:
+        previous = _channels.pop(name, None)
+        _channels[name] = channel
+        while len(_channels) > MAX_CHANNELS:
+            _, oldest = _channels.popitem(last=False)
+            oldest.close()
+    if previous is not None:
+        previous.close()
+    return channel
+
+
+def get_channel(name: str) -> LogChannel | None:
+    with _channels_lock:
+        return _channels.get(name)
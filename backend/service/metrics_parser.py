@@ -0,0 +1,196 @@
+# Deterministic metrics extraction from a training script's stdout.
+#
+# The coder prompt makes every script print its metrics as `METRIC_NAME: value` lines, and
+# most also print an sklearn classification_report and a confusion matrix. `MetricsParser`
+# reads the output once, line by line (it can be fed as the output streams), and builds a
+# `MetricsRecord`: named metrics, the per-class report and the matrix, whether the script
+# reached EXECUTION_COMPLETE, and the last few lines for context. The evaluator uses it as
+# its primary path; the LLM only ever sees `digest()` and the tail.
+import io
+import re
+from collections import deque
+from dataclasses import dataclass, field
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+# `ACCURACY: 0.97`, `F1_SCORE = 0.88`, `Test R2: 0.71`, `Accuracy: 97.5%`
+_METRIC_LINE = re.compile(rf"^\s*([A-Za-z][\w \-/^@().]*?)\s*[:=]\s*({_NUMBER})\s*(%?)\s*$")
+# Scripts print hyperparameters the same way (RANDOM_STATE: 42, LEARNING_RATE: 0.1), so
+# upper case alone doesn't make a metric: the name must be a known metric (or alias) or
+# contain a metric word ("TRAIN_LOSS", "CV_F1_MEAN"); "Epoch: 3" or "TEST_SIZE: 0.2" don't count
+_METRIC_WORDS = {"accuracy", "acc", "f1", "precision", "recall", "auc", "r2", "mae", "mse", "rmse",
+                 "mape", "loss", "error", "score", "silhouette", "specificity", "sensitivity", "kappa",
+                 "mcc", "iou", "dice", "bleu", "rouge", "perplexity"}
+
+_ALIASES = {
+    "acc": "accuracy", "accuracy_score": "accuracy", "test_accuracy": "accuracy",
+    "f1_score": "f1", "f1score": "f1", "f1_macro_score": "f1_macro",
+    "precision_score": "precision", "recall_score": "recall",
+    "r2_score": "r2", "r^2": "r2", "r_squared": "r2",
+    "mean_absolute_error": "mae", "mean_squared_error": "mse", "root_mean_squared_error": "rmse",
+    "roc_auc_score": "roc_auc", "auc": "roc_auc", "auc_roc": "roc_auc",
+    "logloss": "log_loss",
+}
+_KNOWN = {"accuracy", "f1", "f1_macro", "f1_weighted", "precision", "recall", "r2", "mae", "mse",
+          "rmse", "mape", "roc_auc", "log_loss", "balanced_accuracy", "silhouette", "specificity"}
+
+_REPORT_HEADER = re.compile(r"^\s*precision\s+recall\s+f1-score\s+support\s*$")
+_REPORT_ROW = re.compile(rf"^\s*(.+?)\s+({_NUMBER})\s+({_NUMBER})\s+({_NUMBER})\s+(\d+)\s*$")
+_REPORT_ACCURACY = re.compile(rf"^\s*accuracy\s+({_NUMBER})\s+(\d+)\s*$")
+
+_MATRIX_ROW = re.compile(r"\[([^\[\]]+)\]")
+_MATRIX_MAX_LINES = 200
+
+COMPLETION_MARKER = "EXECUTION_COMPLETE"
+
+
+def is_metric_name(name: str) -> bool:
+    """`name` as returned by `normalize_metric_name`."""
+    return name in _KNOWN or bool(_METRIC_WORDS & set(name.split("_")))
+
+
+def normalize_metric_name(name: str) -> str:
+    key = re.sub(r"[\s\-/]+", "_", name.strip().lower()).strip("_")
+    for prefix in ("test_", "val_", "validation_", "final_"):
+        if key.startswith(prefix) and key[len(prefix):] in _KNOWN | set(_ALIASES):
+            key = key[len(prefix):]
+            break
+    return _ALIASES.get(key, key)
+
+
+@dataclass
+class MetricsRecord:
+    metrics: dict = field(default_factory=dict)                # name -> float, last value wins
+    classification_report: dict = field(default_factory=dict)  # label -> {precision, recall, f1-score, support}
+    confusion_matrix: list = field(default_factory=list)       # rows of numbers
+    completed: bool = False                                    # saw EXECUTION_COMPLETE
+    lines: int = 0
+    tail: list = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "metrics": self.metrics,
+            "classification_report": self.classification_report,
+            "confusion_matrix": self.confusion_matrix,
+            "completed": self.completed,
+            "lines": self.lines,
+        }
+
+    def digest(self) -> str:
+        """A few lines describing the run, for prompts and logs."""
+        parts = [f"lines: {self.lines}, completed: {'yes' if self.completed else 'no'}"]
+        if self.metrics:
+            parts.append("metrics: " + ", ".join(f"{k}={v:.4g}" for k, v in self.metrics.items()))
+        classes = {k: v for k, v in self.classification_report.items() if "avg" not in k}
+        if classes:
+            parts.append("per class f1: " + ", ".join(f"{k}={v['f1-score']:.3g} (n={v['support']})"
+                                                        for k, v in classes.items()))
+        if self.confusion_matrix:
+            parts.append(f"confusion matrix: {self.confusion_matrix}")
+        return "\n".join(parts)
+
+
+class MetricsParser:
+    def __init__(self, tail_lines: int = 40):
+        self._record = MetricsRecord()
+        self._tail = deque(maxlen=tail_lines)
+        self._partial = ""
+        self._in_report = False
+        self._matrix_text = None  # text of a `[[...` block still being read
+
+    def feed(self, chunk: str):
+        """Feed output as it arrives; only complete lines are parsed until `result()`."""
+        text = self._partial + chunk
+        lines = text.split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self.feed_line(line)
+
+    def feed_line(self, line: str):
+        line = line.rstrip("\r\n")
+        self._record.lines += 1
+        self._tail.append(line)
+
+        if self._matrix_text is not None:
+            self._read_matrix(line)
+            return
+        if self._in_report:
+            if self._read_report(line):
+                return
+            self._in_report = False
+        if _REPORT_HEADER.match(line):
+            self._in_report = True
+            return
+        if line.lstrip().startswith("[["):
+            self._matrix_text = ""
+            self._read_matrix(line)
+            return
+        if line.strip() == COMPLETION_MARKER:
+            self._record.completed = True
+            return
+        self._read_metric(line)
+
+    def result(self) -> MetricsRecord:
+        if self._partial:
+            partial, self._partial = self._partial, ""
+            self.feed_line(partial)
+        if self._matrix_text is not None:
+            self._finish_matrix()
+        self._record.tail = list(self._tail)
+        return self._record
+
+    # ---- line kinds ----
+    def _read_metric(self, line: str):
+        m = _METRIC_LINE.match(line)
+        if not m:
+            return
+        raw_name, value, percent = m.groups()
+        name = normalize_metric_name(raw_name)
+        if not is_metric_name(name):
+            return
+        value = float(value)
+        self._record.metrics[name] = value / 100 if percent else value
+
+    def _read_report(self, line: str) -> bool:
+        """One line of a classification_report; False when the report has ended."""
+        if not line.strip():
+            return True
+        report, metrics = self._record.classification_report, self._record.metrics
+        m = _REPORT_ACCURACY.match(line)
+        if m:
+            metrics.setdefault("accuracy", float(m.group(1)))
+            return True
+        m = _REPORT_ROW.match(line)
+        if not m:
+            return False
+        label, precision, recall, f1, support = m.groups()
+        report[label] = {"precision": float(precision), "recall": float(recall),
+                         "f1-score": float(f1), "support": int(support)}
+        if label in ("macro avg", "weighted avg"):
+            metrics.setdefault(f"f1_{label.split()[0]}", float(f1))
+        return True
+
+    def _read_matrix(self, line: str):
+        self._matrix_text += line + "\n"
+        if "]]" in line or self._matrix_text.count("\n") >= _MATRIX_MAX_LINES:
+            self._finish_matrix()
+
+    def _finish_matrix(self):
+        text, self._matrix_text = self._matrix_text, None
+        rows = []
+        for row in _MATRIX_ROW.findall(text):
+            values = re.findall(_NUMBER, row)
+            if not values:
+                return
+            rows.append([float(v) if "." in v or "e" in v.lower() else int(v) for v in values])
+        # A confusion matrix is square; other nested lists printed by the script are not
+        if rows and all(len(r) == len(rows) for r in rows):
+            self._record.confusion_matrix = rows
+
+
+def parse_metrics(output: str, tail_lines: int = 40) -> MetricsRecord:
+    """Single pass over a finished run's stdout."""
+    parser = MetricsParser(tail_lines)
+    for line in io.StringIO(output or ""):
+        parser.feed_line(line)
+    return parser.result()
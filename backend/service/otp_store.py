@@ -0,0 +1,271 @@
+# Expiring key/value store for OTPs and per-email rate limits.
+#
+# The OTP routes (api/routes/user.py) only need five operations: put with a TTL, get,
+# delete, an atomic get-and-delete (so a code is used once even under concurrent
+# requests), and a windowed counter for rate limiting. OTP_STORE_BACKEND picks where they live:
+#   memory  dict + min-heap of expiry times in this process; expired keys are swept from
+#           the heap top on every call (amortised O(log n) per key). Single worker only.
+#   sql     the `ephemeral_keys` table (db/models.py) through the async engine; reads filter
+#           on the indexed `expires_at` and a periodic range DELETE sweeps expired rows.
+#           Shared by every worker using the database.
+#   redis   a Redis-compatible server (OTP_REDIS_URL) with native key expiry.
+import heapq
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+class StoreFull(RuntimeError):
+    """The in-memory store reached OTP_MEMORY_MAX_ENTRIES live keys."""
+
+
+class OTPStore(ABC):
+    @abstractmethod
+    async def put(self, key: str, value: str, ttl: float):
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def pop(self, key: str) -> str | None:
+        """Delete `key` and return its live value; of concurrent callers only one gets it."""
+
+    @abstractmethod
+    async def incr(self, key: str, window: float) -> int:
+        """Count one event in a fixed window that starts with the first event; returns the count."""
+
+    async def allow(self, key: str, limit: int, window: float) -> bool:
+        """Rate limit: at most `limit` events per `window` seconds for `key`."""
+        return await self.incr(key, window) <= limit
+
+    async def close(self):
+        pass
+
+
+class MemoryOTPStore(OTPStore):
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._values = {}  # key -> [value, counter, expires_at]
+        self._heap = []    # (expires_at, key); stale pairs are skipped when popped
+
+    def _sweep(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            entry = self._values.get(key)
+            if entry is not None and entry[2] == expires_at:
+                del self._values[key]
+
+    def _live(self, key: str, now: float):
+        entry = self._values.get(key)
+        return entry if entry is not None and entry[2] > now else None
+
+    def _set(self, key: str, entry: list, now: float):
+        if key not in self._values and len(self._values) >= self.max_entries:
+            raise StoreFull(f"{len(self._values)} live keys")
+        self._values[key] = entry
+        heapq.heappush(self._heap, (entry[2], key))
+
+    async def put(self, key: str, value: str, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._set(key, [value, 0, now + ttl], now)
+
+    async def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            entry = self._live(key, now)
+            return entry[0] if entry is not None else None
+
+    async def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+    async def pop(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            entry = self._values.pop(key, None)
+            return entry[0] if entry is not None and entry[2] > now else None
+
+    async def incr(self, key: str, window: float) -> int:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            entry = self._live(key, now)
+            if entry is None:
+                entry = [None, 0, now + window]
+                self._set(key, entry, now)
+            entry[1] += 1
+            return entry[1]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class SQLOTPStore(OTPStore):
+    def __init__(self, session_factory=None, sweep_interval: float = 60.0):
+        if session_factory is None:
+            from db.session import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    @staticmethod
+    def _insert(db):
+        # INSERT .. ON CONFLICT DO UPDATE exists on both supported databases
+        if db.bind.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        from db.models import EphemeralKey
+        return insert(EphemeralKey)
+
+    async def _maybe_sweep(self, db, now: float):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        from sqlalchemy import delete
+        from db.models import EphemeralKey
+
+        result = await db.execute(delete(EphemeralKey).where(EphemeralKey.expires_at <= now))
+        if result.rowcount:
+            logger.debug(f"Swept {result.rowcount} expired ephemeral keys")
+
+    async def put(self, key: str, value: str, ttl: float):
+        now = time.time()
+        async with self.session_factory() as db:
+            stmt = self._insert(db).values(key=key, value=value, counter=0, expires_at=now + ttl)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={"value": stmt.excluded.value, "counter": 0, "expires_at": stmt.excluded.expires_at},
+            )
+            await db.execute(stmt)
+            await self._maybe_sweep(db, now)
+            await db.commit()
+
+    async def get(self, key: str) -> str | None:
+        from sqlalchemy import select
+        from db.models import EphemeralKey
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(EphemeralKey.value).where(EphemeralKey.key == key, EphemeralKey.expires_at > time.time())
+            )
+            return result.scalar_one_or_none()
+
+    async def delete(self, key: str):
+        from sqlalchemy import delete
+        from db.models import EphemeralKey
+
+        async with self.session_factory() as db:
+            await db.execute(delete(EphemeralKey).where(EphemeralKey.key == key))
+            await db.commit()
+
+    async def pop(self, key: str) -> str | None:
+        from sqlalchemy import delete
+        from db.models import EphemeralKey
+
+        async with self.session_factory() as db:
+            # DELETE .. RETURNING: the row lock makes one concurrent caller see it
+            result = await db.execute(
+                delete(EphemeralKey)
+                .where(EphemeralKey.key == key, EphemeralKey.expires_at > time.time())
+                .returning(EphemeralKey.value)
+            )
+            value = result.scalar_one_or_none()
+            await db.commit()
+            return value
+
+    async def incr(self, key: str, window: float) -> int:
+        from sqlalchemy import case
+        from db.models import EphemeralKey
+
+        now = time.time()
+        async with self.session_factory() as db:
+            stmt = self._insert(db).values(key=key, value=None, counter=1, expires_at=now + window)
+            expired = EphemeralKey.expires_at <= now
+            # Atomic per row: an expired window restarts at 1, a live one counts up
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={
+                    "counter": case((expired, 1), else_=EphemeralKey.counter + 1),
+                    "expires_at": case((expired, stmt.excluded.expires_at), else_=EphemeralKey.expires_at),
+                },
+            ).returning(EphemeralKey.counter)
+            count = (await db.execute(stmt)).scalar_one()
+            await self._maybe_sweep(db, now)
+            await db.commit()
+            return count
+
+
+class RedisOTPStore(OTPStore):
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def put(self, key: str, value: str, ttl: float):
+        await self._redis.set(key, value, px=int(ttl * 1000))
+
+    async def get(self, key: str) -> str | None:
+        return await self._redis.get(key)
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+    async def pop(self, key: str) -> str | None:
+        return await self._redis.getdel(key)
+
+    async def incr(self, key: str, window: float) -> int:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.incr(key)
+            pipe.pexpire(key, int(window * 1000), nx=True)  # only the first event opens the window
+            count, _ = await pipe.execute()
+        return count
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+_store: OTPStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store() -> OTPStore:
+    global _store
+    from core.config import settings
+
+    with _store_lock:
+        if _store is None:
+            backend = settings.OTP_STORE_BACKEND.lower()
+            if backend == "memory":
+                _store = MemoryOTPStore(settings.OTP_MEMORY_MAX_ENTRIES)
+            elif backend == "sql":
+                _store = SQLOTPStore(sweep_interval=settings.OTP_SWEEP_INTERVAL)
+            elif backend == "redis":
+                _store = RedisOTPStore(settings.OTP_REDIS_URL)
+            else:
+                raise ValueError(f"Unknown OTP_STORE_BACKEND: {settings.OTP_STORE_BACKEND}")
+            logger.info(f"🔑 OTP store: {backend}")
+        return _store
+
+
+async def close_otp_store():
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        await store.close()
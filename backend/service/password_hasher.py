@@ -0,0 +1,101 @@
+# Process pool for bcrypt password hashing.
+#
+# bcrypt is deliberately slow (100-300 ms of CPU per hash or verify). Called inline from an
+# async route it freezes the event loop; in the shared threadpool a burst of logins queues
+# behind the sync routes and competes for the GIL. `ahash_password` / `averify_password`
+# send the work to a pool of PASSWORD_HASH_PROCESSES worker processes (one per CPU by
+# default), so logins scale across cores while the API process keeps serving requests.
+# With PASSWORD_HASH_POOL=false they fall back to the default threadpool.
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+# Run in the worker processes; core.security owns the CryptContext configuration
+def _hash(password: str) -> str:
+    from core.security import get_password_hash
+    return get_password_hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    from core.security import verify_password
+    return verify_password(plain_password, hashed_password)
+
+
+def _warm() -> int:
+    import core.security  # noqa: F401  (pay the import once per worker, not on the first login)
+    return os.getpid()
+
+
+def _processes() -> int:
+    from core.config import settings
+    return settings.PASSWORD_HASH_PROCESSES or os.cpu_count() or 1
+
+
+def get_password_pool() -> ProcessPoolExecutor | None:
+    """The process-wide hashing pool, or None when PASSWORD_HASH_POOL is off."""
+    global _pool
+    from core.config import settings
+
+    if not settings.PASSWORD_HASH_POOL:
+        return None
+    with _lock:
+        if _pool is None:
+            # forkserver: never fork the threaded API process itself
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+            _pool = ProcessPoolExecutor(max_workers=_processes(),
+                                        mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def start_password_hasher():
+    """Spawn the workers up front so the first logins don't pay the process start-up."""
+    pool = get_password_pool()
+    if pool is not None:
+        for _ in range(_processes()):
+            pool.submit(_warm)
+        logger.info(f"🔐 Password hashing pool started ({_processes()} processes)")
+
+
+def shutdown_password_hasher():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _reset_broken(pool: ProcessPoolExecutor):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+
+
+async def _run(fn, *args):
+    loop = asyncio.get_running_loop()
+    pool = get_password_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); start a fresh pool and retry once
+        logger.warning("⚠️ Password hashing pool broke; restarting it")
+        _reset_broken(pool)
+        return await loop.run_in_executor(get_password_pool(), fn, *args)
+
+
+async def ahash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(_verify, plain_password, hashed_password)
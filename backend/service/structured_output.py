@@ -0,0 +1,219 @@
+# Structured (JSON) output from the agents.
+#
+# Models wrap JSON in ```json fences, put prose before or after it, or nest objects deeper
+# than a regex can follow. `JSONExtractor` scans text (whole or streamed in chunks) for
+# balanced top-level {...} / [...] spans, tracking strings and escapes so braces inside
+# values don't confuse it. `parse_structured` validates each candidate against a Pydantic
+# model (schema/agent_output.py) and returns the first one that fits.
+#
+# `invoke_structured` / `ainvoke_structured` call the LLM and, if the reply doesn't parse,
+# make ONE repair request that sends only the bad reply, the validation error and the JSON
+# schema (not the original context), at temperature 0. If that fails too, StructuredOutputError
+# is raised instead of inventing an answer. Only replies that validate are written to the
+# LLM cache, and the repair is never cached, so a bad reply isn't replayed. Outcomes are counted per agent in
+# `autodev_structured_output_total{agent, outcome}`; `structured_output_stats()` reports
+# the parse-success rates.
+import json
+import logging
+import threading
+
+from langchain.prompts import ChatPromptTemplate
+from pydantic import ValidationError
+
+from service.llm_client import invoke_llm, ainvoke_llm
+from service.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+_OPEN = {"{": "}", "[": "]"}
+
+
+class StructuredOutputError(ValueError):
+    """An LLM reply that doesn't hold valid JSON for the expected schema, even after repair."""
+
+    def __init__(self, agent: str, error: str, response: str):
+        super().__init__(f"{agent}: {error}")
+        self.agent = agent
+        self.error = error
+        self.response = response
+
+
+class JSONExtractor:
+    """
+    Incremental balanced-brace scanner. `feed(chunk)` returns the top-level JSON values
+    that chunk completed; spans that aren't valid JSON are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = []   # characters of the span being collected
+        self._stack = []    # expected closing brackets
+        self._in_string = False
+        self._escaped = False
+        self._offset = 0    # characters fed so far
+        self.open_at = None  # offset of the opener of an unfinished span, if any
+
+    def feed(self, chunk: str) -> list:
+        found = []
+        for ch in chunk:
+            self._offset += 1
+            if not self._stack:
+                if ch in _OPEN:
+                    self._stack.append(_OPEN[ch])
+                    self._buffer = [ch]
+                    self.open_at = self._offset - 1
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in _OPEN:
+                self._stack.append(_OPEN[ch])
+            elif ch in "}]":
+                if ch != self._stack[-1]:
+                    self._reset()  # mismatched bracket: not JSON, look for the next opener
+                    continue
+                self._stack.pop()
+                if not self._stack:
+                    value = self._load("".join(self._buffer))
+                    if value is not None:
+                        found.append(value)
+                    self._buffer, self.open_at = [], None
+        return found
+
+    def _reset(self):
+        self._buffer, self._stack = [], []
+        self._in_string = self._escaped = False
+        self.open_at = None
+
+    @staticmethod
+    def _load(text: str):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+
+def extract_json(text: str) -> list:
+    """Every top-level JSON object/array in `text`, in order."""
+    text = text or ""
+    found, start = [], 0
+    while start < len(text):
+        extractor = JSONExtractor()
+        found.extend(extractor.feed(text[start:]))
+        if extractor.open_at is None:
+            break
+        # A stray opener in prose ("use a {key: value} map") never closed; rescan after it
+        start += extractor.open_at + 1
+    return found
+
+
+def parse_structured(text: str, model) -> dict:
+    """
+    First JSON object in `text` that validates against `model`, as a plain dict.
+    Raises ValueError describing why nothing fit.
+    """
+    candidates = [value for value in extract_json(text) if isinstance(value, dict)]
+    if not candidates:
+        raise ValueError("no JSON object found in the response")
+    errors = []
+    for value in candidates:
+        try:
+            return model.model_validate(value).model_dump()
+        except ValidationError as e:
+            errors.append(str(e))
+    # The first candidate is almost always the intended answer; its error is the useful one
+    raise ValueError(errors[0])
+
+
+_repair = ChatPromptTemplate.from_messages([
+    ("system",
+     "Your previous reply could not be used: {error}\n"
+     "Rewrite it as ONLY a JSON object matching this JSON schema, keeping its content. "
+     "No markdown fences, no text before or after the JSON.\n{schema}"),
+    ("human", "{response}"),
+])
+
+_stats_lock = threading.Lock()
+_stats = {}  # agent -> {"parsed": n, "repaired": n, "failed": n}
+
+
+def _count(agent: str, outcome: str):
+    with _stats_lock:
+        counts = _stats.setdefault(agent, {"parsed": 0, "repaired": 0, "failed": 0})
+        counts[outcome] += 1
+    metrics.inc("autodev_structured_output_total", 1, "Agent JSON replies by parse outcome",
+                agent=agent, outcome=outcome)
+
+
+def structured_output_stats() -> dict:
+    """Per agent: outcome counts, first-try parse rate and overall success rate (after repair)."""
+    with _stats_lock:
+        snapshot = {agent: dict(counts) for agent, counts in _stats.items()}
+    for counts in snapshot.values():
+        total = sum(counts.values())
+        counts["parse_rate"] = counts["parsed"] / total if total else 0.0
+        counts["success_rate"] = (counts["parsed"] + counts["repaired"]) / total if total else 0.0
+    return snapshot
+
+
+def _repair_inputs(model, response: str, error: str) -> dict:
+    return {"error": error, "response": response,
+            "schema": json.dumps(model.model_json_schema(), separators=(",", ":"))}
+
+
+def _validator(model):
+    def validate(response: str) -> bool:
+        try:
+            parse_structured(response, model)
+        except ValueError:
+            return False
+        return True
+    return validate
+
+
+def _first_try(response: str, model, agent: str):
+    try:
+        result = parse_structured(response, model)
+    except ValueError as e:
+        logger.warning(f"⚠️ {agent} reply didn't parse ({str(e).splitlines()[0]}); asking for a repair")
+        return None, str(e)
+    _count(agent, "parsed")
+    return result, None
+
+
+def _after_repair(repaired: str, model, agent: str) -> dict:
+    try:
+        result = parse_structured(repaired, model)
+    except ValueError as e:
+        _count(agent, "failed")
+        raise StructuredOutputError(agent, str(e), repaired) from None
+    _count(agent, "repaired")
+    return result
+
+
+def invoke_structured(prompt, inputs: dict, model, agent: str, **llm_options) -> dict:
+    """`invoke_llm` + `parse_structured`, with one repair re-ask. Raises StructuredOutputError."""
+    response = invoke_llm(prompt, inputs, validate=_validator(model), **llm_options)
+    result, error = _first_try(response, model, agent)
+    if error is None:
+        return result
+    repaired = invoke_llm(_repair, _repair_inputs(model, response, error), temperature=0.0, use_cache=False)
+    return _after_repair(repaired, model, agent)
+
+
+async def ainvoke_structured(prompt, inputs: dict, model, agent: str, **llm_options) -> dict:
+    """Async twin of `invoke_structured`."""
+    response = await ainvoke_llm(prompt, inputs, validate=_validator(model), **llm_options)
+    result, error = _first_try(response, model, agent)
+    if error is None:
+        return result
+    repaired = await ainvoke_llm(_repair, _repair_inputs(model, response, error), temperature=0.0,
+                                 use_cache=False)
+    return _after_repair(repaired, model, agent)
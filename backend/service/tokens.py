@@ -0,0 +1,23 @@
+# Local token estimates for budgeting/reporting prompts without calling the API.
+# Uses tiktoken when it is installed, otherwise a ~4 characters/token heuristic that
+# is close enough for English prose and Python source.
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # not installed, or no cached encoding files offline
+    _encoding = None
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_prompt_tokens(prompt, inputs: dict) -> int:
+    """Estimate the tokens of a ChatPromptTemplate rendered with `inputs`."""
+    return sum(estimate_tokens(str(m.content)) for m in prompt.format_messages(**inputs))
@@ -0,0 +1,334 @@
+# Lightweight tracing for the AutoDev workflow.
+#
+# Spans follow the OpenTelemetry data model (trace/span/parent ids, start/end in unix ns,
+# status, attributes) without depending on the SDK. Every finished span is appended to a
+# JSONL file (TRACE_PATH) and folded into an in-process Prometheus registry that
+# main.py serves on /metrics. Spans nest through a contextvar, so an LLM call made inside
+# a graph node or agent shows up as that node's child.
+#
+# Span names used across the code base:
+#   node.<name>      LangGraph nodes (workflow/lang_graph_pipeline.py)
+#   agent.<name>     agent entry points (master, research, coder, debug, evaluator)
+#   llm.invoke       one LLM round-trip or cache hit (service/llm_client.py)
+#   executor.run     one generated-script execution, with CPU/RSS of the process tree
+#   workflow.run     a whole run_autodev_once / arun_autodev_once
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("autodev_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, parent: "Span | None" = None, attributes: dict | None = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self._t0 = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def add(self, key: str, amount: float = 1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def end(self, error: BaseException | None = None):
+        if self.end_ns is not None:
+            return
+        self.duration = time.perf_counter() - self._t0
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        _export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+            "attributes": self.attributes,
+        }
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def add_to_current(key: str, amount: float = 1):
+    span = _current.get()
+    if span is not None:
+        span.add(key, amount)
+
+
+def start_span(name: str, **attributes) -> Span:
+    """A child of the current span that is NOT made current (for generators); call `.end()`."""
+    return Span(name, _current.get(), attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    s = Span(name, _current.get(), attributes)
+    token = _current.set(s)
+    error = None
+    try:
+        yield s
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        s.end(error)
+
+
+def traced(name: str, **attributes):
+    """Decorator: run the (sync or async) function inside a span."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# -----------------
+# Subprocess resource usage
+# -----------------
+class ProcessSampler:
+    """
+    CPU seconds and peak RSS of a process and its children, sampled while it runs
+    (call `sample()` periodically). Needs psutil; without it only the process-wide
+    RUSAGE_CHILDREN delta is available, which mixes concurrent executions.
+    """
+
+    def __init__(self, pid: int):
+        self.peak_rss = 0
+        self._cpu = {}
+        self._proc = None
+        if psutil is not None:
+            try:
+                self._proc = psutil.Process(pid)
+            except psutil.Error:
+                pass
+        self._rusage = resource.getrusage(resource.RUSAGE_CHILDREN) if resource else None
+
+    def sample(self):
+        if self._proc is None:
+            return
+        try:
+            procs = [self._proc] + self._proc.children(recursive=True)
+        except psutil.Error:
+            return
+        rss = 0
+        for p in procs:
+            try:
+                with p.oneshot():
+                    rss += p.memory_info().rss
+                    times = p.cpu_times()
+                    self._cpu[p.pid] = times.user + times.system
+            except psutil.Error:
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def attributes(self) -> dict:
+        if self._proc is not None:
+            return {"cpu_seconds": round(sum(self._cpu.values()), 3), "peak_rss_bytes": self.peak_rss}
+        if self._rusage is not None:
+            now = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu = (now.ru_utime - self._rusage.ru_utime) + (now.ru_stime - self._rusage.ru_stime)
+            return {"cpu_seconds": round(cpu, 3), "peak_rss_bytes": now.ru_maxrss * 1024}
+        return {}
+
+
+# -----------------
+# Prometheus registry
+# -----------------
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _label_str(labels: tuple) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types = {}    # name -> (type, help)
+        self._values = {}   # (name, labels) -> float          (counters, gauges)
+        self._hists = {}    # (name, labels) -> [bucket counts..., sum, count]
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        self._types.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, value: float = 1.0, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._values[key] = float(value)
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            h = self._hists.setdefault(key, [0] * len(DEFAULT_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(DEFAULT_BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self._types.items()):
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    for (n, labels), h in sorted(self._hists.items()):
+                        if n != name:
+                            continue
+                        for i, bound in enumerate(DEFAULT_BUCKETS):
+                            lines.append(f"{name}_bucket{_label_str(labels + (('le', bound),))} {h[i]}")
+                        lines.append(f"{name}_bucket{_label_str(labels + (('le', '+Inf'),))} {h[-1]}")
+                        lines.append(f"{name}_sum{_label_str(labels)} {h[-2]}")
+                        lines.append(f"{name}_count{_label_str(labels)} {h[-1]}")
+                else:
+                    for (n, labels), value in sorted(self._values.items()):
+                        if n == name:
+                            lines.append(f"{name}{_label_str(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def _record_metrics(s: Span):
+    a = s.attributes
+    metrics.observe("autodev_span_duration_seconds", s.duration or 0.0,
+                    "Wall time of workflow spans", span=s.name)
+    if s.error:
+        metrics.inc("autodev_span_errors_total", 1, "Spans that ended with an exception", span=s.name)
+
+    if s.name.startswith("llm."):
+        model = a.get("model", "")
+        metrics.inc("autodev_llm_requests_total", 1, "LLM calls by cache outcome",
+                    model=model, cache="hit" if a.get("cache_hit") else "miss")
+        for kind in ("prompt", "completion"):
+            if a.get(f"{kind}_tokens"):
+                metrics.inc("autodev_llm_tokens_total", a[f"{kind}_tokens"],
+                            "LLM tokens (usage reported by the API, else estimated)", model=model, kind=kind)
+        if a.get("retries"):
+            metrics.inc("autodev_llm_retries_total", a["retries"], "HTTP retries of LLM calls", model=model)
+        if a.get("cost_usd"):
+            metrics.inc("autodev_llm_cost_usd_total", a["cost_usd"], "Estimated LLM spend", model=model)
+    elif s.name == "executor.run":
+        if a.get("cpu_seconds"):
+            metrics.inc("autodev_executor_cpu_seconds_total", a["cpu_seconds"],
+                        "CPU time of generated scripts (process tree)")
+        if a.get("peak_rss_bytes"):
+            metrics.set("autodev_executor_last_peak_rss_bytes", a["peak_rss_bytes"],
+                        "Peak RSS of the most recent script execution")
+        metrics.inc("autodev_executions_total", 1, "Script executions by outcome",
+                    outcome="success" if a.get("success") else "failure")
+
+
+# -----------------
+# JSONL exporter
+# -----------------
+class _JsonlExporter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+
+    def write(self, record: dict):
+        from core.config import settings
+
+        if not settings.TRACE_ENABLED:
+            return
+        line = json.dumps(record, default=str)
+        with self._lock:
+            try:
+                if self._file is None or self._path != settings.TRACE_PATH:
+                    os.makedirs(os.path.dirname(os.path.abspath(settings.TRACE_PATH)), exist_ok=True)
+                    self._path = settings.TRACE_PATH
+                    self._file = open(self._path, "a", encoding="utf-8")
+                if settings.TRACE_MAX_BYTES and self._file.tell() > settings.TRACE_MAX_BYTES:
+                    # Keep one rotated generation next to the live file
+                    self._file.close()
+                    os.replace(self._path, f"{self._path}.1")
+                    self._file = open(self._path, "a", encoding="utf-8")
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError as e:
+                logger.warning(f"Could not write trace span: {e}")
+
+
+_exporter = _JsonlExporter()
+
+
+def _export(s: Span):
+    try:
+        _record_metrics(s)
+    except Exception as e:  # metrics must never break the workflow
+        logger.debug(f"Could not record span metrics: {e}")
+    _exporter.write(s.to_dict())
+    logger.debug(f"span {s.name} {round((s.duration or 0) * 1000, 1)}ms {s.attributes}")
+
+
+def render_metrics() -> str:
+    return metrics.render()
@@ -0,0 +1,371 @@
+# Warm Python worker pool for generated scripts (forkserver-style zygotes).
+#
+# Each zygote is a long-lived interpreter that has already imported the heavy ML stack
+# (sklearn, pandas, numpy, matplotlib, seaborn, gradio). To run a script the parent sends
+# the zygote a request plus the write ends of two pipes; the zygote forks, and the child
+# redirects stdout/stderr into the pipes, chdirs into the project, applies resource
+# limits and runs the script with runpy. Forking a warm zygote skips the multi-second
+# import cost that a cold `python ml_pipeline.py` pays on every debug retry.
+#
+# POSIX only (needs fork and fd passing over AF_UNIX); callers fall back to a normal
+# subprocess elsewhere. Only stdlib imports at module level: this file is also the
+# zygote entry point.
+import itertools
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_PRELOAD = (
+    "numpy",
+    "pandas",
+    "sklearn.model_selection",
+    "sklearn.preprocessing",
+    "sklearn.ensemble",
+    "sklearn.linear_model",
+    "sklearn.metrics",
+    "matplotlib.pyplot",
+    "seaborn",
+    "gradio",
+)
+
+_MAX_MSG = 1024 * 1024
+_KILL_GRACE = 10.0  # seconds to wait for a killed child's exit event (and its pipes) before giving up
+
+
+def is_supported() -> bool:
+    return os.name == "posix" and hasattr(socket, "send_fds") and hasattr(socket, "SOCK_SEQPACKET")
+
+
+# ---------------------------------------------------------------------------
+# Zygote side
+# ---------------------------------------------------------------------------
+def _preload(modules):
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for name in modules:
+        try:
+            __import__(name)
+        except Exception as e:  # a missing optional lib must not kill the zygote
+            print(f"worker pool: preload of {name} failed: {e}", file=sys.stderr)
+
+
+def _run_child(sock: socket.socket, req: dict, fds: list):
+    import resource
+    import runpy
+    import traceback
+
+    code = 1
+    try:
+        sock.close()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.setpgid(0, 0)  # own process group so a timeout can kill the whole tree
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1], 2)
+        for fd in fds:
+            os.close(fd)
+        sys.stdout = open(1, "w", buffering=1, encoding="utf-8", closefd=False)
+        sys.stderr = open(2, "w", buffering=1, encoding="utf-8", closefd=False)
+
+        os.chdir(req["cwd"])
+        os.environ.update(req.get("env") or {})
+        limits = req.get("limits") or {}
+        if limits.get("memory_bytes"):
+            resource.setrlimit(resource.RLIMIT_AS, (limits["memory_bytes"], limits["memory_bytes"]))
+
+        path = req["path"]
+        sys.argv = [path] + list(req.get("args") or [])
+        sys.path[0] = os.path.dirname(path)
+        try:
+            runpy.run_path(path, run_name="__main__")
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException:
+            # Report the traceback from the script's frames, like a plain `python script.py`
+            etype, value, tb = sys.exc_info()
+            first = tb
+            while tb is not None and tb.tb_frame.f_code.co_filename != path:
+                tb = tb.tb_next
+            traceback.print_exception(etype, value, tb or first)
+            code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _zygote_main(fd: int, preload: list):
+    sock = socket.socket(fileno=fd)
+    _preload(preload)
+    sock.send(json.dumps({"event": "ready", "pid": os.getpid()}).encode())
+
+    # Wake the select loop as soon as a child exits instead of polling for it
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+
+    jobs = {}  # child pid -> job id
+    while True:
+        readable, _, _ = select.select([sock, wake_r], [], [], 1.0)
+        if wake_r in readable:
+            os.read(wake_r, 512)
+        if sock in readable:
+            msg, fds, _, _ = socket.recv_fds(sock, _MAX_MSG, 2)
+            if not msg:
+                break  # parent went away
+            req = json.loads(msg)
+            pid = os.fork()
+            if pid == 0:
+                _run_child(sock, req, fds)
+            for f in fds:
+                os.close(f)
+            jobs[pid] = req["job"]
+            sock.send(json.dumps({"event": "started", "job": req["job"], "pid": pid}).encode())
+
+        while jobs:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            job = jobs.pop(pid, None)
+            if job is not None:
+                rc = os.waitstatus_to_exitcode(status)
+                sock.send(json.dumps({"event": "exit", "job": job, "returncode": rc}).encode())
+
+    for pid in jobs:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+class _Job:
+    def __init__(self, job_id: int):
+        self.id = job_id
+        self.pid = None
+        self.returncode = None
+        self.started = threading.Event()
+        self.finished = threading.Event()
+
+
+class _Zygote:
+    def __init__(self, preload):
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.sock = parent_sock
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--zygote", str(child_sock.fileno()), ",".join(preload)],
+            pass_fds=[child_sock.fileno()],
+            start_new_session=True,
+        )
+        child_sock.close()
+        self.jobs = {}
+        self._send_lock = threading.Lock()
+        self.ready = threading.Event()
+        self._reader = threading.Thread(target=self._read_events, daemon=True)
+        self._reader.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _read_events(self):
+        while True:
+            try:
+                msg = self.sock.recv(_MAX_MSG)
+            except OSError:
+                msg = b""
+            if not msg:
+                break
+            event = json.loads(msg)
+            if event["event"] == "ready":
+                self.ready.set()
+                continue
+            job = self.jobs.get(event["job"])
+            if job is None:
+                continue
+            if event["event"] == "started":
+                job.pid = event["pid"]
+                job.started.set()
+            elif event["event"] == "exit":
+                job.returncode = event["returncode"]
+                self.jobs.pop(job.id, None)
+                job.finished.set()
+        # Zygote died: fail whatever was still in flight
+        for job in list(self.jobs.values()):
+            job.returncode = -1
+            job.started.set()
+            job.finished.set()
+        self.jobs.clear()
+
+    def submit(self, job: _Job, req: dict, fds: list):
+        self.jobs[job.id] = job
+        with self._send_lock:
+            socket.send_fds(self.sock, [json.dumps(req).encode()], fds)
+
+    def close(self):
+        try:
+            self.sock.close()
+        finally:
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+def _pump(fd: int, stream: str, on_line):
+    with open(fd, "r", encoding="utf-8", errors="replace") as f:
+        for line in iter(f.readline, ""):
+            on_line(stream, line)
+
+
+class WarmWorkerPool:
+    """
+    Pool of pre-imported zygote interpreters. `run()` executes one script in a fresh
+    forked child and streams its output through `on_line(stream, line)`.
+    """
+
+    def __init__(self, size: int = 2, preload=DEFAULT_PRELOAD, ready_timeout: float = 120):
+        if not is_supported():
+            raise RuntimeError("Warm worker pool needs a POSIX platform with fd passing")
+        self.size = max(1, size)
+        self.preload = list(preload)
+        self.ready_timeout = ready_timeout
+        self._zygotes = []
+        self._ids = itertools.count(1)
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            while len(self._zygotes) < self.size:
+                self._zygotes.append(_Zygote(self.preload))
+        for z in self._zygotes:
+            z.ready.wait(self.ready_timeout)
+        return self
+
+    def _pick(self) -> _Zygote:
+        with self._lock:
+            # Replace zygotes that died (e.g. OOM-killed) before handing one out
+            for i, z in enumerate(self._zygotes):
+                if not z.alive:
+                    z.close()
+                    self._zygotes[i] = _Zygote(self.preload)
+            if not self._zygotes:
+                self._zygotes.append(_Zygote(self.preload))
+            zygote = self._zygotes[next(self._rr) % len(self._zygotes)]
+        zygote.ready.wait(self.ready_timeout)
+        return zygote
+
+    def run(self, path: str, cwd: str, on_line, timeout: float = 1800, env: dict | None = None,
+            memory_bytes: int | None = None, cancel: threading.Event | None = None) -> dict:
+        """Run `path` with `cwd`; returns {"returncode", "timed_out", "cancelled"}."""
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        job = _Job(next(self._ids))
+        req = {
+            "job": job.id,
+            "path": os.path.abspath(path),
+            "cwd": cwd,
+            "env": env or {},
+            # No RLIMIT_CPU: it sums every thread, so a multithreaded BLAS fit would die well
+            # before the wall-clock `timeout` the cold subprocess path enforces
+            "limits": {"memory_bytes": memory_bytes},
+        }
+        zygote = self._pick()
+        try:
+            zygote.submit(job, req, [out_w, err_w])
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+
+        readers = [
+            threading.Thread(target=_pump, args=(out_r, "stdout", on_line), daemon=True),
+            threading.Thread(target=_pump, args=(err_r, "stderr", on_line), daemon=True),
+        ]
+        for t in readers:
+            t.start()
+
+        timed_out = cancelled = False
+        deadline = time.monotonic() + timeout
+        while not job.finished.wait(0.2):
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+            elif time.monotonic() > deadline:
+                timed_out = True
+            else:
+                continue
+            job.started.wait(5)
+            if job.pid:
+                try:
+                    os.killpg(job.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+            if not job.finished.wait(_KILL_GRACE):
+                # No pid, or the kill failed: stop waiting and report the timeout/cancel anyway
+                zygote.jobs.pop(job.id, None)
+                if job.returncode is None:
+                    job.returncode = -signal.SIGKILL
+            break
+        for t in readers:
+            # A child that survived the kill still holds the pipes open
+            t.join(_KILL_GRACE if (timed_out or cancelled) else None)
+        return {"returncode": job.returncode, "timed_out": timed_out, "cancelled": cancelled}
+
+    def shutdown(self):
+        with self._lock:
+            zygotes, self._zygotes = self._zygotes, []
+        for z in zygotes:
+            z.close()
+
+
+_pool: WarmWorkerPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> WarmWorkerPool | None:
+    """Process-wide pool when EXECUTOR_WARM_POOL is enabled and the platform supports it."""
+    global _pool
+    from core.config import settings
+
+    if not settings.EXECUTOR_WARM_POOL or not is_supported():
+        return None
+    with _pool_lock:
+        if _pool is None:
+            preload = [m.strip() for m in settings.EXECUTOR_PRELOAD.split(",") if m.strip()]
+            _pool = WarmWorkerPool(settings.EXECUTOR_POOL_SIZE, preload).start()
+        return _pool
+
+
+def shutdown_worker_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+if __name__ == "__main__" and len(sys.argv) >= 3 and sys.argv[1] == "--zygote":
+    _zygote_main(int(sys.argv[2]), [m for m in (sys.argv[3] if len(sys.argv) > 3 else "").split(",") if m])
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Tests import the backend the way the app does (`from service...`), from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Stands in for a module's `time` so TTL tests don't sleep."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from conftest import FakeClock
+from service import auth_cache
+from service.auth_cache import AuthCache, UserSnapshot
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth_cache, "time", clock)
+    return clock
+
+
+def snapshot(user_id: int) -> UserSnapshot:
+    return UserSnapshot(id=user_id, email=f"u{user_id}@example.com", name=None, api_key=None,
+                        is_verified=True, account_type="free", created_at=datetime(2024, 1, 1), updated_at=None)
+
+
+def test_hit_until_ttl(clock):
+    cache = AuthCache(ttl_seconds=60, max_entries=10)
+    cache.put("t1", snapshot(1))
+    assert cache.get("t1") == snapshot(1)
+    clock.advance(60)
+    assert cache.get("t1") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_token_expiry_caps_the_ttl(clock):
+    cache = AuthCache(ttl_seconds=600, max_entries=10)
+    cache.put("t1", snapshot(1), token_expires_at=clock.now + 5)
+    clock.advance(5)
+    assert cache.get("t1") is None
+
+
+def test_already_expired_token_is_not_cached(clock):
+    cache = AuthCache(ttl_seconds=600, max_entries=10)
+    cache.put("t1", snapshot(1), token_expires_at=clock.now - 1)
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_user_drops_all_their_tokens(clock):
+    cache = AuthCache(ttl_seconds=600, max_entries=10)
+    cache.put("a1", snapshot(1))
+    cache.put("a2", snapshot(1))
+    cache.put("b1", snapshot(2))
+    cache.invalidate_user(1)
+    assert cache.get("a1") is None and cache.get("a2") is None
+    assert cache.get("b1") == snapshot(2)
+    assert cache.stats()["users"] == 1
+
+
+def test_lru_eviction_keeps_recently_used(clock):
+    cache = AuthCache(ttl_seconds=600, max_entries=2)
+    cache.put("t1", snapshot(1))
+    cache.put("t2", snapshot(2))
+    cache.get("t1")
+    cache.put("t3", snapshot(3))
+    assert cache.get("t2") is None
+    assert cache.get("t1") == snapshot(1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_shared_invalidations_reach_other_workers(clock, tmp_path):
+    path = str(tmp_path / "auth.db")
+    worker_a = AuthCache(ttl_seconds=600, max_entries=10, shared_path=path, sync_interval=1.0)
+    worker_b = AuthCache(ttl_seconds=600, max_entries=10, shared_path=path, sync_interval=1.0)
+    worker_b.put("t1", snapshot(1))
+    assert worker_b.get("t1") == snapshot(1)
+    worker_a.invalidate_user(1)
+    clock.advance(1.0)
+    assert worker_b.get("t1") is None
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from service import log_compaction
+from service.log_compaction import compact_log
+from service.tokens import estimate_tokens
+
+TRACEBACK = (
+    "Traceback (most recent call last):\n"
+    '  File "ml_pipeline.py", line 12, in <module>\n'
+    "    model.fit(X, y)\n"
+    "ValueError: Input contains NaN"
+)
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    settings = SimpleNamespace(LOG_COMPACT_MAX_TOKENS=400, LOG_COMPACT_HEAD_LINES=20,
+                               LOG_COMPACT_TAIL_LINES=20, LOG_COMPACT_MAX_LINE_CHARS=200)
+    monkeypatch.setattr(log_compaction, "_settings", lambda: settings)
+    return settings
+
+
+def test_short_logs_are_unchanged():
+    assert compact_log("ACCURACY: 0.9\n") == "ACCURACY: 0.9\n"
+    assert compact_log("") == ""
+
+
+def test_repeated_warnings_are_counted_once():
+    log = "\n".join(["ConvergenceWarning: lbfgs failed to converge"] * 500 + ["ACCURACY: 0.9"])
+    compacted = compact_log(log)
+    assert compacted.count("ConvergenceWarning") == 1
+    assert "[repeated 500x]" in compacted
+    assert "ACCURACY: 0.9" in compacted
+
+
+def test_numeric_runs_keep_first_and_last():
+    log = "\n".join(f"Epoch {i}/300 - loss: {1 / (i + 1):.4f}" for i in range(300))
+    compacted = compact_log(log)
+    assert "Epoch 0/300" in compacted
+    assert "Epoch 299/300" in compacted
+    assert "[298 similar lines]" in compacted
+
+
+def test_final_traceback_survives_and_budget_holds():
+    noise = "\n".join(f"row {i}: {'x' * (i % 50)} {i * 7 % 13} distinct-{i}" for i in range(3000))
+    compacted = compact_log(f"{noise}\n{TRACEBACK}", max_tokens=300)
+    assert compacted.endswith("ValueError: Input contains NaN")
+    assert TRACEBACK in compacted
+    assert estimate_tokens(compacted) <= 300
+
+
+def test_long_lines_are_clipped(settings):
+    compacted = compact_log("A" * 5000 + "\n" + "\n".join(f"line {i} {'y' * i}" for i in range(400)))
+    assert "[+4800 chars]" in compacted
@@ -0,0 +1,83 @@
+from service.metrics_parser import MetricsParser, is_metric_name, normalize_metric_name, parse_metrics
+
+
+def test_metric_lines_are_normalized():
+    record = parse_metrics(
+        "ACCURACY: 0.91\n"
+        "F1_SCORE = 0.88\n"
+        "Test R2: 0.71\n"
+        "ROC_AUC_SCORE: 0.93\n"
+        "MEAN_ABSOLUTE_ERROR: 3.5\n"
+    )
+    assert record.metrics == {"accuracy": 0.91, "f1": 0.88, "r2": 0.71, "roc_auc": 0.93, "mae": 3.5}
+
+
+def test_percentages_become_fractions():
+    assert parse_metrics("Accuracy: 97.5%\n").metrics == {"accuracy": 0.975}
+
+
+def test_hyperparameters_and_counters_are_not_metrics():
+    record = parse_metrics(
+        "RANDOM_STATE: 42\n"
+        "N_ESTIMATORS: 100\n"
+        "TEST_SIZE: 0.2\n"
+        "LEARNING_RATE: 0.1\n"
+        "Epoch: 3\n"
+        "Train size: 800\n"
+    )
+    assert record.metrics == {}
+
+
+def test_names_with_a_metric_word_are_kept():
+    assert parse_metrics("TRAIN_LOSS: 0.25\nCV_F1_MEAN: 0.8\n").metrics == {"train_loss": 0.25, "cv_f1_mean": 0.8}
+
+
+def test_is_metric_name():
+    assert is_metric_name(normalize_metric_name("Val Accuracy"))
+    assert is_metric_name(normalize_metric_name("RMSE"))
+    assert not is_metric_name(normalize_metric_name("MAX_DEPTH"))
+
+
+def test_classification_report_and_confusion_matrix():
+    output = (
+        "              precision    recall  f1-score   support\n"
+        "\n"
+        "           0       0.90      0.95      0.92       100\n"
+        "           1       0.80      0.70      0.75        40\n"
+        "\n"
+        "    accuracy                           0.88       140\n"
+        "   macro avg       0.85      0.82      0.84       140\n"
+        "weighted avg       0.87      0.88      0.87       140\n"
+        "\n"
+        "[[95  5]\n"
+        " [12 28]]\n"
+        "EXECUTION_COMPLETE\n"
+    )
+    record = parse_metrics(output)
+    assert record.classification_report["1"] == {"precision": 0.8, "recall": 0.7, "f1-score": 0.75, "support": 40}
+    assert record.metrics == {"accuracy": 0.88, "f1_macro": 0.84, "f1_weighted": 0.87}
+    assert record.confusion_matrix == [[95, 5], [12, 28]]
+    assert record.completed
+
+
+def test_explicit_metric_wins_over_report():
+    record = parse_metrics(
+        "ACCURACY: 0.9\n"
+        "              precision    recall  f1-score   support\n"
+        "    accuracy                           0.88       140\n"
+    )
+    assert record.metrics["accuracy"] == 0.9
+
+
+def test_non_square_nested_lists_are_not_a_confusion_matrix():
+    assert parse_metrics("[[1, 2, 3]]\n").confusion_matrix == []
+
+
+def test_streaming_matches_single_pass():
+    output = "loading\nACCURACY: 0.5\nTRAIN_LOSS: 0.1\nEXECUTION_COMPLETE"
+    parser = MetricsParser()
+    for i in range(0, len(output), 7):
+        parser.feed(output[i:i + 7])
+    streamed = parser.result()
+    assert streamed.to_dict() == parse_metrics(output).to_dict()
+    assert streamed.tail[-1] == "EXECUTION_COMPLETE"
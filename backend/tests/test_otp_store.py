@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from conftest import FakeClock
+from service import otp_store
+from service.otp_store import MemoryOTPStore, OTPStore, StoreFull
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(otp_store, "time", clock)
+    return clock
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        OTPStore()
+
+
+def test_put_get_expires_after_ttl(clock):
+    store = MemoryOTPStore()
+    run(store.put("otp:a", "123456", ttl=60))
+    assert run(store.get("otp:a")) == "123456"
+    clock.advance(59)
+    assert run(store.get("otp:a")) == "123456"
+    clock.advance(1)
+    assert run(store.get("otp:a")) is None
+    assert len(store) == 0  # swept, not just hidden
+
+
+def test_put_replaces_value_and_ttl(clock):
+    store = MemoryOTPStore()
+    run(store.put("otp:a", "111111", ttl=10))
+    clock.advance(8)
+    run(store.put("otp:a", "222222", ttl=10))
+    clock.advance(8)
+    assert run(store.get("otp:a")) == "222222"
+
+
+def test_pop_returns_value_once(clock):
+    store = MemoryOTPStore()
+    run(store.put("otp:a", "123456", ttl=60))
+    assert run(store.pop("otp:a")) == "123456"
+    assert run(store.pop("otp:a")) is None
+    assert run(store.get("otp:a")) is None
+
+
+def test_pop_ignores_expired_value(clock):
+    store = MemoryOTPStore()
+    run(store.put("otp:a", "123456", ttl=60))
+    clock.advance(61)
+    assert run(store.pop("otp:a")) is None
+
+
+def test_incr_counts_within_window_then_restarts(clock):
+    store = MemoryOTPStore()
+    assert [run(store.incr("rate:a", window=60)) for _ in range(3)] == [1, 2, 3]
+    clock.advance(30)
+    assert run(store.incr("rate:a", window=60)) == 4  # the window opened with the first event
+    clock.advance(30)
+    assert run(store.incr("rate:a", window=60)) == 1
+
+
+def test_allow_permits_exactly_limit_events(clock):
+    store = MemoryOTPStore()
+    results = [run(store.allow("otp_attempts:a", limit=5, window=300)) for _ in range(7)]
+    assert results == [True] * 5 + [False] * 2
+
+
+def test_max_entries_counts_live_keys_only(clock):
+    store = MemoryOTPStore(max_entries=2)
+    run(store.put("a", "1", ttl=10))
+    run(store.put("b", "2", ttl=10))
+    with pytest.raises(StoreFull):
+        run(store.put("c", "3", ttl=10))
+    run(store.put("a", "1b", ttl=10))  # overwriting an existing key is always fine
+    clock.advance(11)
+    run(store.put("c", "3", ttl=10))
+    assert run(store.get("c")) == "3"
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("langchain")
+
+from service.structured_output import JSONExtractor, extract_json
+
+
+def test_fenced_json_with_prose():
+    text = 'Here is the plan:\n```json\n{"problem": "churn", "steps": [1, 2]}\n```\nGood luck!'
+    assert extract_json(text) == [{"problem": "churn", "steps": [1, 2]}]
+
+
+def test_braces_inside_strings_do_not_confuse_the_scanner():
+    text = 'x {"code": "def f():\\n    return {\\"a\\": \\"}\\"}", "ok": true} y'
+    assert extract_json(text) == [{"code": 'def f():\n    return {"a": "}"}', "ok": True}]
+
+
+def test_deeply_nested_values():
+    text = '{"a": {"b": {"c": {"d": [1, {"e": 2}]}}}}'
+    assert extract_json(text) == [{"a": {"b": {"c": {"d": [1, {"e": 2}]}}}}]
+
+
+def test_several_top_level_values_in_order():
+    assert extract_json('[1] then {"b": 2} and {"c": 3}') == [[1], {"b": 2}, {"c": 3}]
+
+
+def test_invalid_spans_are_skipped():
+    assert extract_json('{not json} {"ok": 1}') == [{"ok": 1}]
+    assert extract_json('{"a": 1]} {"b": 2}') == [{"b": 2}]
+
+
+def test_unclosed_stray_opener_in_prose():
+    assert extract_json('use a {key: value map, then {"ok": true}') == [{"ok": True}]
+
+
+def test_streaming_chunks_match_whole_text():
+    text = 'prefix {"dataset": {"hf_id": "scikit-learn/iris", "features": ["a", "b"]}} suffix'
+    extractor = JSONExtractor()
+    found = []
+    for i in range(0, len(text), 5):
+        found.extend(extractor.feed(text[i:i + 5]))
+    assert found == extract_json(text)
+    assert extractor.open_at is None
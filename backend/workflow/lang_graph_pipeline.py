@@ -1,4 +1,4 @@
-from typing import TypedDict, Optional, Dict, Any
+from typing import TypedDict, Optional, Dict, Any, List
 
 class WorkflowState(TypedDict, total=False):
     user_prompt: str
@@ -9,50 +9,102 @@ class WorkflowState(TypedDict, total=False):
     error: Optional[str]
     summary: Dict[str, Any]
     project_dir: str
+    debug_reports: List[Dict[str, Any]]
+    validation: Dict[str, Any]
+    dataset_cache: Optional[Dict[str, Any]]
+    project_id: Optional[int]
+    # Speculative mode: research run from the raw prompt while the master plans
+    speculative_dataset: Dict[str, Any]
+    speculation: Dict[str, Any]
+    started_at: float
+    timings: Dict[str, float]
 
 
-from agents.master_agent import master_plan
-from agents.research_agent import research_dataset
-from agents.coder_agent import generate_training_code
-from agents.executor_agent import execute_generated_code
-from agents.debug_agent import rewrite_on_error
-from agents.evaluator_agent import summarize_and_prepare_ui
+from agents.master_agent import master_plan, amaster_plan
+from agents.research_agent import research_dataset, aresearch_dataset, dataset_matches_plan
+from agents.coder_agent import generate_training_code, agenerate_training_code
+from agents.executor_agent import execute_generated_code, aexecute_generated_code
+from agents.debug_agent import fix_code, afix_code
+from agents.evaluator_agent import summarize_and_prepare_ui, asummarize_and_prepare_ui
+from agents.validator_agent import validate_generated_code, format_validation_errors
+from workflow.pipeline import _update_project
+from service.dataset_cache import prepare_dataset_cache, commit_dataset_cache, release_dataset_cache
+from service.dataset_catalog import record_catalog_dataset
+from service.artifact_index import index_project
+from service.checkpoint_store import get_checkpointer
+from service.structured_output import StructuredOutputError
+from service.tracing import traced
+from core.config import settings
 
-import os, datetime
+import asyncio, os, datetime, time, logging, threading
+
+logger = logging.getLogger(__name__)
 
 def create_project_structure_node(state: WorkflowState) -> WorkflowState:
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    state["started_at"] = time.time()
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     project_name = f"project_{timestamp}"
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    project_dir = os.path.join(base_dir, "projects", project_name)
+    project_dir = os.path.join(settings.PROJECTS_DIR, project_name)
     os.makedirs(os.path.join(project_dir, "dataset"), exist_ok=True)
     os.makedirs(os.path.join(project_dir, "models"), exist_ok=True)
     os.makedirs(os.path.join(project_dir, "artifacts"), exist_ok=True)
     os.makedirs(os.path.join(project_dir, "code"), exist_ok=True)
     state["project_dir"] = project_dir
+    # Recorded now, not at the end: the log WebSocket checks folder ownership while it runs
+    _update_project(state.get("project_id"), folder_path=project_dir)
     return state
 
+def _prepare_dataset_cache(state: WorkflowState) -> Optional[Dict[str, Any]]:
+    # A node that re-picks the dataset drops the lease it held on the previous pick
+    release_dataset_cache(state.get("dataset_cache"))
+    return prepare_dataset_cache(state["dataset"], state["project_dir"])
+
 def master_node(state: WorkflowState) -> WorkflowState:
     state["plan"] = master_plan(state["user_prompt"])
     return state
 
 def research_node(state: WorkflowState) -> WorkflowState:
     state["dataset"] = research_dataset(state["plan"])
+    state["dataset_cache"] = _prepare_dataset_cache(state)
     return state
 
+def _record_time_to_code(state: WorkflowState):
+    # Only the first generation counts; debug loops come back through the validator
+    timings = dict(state.get("timings") or {})
+    if "time_to_code" not in timings and state.get("started_at"):
+        timings["time_to_code"] = round(time.time() - state["started_at"], 3)
+        logger.info(f"⏱️ Time to code: {timings['time_to_code']}s")
+    state["timings"] = timings
+
 def coder_node(state: WorkflowState) -> WorkflowState:
     state["code"] = generate_training_code(state["plan"], state["dataset"], state["project_dir"])
+    _record_time_to_code(state)
+    return state
+
+def validator_node(state: WorkflowState) -> WorkflowState:
+    validation = validate_generated_code(state["code"])
+    state["validation"] = validation
+    if not validation["valid"]:
+        state["error"] = format_validation_errors(validation)
     return state
 
 def executor_node(state: WorkflowState) -> WorkflowState:
-    res = execute_generated_code(state["code"], state["project_dir"])
+    cache = state.get("dataset_cache")
+    res = execute_generated_code(state["code"], state["project_dir"], env=cache["env"] if cache else None)
     state["results"] = res
+    # Re-indexed after every attempt, so the listing matches whatever run was last; a
+    # successful run is final, so its files also go into the blob store
+    index_project(state.get("project_id"), state["project_dir"], dedupe=res["success"])
     if not res["success"]:
         state["error"] = res.get("stderr") or res.get("stdout", "Unknown error")
+    else:
+        commit_dataset_cache(cache, state.get("project_id"))
+        record_catalog_dataset(state["plan"], state["dataset"], state.get("project_id"))
     return state
 
 def debug_node(state: WorkflowState) -> WorkflowState:
-    state["code"] = rewrite_on_error(state["code"], state.get("error", ""))
+    state["code"], report = fix_code(state["code"], state.get("error", ""))
+    state["debug_reports"] = state.get("debug_reports", []) + [report]
     return state
 
 def evaluator_node(state: WorkflowState) -> WorkflowState:
@@ -60,47 +112,225 @@ def evaluator_node(state: WorkflowState) -> WorkflowState:
     state["summary"] = summary
     return state
 
-from langgraph.graph import StateGraph, END, START
+# -----------------
+# Async nodes (same contract, awaiting the LLM / training subprocess)
+# -----------------
+async def amaster_node(state: WorkflowState) -> WorkflowState:
+    state["plan"] = await amaster_plan(state["user_prompt"])
+    return state
+
+async def aresearch_node(state: WorkflowState) -> WorkflowState:
+    state["dataset"] = await aresearch_dataset(state["plan"])
+    state["dataset_cache"] = await asyncio.to_thread(_prepare_dataset_cache, state)
+    return state
 
+async def acoder_node(state: WorkflowState) -> WorkflowState:
+    state["code"] = await agenerate_training_code(state["plan"], state["dataset"], state["project_dir"])
+    _record_time_to_code(state)
+    return state
+
+async def aexecutor_node(state: WorkflowState) -> WorkflowState:
+    cache = state.get("dataset_cache")
+    res = await aexecute_generated_code(state["code"], state["project_dir"], env=cache["env"] if cache else None)
+    state["results"] = res
+    await asyncio.to_thread(index_project, state.get("project_id"), state["project_dir"], res["success"])
+    if not res["success"]:
+        state["error"] = res.get("stderr") or res.get("stdout", "Unknown error")
+    else:
+        await asyncio.to_thread(commit_dataset_cache, cache, state.get("project_id"))
+        await asyncio.to_thread(record_catalog_dataset, state["plan"], state["dataset"], state.get("project_id"))
+    return state
+
+async def adebug_node(state: WorkflowState) -> WorkflowState:
+    state["code"], report = await afix_code(state["code"], state.get("error", ""))
+    state["debug_reports"] = state.get("debug_reports", []) + [report]
+    return state
+
+async def aevaluator_node(state: WorkflowState) -> WorkflowState:
+    state["summary"] = await asummarize_and_prepare_ui(state["results"]["stdout"])
+    return state
 
 # -----------------
-# Build Workflow Graph
+# Speculative nodes: master and research run as parallel branches, so each returns only
+# the keys it owns (LangGraph merges them before `reconcile`).
 # -----------------
-graph = StateGraph(WorkflowState)
-
-graph.add_node("project_setup", create_project_structure_node)
-graph.add_node("master", master_node)
-graph.add_node("research", research_node)
-graph.add_node("coder", coder_node)
-graph.add_node("executor", executor_node)
-graph.add_node("debug", debug_node)
-graph.add_node("evaluator", evaluator_node)
-
-# Entry point
-graph.add_edge(START, "project_setup")
-   # ✅ REQUIRED
-
-# Normal flow
-graph.add_edge("project_setup", "master")
-graph.add_edge("master", "research")
-graph.add_edge("research", "coder")
-graph.add_edge("coder", "executor")
+def _speculative_plan(user_prompt: str) -> dict:
+    # Research only needs the gist of the problem, which the prompt already carries
+    return {"problem": user_prompt, "dataset_requirements": user_prompt}
+
+def spec_master_node(state: WorkflowState) -> dict:
+    return {"plan": master_plan(state["user_prompt"])}
+
+def spec_research_node(state: WorkflowState) -> dict:
+    try:
+        return {"speculative_dataset": research_dataset(_speculative_plan(state["user_prompt"]))}
+    except StructuredOutputError as e:
+        # Nothing usable to speculate with; `reconcile` sends the run back to `research`
+        logger.warning(f"🔮 Speculative research failed: {e}")
+        return {"speculative_dataset": {}}
+
+async def aspec_master_node(state: WorkflowState) -> dict:
+    return {"plan": await amaster_plan(state["user_prompt"])}
+
+async def aspec_research_node(state: WorkflowState) -> dict:
+    try:
+        return {"speculative_dataset": await aresearch_dataset(_speculative_plan(state["user_prompt"]))}
+    except StructuredOutputError as e:
+        logger.warning(f"🔮 Speculative research failed: {e}")
+        return {"speculative_dataset": {}}
+
+def reconcile_node(state: WorkflowState) -> WorkflowState:
+    """Keep the speculative dataset if it fits the plan; otherwise `research` re-runs from the plan."""
+    check = dataset_matches_plan(state["plan"], state.get("speculative_dataset"))
+    state["speculation"] = {"hit": check["consistent"], "reason": check["reason"]}
+    if check["consistent"]:
+        logger.info(f"🔮 Speculative research kept ({check['reason']})")
+        state["dataset"] = state["speculative_dataset"]
+        state["dataset_cache"] = _prepare_dataset_cache(state)
+    else:
+        logger.info(f"🔮 Speculative research discarded ({check['reason']}); re-running research")
+    return state
+
+from langgraph.graph import StateGraph, END, START
+
+
+# Conditional route: reconcile → coder (speculation held) or research (re-run from the plan)
+def route_on_speculation(state: WorkflowState) -> str:
+    return "coder" if state["speculation"]["hit"] else "research"
+
+# Conditional route: validator → executor, or straight to debug without spawning a process
+def route_on_validation(state: WorkflowState) -> str:
+    return "executor" if state["validation"]["valid"] else "debug"
 
 # Conditional route: executor → evaluator or debug
 def route_on_execution(state: WorkflowState) -> str:
     return "debug" if not state["results"].get("success") else "evaluator"
 
-graph.add_conditional_edges(
-    "executor", 
-    route_on_execution, 
-    {"debug": "debug", "evaluator": "evaluator"}
-)
 
-# After debug, go back to executor
-graph.add_edge("debug", "executor")
+# -----------------
+# Build Workflow Graph
+# -----------------
+def build_graph(nodes: dict, speculative: bool = False) -> StateGraph:
+    """
+    Wire the workflow graph from a {node_name: callable} mapping (sync or async nodes).
+    With `speculative=True` the mapping also needs `speculative_research` and `reconcile`,
+    and master/research-from-prompt run in parallel.
+    """
+    graph = StateGraph(WorkflowState)
+
+    for name, fn in nodes.items():
+        graph.add_node(name, traced(f"node.{name}")(fn))
+
+    # Entry point
+    graph.add_edge(START, "project_setup")
+       # ✅ REQUIRED
+
+    if speculative:
+        graph.add_edge("project_setup", "master")
+        graph.add_edge("project_setup", "speculative_research")
+        # Fan-in: reconcile waits for both branches
+        graph.add_edge(["master", "speculative_research"], "reconcile")
+        graph.add_conditional_edges(
+            "reconcile",
+            route_on_speculation,
+            {"coder": "coder", "research": "research"}
+        )
+    else:
+        # Normal flow
+        graph.add_edge("project_setup", "master")
+        graph.add_edge("master", "research")
+    graph.add_edge("research", "coder")
+    graph.add_edge("coder", "validator")
+
+    graph.add_conditional_edges(
+        "validator",
+        route_on_validation,
+        {"executor": "executor", "debug": "debug"}
+    )
+
+    graph.add_conditional_edges(
+        "executor", 
+        route_on_execution, 
+        {"debug": "debug", "evaluator": "evaluator"}
+    )
+
+    # After debug, re-validate before executing again
+    graph.add_edge("debug", "validator")
+
+    # End
+    graph.add_edge("evaluator", END)
+    return graph
 
-# End
-graph.add_edge("evaluator", END)
 
-# Compile
+graph = build_graph({
+    "project_setup": create_project_structure_node,
+    "master": master_node,
+    "research": research_node,
+    "coder": coder_node,
+    "validator": validator_node,
+    "executor": executor_node,
+    "debug": debug_node,
+    "evaluator": evaluator_node,
+})
+
+# Plain graph: `app.invoke(state)`, nothing persisted. For resumable runs use
+# `get_checkpointed_app()` below.
 app = graph.compile()
+
+# Async graph: run with `await async_app.ainvoke(state)`; one event loop can drive many
+# workflows concurrently while they wait on the LLM or on training subprocesses.
+async_graph = build_graph({
+    "project_setup": create_project_structure_node,
+    "master": amaster_node,
+    "research": aresearch_node,
+    "coder": acoder_node,
+    "validator": validator_node,
+    "executor": aexecutor_node,
+    "debug": adebug_node,
+    "evaluator": aevaluator_node,
+})
+async_app = async_graph.compile()
+
+# Speculative graphs: research starts from the raw prompt alongside master planning and is
+# only re-run (from the plan) when the cheap consistency check in `reconcile` fails.
+# Compare `timings["time_to_code"]` against the serial graphs to see the saving.
+speculative_graph = build_graph({
+    "project_setup": create_project_structure_node,
+    "master": spec_master_node,
+    "speculative_research": spec_research_node,
+    "reconcile": reconcile_node,
+    "research": research_node,
+    "coder": coder_node,
+    "validator": validator_node,
+    "executor": executor_node,
+    "debug": debug_node,
+    "evaluator": evaluator_node,
+}, speculative=True)
+speculative_app = speculative_graph.compile()
+
+async_speculative_graph = build_graph({
+    "project_setup": create_project_structure_node,
+    "master": aspec_master_node,
+    "speculative_research": aspec_research_node,
+    "reconcile": reconcile_node,
+    "research": aresearch_node,
+    "coder": acoder_node,
+    "validator": validator_node,
+    "executor": aexecutor_node,
+    "debug": adebug_node,
+    "evaluator": aevaluator_node,
+}, speculative=True)
+async_speculative_app = async_speculative_graph.compile()
+
+# Checkpointed twins of `app` / `speculative_app`: the state is persisted after every node
+# (see workflow/runs.py for resume/replay); invoke with {"configurable": {"thread_id": ...}}.
+# Compiled on first use, so importing this module doesn't open the checkpoint store.
+_checkpointed = {}
+_checkpointed_lock = threading.Lock()
+
+def get_checkpointed_app(speculative: bool = False):
+    with _checkpointed_lock:
+        if speculative not in _checkpointed:
+            source = speculative_graph if speculative else graph
+            _checkpointed[speculative] = source.compile(checkpointer=get_checkpointer())
+        return _checkpointed[speculative]
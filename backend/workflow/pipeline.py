@@ -1,86 +1,264 @@
+import asyncio
+import logging
 import os
 import datetime
-from agents.master_agent import master_plan
-from agents.research_agent import research_dataset
-from agents.coder_agent import generate_training_code
-from agents.executor_agent import execute_generated_code
-from agents.debug_agent import rewrite_on_error
-from agents.evaluator_agent import summarize_and_prepare_ui
+import shutil
+import time
+from core.config import settings
+from agents.master_agent import master_plan, amaster_plan
+from agents.research_agent import research_dataset, aresearch_dataset
+from agents.coder_agent import (
+    generate_training_code, agenerate_training_code, generate_candidate_codes, agenerate_candidate_codes,
+)
+from agents.executor_agent import (
+    execute_generated_code, aexecute_generated_code, race_generated_code, arace_generated_code,
+)
+from agents.debug_agent import fix_code, afix_code
+from agents.evaluator_agent import summarize_and_prepare_ui, asummarize_and_prepare_ui
+from agents.validator_agent import validate_generated_code, format_validation_errors
+from service.dataset_cache import prepare_dataset_cache, commit_dataset_cache, release_dataset_cache
+from service.dataset_catalog import record_catalog_dataset
+from service.artifact_index import index_project
+from service.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+PROJECT_SUBDIRS = ("dataset", "models", "artifacts", "code")
 
 def create_project_structure(project_name: str) -> str:
     """Create organized project directory structure"""
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    project_dir = os.path.join(base_dir, "projects", project_name)
+    project_dir = os.path.join(settings.PROJECTS_DIR, project_name)
     
     # Create directories
-    os.makedirs(os.path.join(project_dir, "dataset"), exist_ok=True)
-    os.makedirs(os.path.join(project_dir, "models"), exist_ok=True)
-    os.makedirs(os.path.join(project_dir, "artifacts"), exist_ok=True)
-    os.makedirs(os.path.join(project_dir, "code"), exist_ok=True)
+    for sub in PROJECT_SUBDIRS:
+        os.makedirs(os.path.join(project_dir, sub), exist_ok=True)
     
     return project_dir
 
-def run_autodev_once(user_prompt: str, max_retries: int = 2, launch_ui: bool = True):
-    # Create project structure with timestamp
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+def _candidate_dirs(project_dir: str, n: int) -> list:
+    """Isolated project layouts for racing candidates: <project>/candidates/c0 .. cN-1"""
+    dirs = []
+    for i in range(n):
+        candidate_dir = os.path.join(project_dir, "candidates", f"c{i}")
+        for sub in PROJECT_SUBDIRS:
+            os.makedirs(os.path.join(candidate_dir, sub), exist_ok=True)
+        dirs.append(candidate_dir)
+    return dirs
+
+def _promote_candidate(candidate_dir: str, project_dir: str):
+    """Copy the winning candidate's outputs to the project root, where the UI looks for them."""
+    for sub in PROJECT_SUBDIRS:
+        try:
+            shutil.copytree(os.path.join(candidate_dir, sub), os.path.join(project_dir, sub),
+                            symlinks=True, dirs_exist_ok=True)
+        except (OSError, shutil.Error) as e:
+            logger.warning(f"⚠️ Could not copy {sub}/ from {candidate_dir}: {e}")
+
+def _update_project(project_id: int | None, **values):
+    if project_id is None:
+        return
+    from db.session import SessionLocal
+    from crud import crud_project
+
+    with SessionLocal() as db:
+        crud_project.update_project(db, project_id, **values)
+
+
+class WorkflowCancelled(Exception):
+    """Raised by `run_autodev_once` when its `cancel` event is set."""
+
+
+def _report(progress, cancel, stage: str, fraction: float):
+    if cancel is not None and cancel.is_set():
+        raise WorkflowCancelled(stage)
+    if progress is not None:
+        progress(stage, fraction)
+
+
+def _validation_failure(validation: dict) -> dict:
+    logger.info(f"🚫 Static validation failed, skipping execution: {validation['errors']}")
+    return {"success": False, "stdout": "", "stderr": format_validation_errors(validation), "validation": validation}
+
+
+def _validate_or_execute(code: str, project_dir: str, cancel=None, env: dict | None = None) -> dict:
+    # Syntax errors, banned imports and blocking calls are caught in milliseconds
+    # instead of after an interpreter start-up and a dataset download
+    validation = validate_generated_code(code)
+    if not validation["valid"]:
+        return _validation_failure(validation)
+    return execute_generated_code(code, project_dir, cancel=cancel, env=env)
+
+
+def _validate_candidates(generated: list) -> tuple[list, list]:
+    results, runnable = [None] * len(generated), []
+    for i, (_, code) in enumerate(generated):
+        validation = validate_generated_code(code)
+        if validation["valid"]:
+            runnable.append(i)
+        else:
+            results[i] = _validation_failure(validation)
+    return results, runnable
+
+def _pick_candidate(generated: list, dirs: list, results: list, runnable: list,
+                    race: dict, generation_seconds: float) -> dict:
+    for j, i in enumerate(runnable):
+        results[i] = race["results"][j] or {
+            "success": False, "stdout": "", "stderr": "Not started: another candidate finished first",
+        }
+    if race["winner"] is not None:
+        winner = runnable[race["winner"]]
+    else:
+        # Nobody finished: hand the debug loop the candidate that got furthest
+        winner = max(range(len(generated)), key=lambda i: len(results[i].get("stdout", "")))
+
+    def outcome(i):
+        if "validation" in results[i]:
+            return "invalid"
+        if race["winner"] is not None and i == winner:
+            return "won"
+        return "cancelled" if results[i]["stderr"].endswith("Execution cancelled") else "failed"
+
+    report = {
+        "candidates": len(generated),
+        "temperatures": [t for t, _ in generated],
+        "winner": winner,
+        "outcomes": [outcome(i) for i in range(len(generated))],
+        "generation_seconds": generation_seconds,
+        "seconds_to_first_success": race["seconds"] if race["winner"] is not None else None,
+    }
+    logger.info(f"🏁 Candidate race: {report}")
+    return {"code": generated[winner][1], "work_dir": dirs[winner], "result": results[winner], "report": report}
+
+_NO_RACE = {"winner": None, "results": [], "seconds": 0.0}
+
+def _run_candidates(plan, dataset, project_dir: str, n: int, cancel=None, env: dict | None = None) -> dict:
+    """Generate N scripts concurrently and race them; the first to print EXECUTION_COMPLETE wins."""
+    dirs = _candidate_dirs(project_dir, n)
+    started = time.perf_counter()
+    generated = generate_candidate_codes(plan, dataset, dirs)
+    generation_seconds = round(time.perf_counter() - started, 3)
+    results, runnable = _validate_candidates(generated)
+    race = race_generated_code([(generated[i][1], dirs[i]) for i in runnable], cancel=cancel, env=env) \
+        if runnable else _NO_RACE
+    return _pick_candidate(generated, dirs, results, runnable, race, generation_seconds)
+
+async def _arun_candidates(plan, dataset, project_dir: str, n: int, env: dict | None = None) -> dict:
+    dirs = await asyncio.to_thread(_candidate_dirs, project_dir, n)
+    started = time.perf_counter()
+    generated = await agenerate_candidate_codes(plan, dataset, dirs)
+    generation_seconds = round(time.perf_counter() - started, 3)
+    results, runnable = _validate_candidates(generated)
+    race = await arace_generated_code([(generated[i][1], dirs[i]) for i in runnable], env=env) \
+        if runnable else _NO_RACE
+    return _pick_candidate(generated, dirs, results, runnable, race, generation_seconds)
+
+
+@traced("workflow.run")
+def run_autodev_once(user_prompt: str, max_retries: int = 2, launch_ui: bool = True,
+                     progress=None, cancel=None, project_id: int | None = None,
+                     candidates: int | None = None):
+    """
+    Run the full workflow synchronously. `progress(stage, fraction)` is called as the
+    workflow advances; setting the `cancel` event stops it (killing a running script)
+    and raises WorkflowCancelled. `project_id` links DB records to a `Project` row.
+    `candidates` > 1 (default CODER_CANDIDATES) generates that many scripts and races them.
+    """
+    # Create project structure with timestamp (microseconds: scheduled jobs start together)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     project_name = f"project_{timestamp}"
     project_dir = create_project_structure(project_name)
+    _update_project(project_id, folder_path=project_dir)
     
-    print(f"🚀 Starting AutoDev workflow in: {project_dir}")
-    print(f"📝 User prompt: {user_prompt}")
+    logger.info(f"🚀 Starting AutoDev workflow in: {project_dir}")
+    logger.info(f"📝 User prompt: {user_prompt}")
     
     # 1) Master → plan
-    print("\n📋 Step 1: Creating master plan...")
+    logger.info("📋 Step 1: Creating master plan...")
+    _report(progress, cancel, "master", 0.05)
     plan = master_plan(user_prompt)
 
     # 2) Research → dataset + description
-    print("\n🔍 Step 2: Researching dataset...")
+    logger.info("🔍 Step 2: Researching dataset...")
+    _report(progress, cancel, "research", 0.2)
     dataset = research_dataset(plan)
+    dataset_cache = prepare_dataset_cache(dataset, project_dir)
+    dataset_env = dataset_cache["env"] if dataset_cache else None
 
     # 3) Coder → code (training + metrics + gradio UI all in one)
-    print("\n💻 Step 3: Generating training code...")
-    code = generate_training_code(plan, dataset, project_dir)
+    logger.info("💻 Step 3: Generating training code...")
+    _report(progress, cancel, "coder", 0.35)
+    n_candidates = candidates or settings.CODER_CANDIDATES
+    work_dir, race, race_report = project_dir, None, None
+    if n_candidates > 1:
+        # Candidates are executed as part of the race; attempt 0 reuses the winner's result
+        _report(progress, cancel, "executor", 0.5)
+        race = _run_candidates(plan, dataset, project_dir, n_candidates, cancel, dataset_env)
+        code, work_dir, race_report = race["code"], race["work_dir"], race["report"]
+    else:
+        code = generate_training_code(plan, dataset, project_dir)
 
     # 4) Executor → run
     attempt = 0
+    debug_reports = []
     while attempt <= max_retries:
-        exec_res = execute_generated_code(code, project_dir)
-        print(f"🔍 Execution attempt {attempt + 1}: Success = {exec_res['success']}")
+        _report(progress, cancel, "executor", 0.5 + 0.4 * attempt / (max_retries + 1))
+        if attempt == 0 and race is not None:
+            exec_res = race["result"]
+        else:
+            exec_res = _validate_or_execute(code, work_dir, cancel, dataset_env)
+        _report(progress, cancel, "executor", 0.5 + 0.4 * (attempt + 1) / (max_retries + 1))
+        logger.info(f"🔍 Execution attempt {attempt + 1}: Success = {exec_res['success']}")
         
         # Check for artifacts as additional success indicator
-        artifacts_dir = os.path.join(project_dir, "artifacts")
+        artifacts_dir = os.path.join(work_dir, "artifacts")
         has_artifacts = os.path.exists(artifacts_dir) and len(os.listdir(artifacts_dir)) > 0
         
         if exec_res["success"] or has_artifacts:
-            print("✅ Code execution successful!")
+            logger.info("✅ Code execution successful!")
             if has_artifacts:
-                print(f"📦 Artifacts found: {os.listdir(artifacts_dir)}")
+                logger.info(f"📦 Artifacts found: {os.listdir(artifacts_dir)}")
                 exec_res["success"] = True  # Override success if artifacts exist
             break
         else:
-            print(f"❌ Execution failed: {exec_res.get('stderr', 'Unknown error')}")
+            logger.error(f"❌ Execution failed: {exec_res.get('stderr', 'Unknown error')}")
             
         # 5) Debug loop → rewrite → re-run
-        print(f"🔧 Attempting to debug and fix code (attempt {attempt + 1}/{max_retries + 1})")
-        code = rewrite_on_error(code, exec_res.get("stderr") or exec_res.get("stdout", ""))
+        logger.info(f"🔧 Attempting to debug and fix code (attempt {attempt + 1}/{max_retries + 1})")
+        _report(progress, cancel, "debug", 0.5 + 0.4 * (attempt + 1) / (max_retries + 1))
+        code, report = fix_code(code, exec_res.get("stderr") or exec_res.get("stdout", ""))
+        debug_reports.append(report)
         attempt += 1
 
     if not exec_res["success"]:
-        print("💥 All execution attempts failed!")
+        logger.error("💥 All execution attempts failed!")
+        release_dataset_cache(dataset_cache)
+        index_project(project_id, project_dir, dedupe=True)
+        _update_project(project_id, status="failed")
         return {
             "status": "failed",
             "project_dir": project_dir,
             "plan": plan,
             "dataset": dataset,
-            "last_error": exec_res.get("stderr") or exec_res.get("stdout", "")
+            "last_error": exec_res.get("stderr") or exec_res.get("stdout", ""),
+            "debug_reports": debug_reports,
+            "candidates": race_report
         }
 
+    # The dataset made it into the shared store; later runs can load it offline
+    commit_dataset_cache(dataset_cache, project_id)
+    record_catalog_dataset(plan, dataset, project_id)
+    if work_dir != project_dir:
+        _promote_candidate(work_dir, project_dir)
+
     # 6) Evaluator → summary
-    print("📊 Running evaluation and generating summary...")
+    logger.info("📊 Running evaluation and generating summary...")
+    _report(progress, cancel, "evaluator", 0.9)
     summary = summarize_and_prepare_ui(exec_res["stdout"])
 
-    print("🎉 AutoDev workflow completed successfully!")
-    print(f"📁 Results saved in: {project_dir}")
+    logger.info("🎉 AutoDev workflow completed successfully!")
+    index_project(project_id, project_dir, dedupe=True)
+    _update_project(project_id, status="completed")
+    logger.info(f"📁 Results saved in: {project_dir}")
     
     return {
         "status": "completed",
@@ -89,5 +267,111 @@ def run_autodev_once(user_prompt: str, max_retries: int = 2, launch_ui: bool = T
         "dataset": dataset,
         "metrics": summary.get("metrics", {}),
         "summary": summary.get("summary", ""),
-        "execution_output": exec_res["stdout"]
+        "execution_output": exec_res["stdout"],
+        "debug_reports": debug_reports,
+        "candidates": race_report
+    }
+
+
+@traced("workflow.run")
+async def arun_autodev_once(user_prompt: str, max_retries: int = 2, launch_ui: bool = True,
+                            project_id: int | None = None, candidates: int | None = None):
+    """
+    Async variant of `run_autodev_once`. Every LLM call uses `ainvoke` and the training
+    script runs under `asyncio.create_subprocess_exec`, so a single worker can drive
+    many workflows concurrently (e.g. with `asyncio.gather`).
+    """
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    project_name = f"project_{timestamp}"
+    # DB writes and filesystem work (copytree, hashing) go to a thread, off the event loop
+    project_dir = await asyncio.to_thread(create_project_structure, project_name)
+    await asyncio.to_thread(_update_project, project_id, folder_path=project_dir)
+
+    logger.info(f"🚀 Starting AutoDev workflow in: {project_dir}")
+    logger.info(f"📝 User prompt: {user_prompt}")
+
+    logger.info("📋 Step 1: Creating master plan...")
+    plan = await amaster_plan(user_prompt)
+
+    logger.info("🔍 Step 2: Researching dataset...")
+    dataset = await aresearch_dataset(plan)
+    dataset_cache = await asyncio.to_thread(prepare_dataset_cache, dataset, project_dir)
+    dataset_env = dataset_cache["env"] if dataset_cache else None
+
+    logger.info("💻 Step 3: Generating training code...")
+    n_candidates = candidates or settings.CODER_CANDIDATES
+    work_dir, race, race_report = project_dir, None, None
+    if n_candidates > 1:
+        race = await _arun_candidates(plan, dataset, project_dir, n_candidates, dataset_env)
+        code, work_dir, race_report = race["code"], race["work_dir"], race["report"]
+    else:
+        code = await agenerate_training_code(plan, dataset, project_dir)
+
+    attempt = 0
+    debug_reports = []
+    while attempt <= max_retries:
+        validation = validate_generated_code(code)
+        if attempt == 0 and race is not None:
+            exec_res = race["result"]
+        elif validation["valid"]:
+            exec_res = await aexecute_generated_code(code, work_dir, env=dataset_env)
+        else:
+            exec_res = _validation_failure(validation)
+        logger.info(f"🔍 Execution attempt {attempt + 1}: Success = {exec_res['success']}")
+
+        artifacts_dir = os.path.join(work_dir, "artifacts")
+        has_artifacts = os.path.exists(artifacts_dir) and len(os.listdir(artifacts_dir)) > 0
+
+        if exec_res["success"] or has_artifacts:
+            logger.info("✅ Code execution successful!")
+            if has_artifacts:
+                logger.info(f"📦 Artifacts found: {os.listdir(artifacts_dir)}")
+                exec_res["success"] = True  # Override success if artifacts exist
+            break
+        else:
+            logger.error(f"❌ Execution failed: {exec_res.get('stderr', 'Unknown error')}")
+
+        logger.info(f"🔧 Attempting to debug and fix code (attempt {attempt + 1}/{max_retries + 1})")
+        code, report = await afix_code(code, exec_res.get("stderr") or exec_res.get("stdout", ""))
+        debug_reports.append(report)
+        attempt += 1
+
+    if not exec_res["success"]:
+        logger.error("💥 All execution attempts failed!")
+        await asyncio.to_thread(release_dataset_cache, dataset_cache)
+        await asyncio.to_thread(index_project, project_id, project_dir, True)
+        await asyncio.to_thread(_update_project, project_id, status="failed")
+        return {
+            "status": "failed",
+            "project_dir": project_dir,
+            "plan": plan,
+            "dataset": dataset,
+            "last_error": exec_res.get("stderr") or exec_res.get("stdout", ""),
+            "debug_reports": debug_reports,
+            "candidates": race_report
+        }
+
+    await asyncio.to_thread(commit_dataset_cache, dataset_cache, project_id)
+    await asyncio.to_thread(record_catalog_dataset, plan, dataset, project_id)
+    if work_dir != project_dir:
+        await asyncio.to_thread(_promote_candidate, work_dir, project_dir)
+
+    logger.info("📊 Running evaluation and generating summary...")
+    summary = await asummarize_and_prepare_ui(exec_res["stdout"])
+
+    logger.info("🎉 AutoDev workflow completed successfully!")
+    await asyncio.to_thread(index_project, project_id, project_dir, True)
+    await asyncio.to_thread(_update_project, project_id, status="completed")
+    logger.info(f"📁 Results saved in: {project_dir}")
+
+    return {
+        "status": "completed",
+        "project_dir": project_dir,
+        "plan": plan,
+        "dataset": dataset,
+        "metrics": summary.get("metrics", {}),
+        "summary": summary.get("summary", ""),
+        "execution_output": exec_res["stdout"],
+        "debug_reports": debug_reports,
+        "candidates": race_report
     }
@@ -0,0 +1,157 @@
+# Checkpointed LangGraph runs tied to Project rows.
+#
+# Each project gets one LangGraph thread ("project-<id>", plus ":speculative" for the
+# speculative graph). The checkpointer (service/checkpoint_store.py) stores the state after
+# every node, which gives us:
+#   - resume_run: continue from the last completed node (e.g. after a worker restart or a
+#     crash inside the executor) without re-running master/research/coder;
+#   - replay_run: fork from the checkpoint taken just before a given node ran.
+# With a `cancel` event the graph is streamed step by step and stops (WorkflowCancelled)
+# after the first node that finishes once the event is set.
+import logging
+import threading
+from contextlib import contextmanager
+
+from workflow.lang_graph_pipeline import get_checkpointed_app
+from workflow.pipeline import WorkflowCancelled
+from service.dataset_cache import release_dataset_cache
+
+logger = logging.getLogger(__name__)
+
+RECURSION_LIMIT = 50
+_active = set()
+_active_lock = threading.Lock()
+
+
+class RunInProgress(RuntimeError):
+    """The project's workflow thread is already running in this process."""
+
+
+def thread_id(project_id: int, speculative: bool = False) -> str:
+    return f"project-{project_id}" + (":speculative" if speculative else "")
+
+
+def _app(speculative: bool):
+    return get_checkpointed_app(speculative)
+
+
+def _config(project_id: int, speculative: bool = False) -> dict:
+    return {"configurable": {"thread_id": thread_id(project_id, speculative)}, "recursion_limit": RECURSION_LIMIT}
+
+
+def _update_project(project_id: int, **values):
+    from db.session import SessionLocal
+    from crud import crud_project
+
+    with SessionLocal() as db:
+        crud_project.update_project(db, project_id, **values)
+
+
+@contextmanager
+def _claim(project_id: int, speculative: bool):
+    tid = thread_id(project_id, speculative)
+    with _active_lock:
+        if tid in _active:
+            raise RunInProgress(tid)
+        _active.add(tid)
+    try:
+        _update_project(project_id, status="running")
+        try:
+            yield
+        except Exception:
+            # Checkpoints up to the failing node are kept; resume_run picks up from there
+            _update_project(project_id, status="interrupted")
+            raise
+    finally:
+        _release_dataset_lease(project_id, speculative)
+        with _active_lock:
+            _active.discard(tid)
+
+
+def _release_dataset_lease(project_id: int, speculative: bool):
+    # Successful runs already released it in commit_dataset_cache; failed, cancelled and
+    # recursion-limited ones would otherwise pin the store entry until the lease expires
+    try:
+        state = _app(speculative).get_state(_config(project_id, speculative)).values
+        release_dataset_cache(state.get("dataset_cache"))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not release the dataset lease of {thread_id(project_id, speculative)}: {e}")
+
+
+def _finish(project_id: int, final: dict) -> dict:
+    succeeded = bool((final.get("results") or {}).get("success")) and "summary" in final
+    _update_project(project_id, folder_path=final.get("project_dir"),
+                    status="completed" if succeeded else "failed")
+    return final
+
+
+def _drive(graph, state, config: dict, project_id: int, speculative: bool, cancel=None) -> dict:
+    if cancel is None:
+        return graph.invoke(state, config)
+    final = state
+    for final in graph.stream(state, config, stream_mode="values"):
+        if cancel.is_set():
+            pending = graph.get_state(_config(project_id, speculative)).next
+            raise WorkflowCancelled(", ".join(pending) or "end")
+    return final
+
+
+def has_checkpoints(project_id: int, speculative: bool = False) -> bool:
+    return bool(_app(speculative).get_state(_config(project_id, speculative)).values)
+
+
+def is_running(project_id: int, speculative: bool = False) -> bool:
+    with _active_lock:
+        return thread_id(project_id, speculative) in _active
+
+
+def start_run(project_id: int, user_prompt: str, speculative: bool = False, cancel=None) -> dict:
+    """Run the workflow from the start on the project's thread."""
+    with _claim(project_id, speculative):
+        state = {"user_prompt": user_prompt, "project_id": project_id, "debug_reports": []}
+        final = _drive(_app(speculative), state, _config(project_id, speculative), project_id, speculative, cancel)
+    return _finish(project_id, final)
+
+
+def resume_run(project_id: int, speculative: bool = False, cancel=None) -> dict:
+    """Continue from the last checkpoint; a finished run just returns its final state."""
+    graph = _app(speculative)
+    config = _config(project_id, speculative)
+    snapshot = graph.get_state(config)
+    if not snapshot.values:
+        raise LookupError(f"No checkpoints for {thread_id(project_id, speculative)}")
+    if not snapshot.next:
+        return snapshot.values
+    logger.info(f"⏯️ Resuming {thread_id(project_id, speculative)} at {', '.join(snapshot.next)}")
+    with _claim(project_id, speculative):
+        final = _drive(graph, None, config, project_id, speculative, cancel)
+    return _finish(project_id, final)
+
+
+def replay_run(project_id: int, node: str, speculative: bool = False, cancel=None) -> dict:
+    """Re-run from the most recent checkpoint taken just before `node`, keeping everything before it."""
+    graph = _app(speculative)
+    config = _config(project_id, speculative)
+    for snapshot in graph.get_state_history(config):  # newest first
+        if node in snapshot.next:
+            break
+    else:
+        raise LookupError(f"No checkpoint before node '{node}' for {thread_id(project_id, speculative)}")
+    logger.info(f"🔁 Replaying {thread_id(project_id, speculative)} from {node}")
+    with _claim(project_id, speculative):
+        final = _drive(graph, None, {**snapshot.config, "recursion_limit": RECURSION_LIMIT},
+                       project_id, speculative, cancel)
+    return _finish(project_id, final)
+
+
+def run_history(project_id: int, speculative: bool = False) -> list:
+    """Checkpoints of the project's thread, newest first."""
+    history = []
+    for snapshot in _app(speculative).get_state_history(_config(project_id, speculative)):
+        history.append({
+            "checkpoint_id": snapshot.config["configurable"].get("checkpoint_id"),
+            "step": (snapshot.metadata or {}).get("step"),
+            "next": list(snapshot.next),
+            "created_at": snapshot.created_at,
+        })
+    return history